@@ -3,23 +3,7 @@ Django settings for Typing_jutsu project.
 
 Generated by 'django-admin startproject' using Django 5.2.6.
 
-For more infor# Static files (CSS, JavaScript, Images)
-# https://docs.djangoproject.com/en/5.2/howto/static-files/
-
-STATIC_URL = '/static/'
-STATIC_ROOT = str(BASE_DIR / 'staticfiles')  # Convert to string path
-
-# Add your static files directories
-STATICFILES_DIRS = [
-    str(BASE_DIR / "typing_game" / "static"),
-]
-
-# Whitenoise configuration
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
-
-# Ensure static files are served properly
-WHITENOISE_USE_FINDERS = True
-WHITENOISE_ROOT = STATIC_ROOThis file, see
+For more information on this file, see
 https://docs.djangoproject.com/en/5.2/topics/settings/
 
 For the full list of settings and their values, see
@@ -68,10 +52,12 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'typing_game.middleware.RequestMetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'typing_game.middleware.IdentityMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -111,6 +97,50 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local memory by default so it runs anywhere; point CACHE_BACKEND/CACHE_LOCATION
+# at a file-based or shared cache when running more than one worker process.
+# COMPETITION_EXPIRY = 'worker' requires one (system check typing_game.E001).
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'typing-jutsu'),
+    }
+}
+
+# Sessions are read from the cache and written through to the database, so
+# authenticated polling endpoints don't need a session query per request.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+
+# Result ingestion
+# 'direct' writes each submission inside its request. 'batched' acknowledges
+# immediately and bulk-writes from a write-ahead file (see typing_game/ingest.py),
+# which absorbs the burst of submissions when a race timer expires.
+
+RESULT_INGEST_MODE = os.getenv('RESULT_INGEST_MODE', 'direct')
+RESULT_INGEST_DIR = os.getenv('RESULT_INGEST_DIR', str(BASE_DIR / 'ingest'))
+RESULT_INGEST_FLUSH_INTERVAL = 0.5  # seconds
+RESULT_INGEST_BATCH_SIZE = 500
+
+
+# Competition expiry
+# 'thread' ends competitions from a scheduler thread in each web process (see
+# typing_game/expiry.py); 'worker' leaves it to a `manage.py run_expiry` process.
+
+COMPETITION_EXPIRY = os.getenv('COMPETITION_EXPIRY', 'thread')
+
+
+# Request metrics
+# Per-view latency and query percentiles, read with `manage.py request_metrics`.
+# The middleware removes itself when disabled; the JSON endpoint needs the token.
+
+REQUEST_METRICS_ENABLED = os.getenv('REQUEST_METRICS', 'False') == 'True'
+REQUEST_METRICS_TOKEN = os.getenv('REQUEST_METRICS_TOKEN', '')
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -129,6 +159,28 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing policy, chosen with the PASSWORD_HASHING_POLICY env var:
+#   pbkdf2  Django's default (PBKDF2-SHA256)
+#   scrypt  Django's scrypt, memory-hard at a similar cost per login
+#   burst   a cheaper single-lane scrypt for classes that log in all at once
+#   argon2  Django's Argon2, needs the optional argon2-cffi package
+# Hashes made under any policy keep verifying and are rehashed with the
+# current policy's hasher the next time their user logs in.
+PASSWORD_HASHING_POLICIES = {
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'burst': 'typing_game.hashers.BurstScryptPasswordHasher',
+    'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+}
+PASSWORD_HASHING_POLICY = os.getenv('PASSWORD_HASHING_POLICY', 'pbkdf2')
+PASSWORD_HASHERS = [PASSWORD_HASHING_POLICIES[PASSWORD_HASHING_POLICY]] + [
+    hasher for hasher in PASSWORD_HASHING_POLICIES.values()
+    if hasher != PASSWORD_HASHING_POLICIES[PASSWORD_HASHING_POLICY]
+] + [
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -144,15 +196,28 @@ USE_TZ = True
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
+# https://whitenoise.readthedocs.io/en/stable/django.html
+# `collectstatic` (build.sh) gives every file a content-hashed name plus
+# .gz and, with the Brotli package, .br copies. WhiteNoise serves hashed names
+# with a ten-year immutable Cache-Control, so race pages only reload their
+# scripts after a deploy changes them. Pages render only after collectstatic
+# (or with DEBUG); tests and benchmarks switch to plain names.
 
 STATIC_URL = 'static/'
-STATIC_ROOT = BASE_DIR / 'staticfiles'  # Directory where static files will be collected
+STATIC_ROOT = BASE_DIR / 'staticfiles'  # Where collectstatic puts the files
 
 STATICFILES_DIRS = [
-    BASE_DIR  / "static",  # Your app's static files directory
+    BASE_DIR / 'static',
 ]
 
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -0,0 +1,252 @@
+// Live competition page: start signal, roster, standings and progress
+// reporting shared by both race types (live_typing.js, live_jumble.js).
+// The page passes its per-race values in the "live-config" JSON blob.
+const liveConfig = JSON.parse(document.getElementById('live-config').textContent);
+const urls = liveConfig.urls;
+const userRole = liveConfig.user_role;
+const competitionType = liveConfig.type;
+const competitionStarted = liveConfig.started;
+const competitionStartTime = new Date(liveConfig.start_time);
+const competitionDuration = liveConfig.duration * 60; // in seconds
+
+// Measure the server clock now, so nothing is requested once the race is on
+TimeSync.sync(urls.time_sync);
+
+function toggleExpand(containerClass) {
+    const container = document.querySelector('.' + containerClass);
+    const expandBtn = document.getElementById('expand-btn');
+    const expandBtnIcon = expandBtn.querySelector('i');
+
+    if (container.classList.contains('expanded')) {
+        // Collapse the container
+        expandBtn.style.position = '';
+        container.classList.remove('expanded');
+        container.style.position = '';
+        container.style.top = '';
+        container.style.left = '';
+        container.style.transform = '';
+        container.style.width = '';
+        container.style.height = '';
+        container.style.background = '';
+        container.style.padding = '';
+        expandBtnIcon.className = 'fas fa-expand';
+    } else {
+        // Expand the container
+        expandBtn.style.position = 'fixed';
+        container.classList.add('expanded');
+        container.style.position = 'fixed';
+        container.style.top = '50%';
+        container.style.left = '50%';
+        container.style.transform = 'translate(-50%, -50%)';
+        container.style.width = '100vw';
+        container.style.height = '100vh';
+        container.style.padding = '3em 12em'
+        container.style.background = 'var(--background-color)'; // Use theme background
+        expandBtn.style.zIndex = '1001';
+        expandBtnIcon.className = 'fas fa-compress';
+    }
+}
+function enableTyping() {
+    if (typingInput) {
+        typingInput.disabled = false;
+        typingInput.placeholder = "Start typing now!";
+        typingInput.focus();
+        startProgressReporting();
+    }
+}
+
+function endCompetition() {
+    if (typingInput) {
+        typingInput.disabled = true;
+        typingInput.placeholder = "Time's up!";
+    }
+    stopProgressReporting();
+    document.getElementById('submission-section').style.display = 'block';
+}
+
+// --- Competition events: start signal, deactivation and live standings ---
+let competitionCheckInterval;
+let standingsInterval;
+let competitionEvents;
+let raceStarted = false;
+
+function showCountdown(startTime, onStart) {
+    // Ticks are display only; the start itself is timed on the server clock
+    const overlay = document.getElementById('countdown-overlay');
+    const number = document.getElementById('countdown-number');
+    overlay.style.display = 'flex';
+    const tick = () => { number.textContent = Math.max(0, Math.ceil((startTime - TimeSync.now()) / 1000)); };
+    tick();
+    const countdownInterval = setInterval(tick, 100);
+    TimeSync.at(startTime, () => {
+        clearInterval(countdownInterval);
+        overlay.style.display = 'none';
+        onStart();
+    });
+}
+
+function startRace(startTime) {
+    if (raceStarted) return; // The stream repeats 'started' when it reconnects
+    raceStarted = true;
+    clearInterval(competitionCheckInterval);
+    handleCompetitionStart(startTime);
+}
+
+function listenForCompetitionEvents() {
+    if (!window.EventSource) {
+        usePollingFallback();
+        return;
+    }
+    // Push channel: one long-lived connection instead of polling.
+    competitionEvents = new EventSource(urls.events);
+    competitionEvents.addEventListener('started', function(e) {
+        startRace(new Date(JSON.parse(e.data).start_time));
+    });
+    competitionEvents.addEventListener('progress', function(e) {
+        applyStandings(JSON.parse(e.data));
+    });
+    competitionEvents.addEventListener('roster', function(e) {
+        applyRoster(JSON.parse(e.data));
+    });
+    competitionEvents.addEventListener('open', catchUpRoster);
+    competitionEvents.addEventListener('deactivated', function() {
+        competitionEvents.close();
+        window.location.href = urls.competitions;
+    });
+    competitionEvents.onerror = function() {
+        // The browser retries dropped connections on its own; a closed
+        // stream means push is unavailable here (e.g. a WSGI server).
+        if (competitionEvents.readyState === EventSource.CLOSED) {
+            usePollingFallback();
+        }
+    };
+}
+
+function usePollingFallback() {
+    if (userRole === 'participant' && !raceStarted) {
+        competitionCheckInterval = setInterval(checkCompetitionStatus, 3000); // Check every 3 seconds
+    }
+    standingsInterval = setInterval(fetchStandings, 2000);
+    if (rosterList) setInterval(catchUpRoster, 3000);
+}
+
+function checkCompetitionStatus() {
+    fetch(urls.status)
+        .then(response => response.json())
+        .then(data => {
+            if (data.started) {
+                // Use the start time from the server to be accurate
+                const serverStartTime = new Date(data.start_time);
+                startRace(serverStartTime);
+            }
+        })
+        .catch(error => console.error('Error checking competition status:', error));
+}
+
+// --- Roster (organizer view): the first names plus diffs pushed as people join ---
+const rosterList = document.getElementById('roster-list');
+const rosterSize = liveConfig.roster_size;
+let rosterVersion = liveConfig.roster_version;
+let rosterCount = liveConfig.participant_count;
+
+function applyRoster(diff) {
+    if (!rosterList || diff.version <= rosterVersion) return;
+    rosterVersion = diff.version;
+    if (diff.reset) {
+        rosterList.innerHTML = '';
+        rosterCount = 0;
+    }
+    diff.left.forEach(id => {
+        const item = rosterList.querySelector(`li[data-id="${id}"]`);
+        if (item) item.remove();
+    });
+    diff.joined.forEach(([id, name]) => {
+        if (rosterList.children.length >= rosterSize || rosterList.querySelector(`li[data-id="${id}"]`)) return;
+        const item = document.createElement('li');
+        const strong = document.createElement('strong');
+        item.dataset.id = id;
+        strong.textContent = name;
+        item.appendChild(strong);
+        rosterList.appendChild(item);
+    });
+    // Pushed diffs only list new changes; fetched ones carry the count
+    rosterCount = diff.count !== undefined ? diff.count : rosterCount + diff.joined.length - diff.left.length;
+    const hidden = rosterCount - rosterList.children.length;
+    document.getElementById('roster-count').textContent = rosterCount;
+    document.getElementById('roster-more').textContent = hidden > 0 ? `and ${hidden} more` : '';
+    document.getElementById('roster-empty').style.display = rosterCount ? 'none' : '';
+}
+
+function catchUpRoster() {
+    // Changes made while the stream was down
+    if (!rosterList) return;
+    fetch(`${urls.roster}?since=${rosterVersion}`)
+        .then(response => response.json())
+        .then(applyRoster)
+        .catch(error => console.error('Error fetching roster:', error));
+}
+
+// --- Live standings ---
+const standingsList = document.getElementById('live-standings');
+const standingsSize = 10;
+const racers = new Map(); // participant id -> [id, wordIndex, correctWords, wpm]
+const racerNames = {};
+
+function applyStandings(snapshot) {
+    if (snapshot.full) racers.clear();
+    Object.assign(racerNames, snapshot.names);
+    snapshot.racers.forEach(row => racers.set(row[0], row));
+    renderStandings();
+}
+
+function fetchStandings() {
+    if (!raceStarted) return;
+    fetch(urls.progress)
+        .then(response => response.json())
+        .then(applyStandings)
+        .catch(error => console.error('Error fetching standings:', error));
+}
+
+function renderStandings() {
+    if (!standingsList || racers.size === 0) return;
+    const leaders = Array.from(racers.values())
+        .sort((a, b) => b[2] - a[2] || b[3] - a[3])
+        .slice(0, standingsSize);
+    standingsList.innerHTML = '';
+    leaders.forEach(([id, wordIndex, correctWords, wpm]) => {
+        const item = document.createElement('li');
+        item.textContent = `${racerNames[id] || 'Racer'} - ${correctWords} correct, ${wpm} WPM`;
+        standingsList.appendChild(item);
+    });
+    document.getElementById('standings-section').style.display = 'block';
+}
+
+// --- Progress reporting: ticks are batched and sent once a second ---
+let pendingTicks = [];
+let progressInterval;
+
+function queueProgressTick(wordIndex, correctWords, charsTyped) {
+    pendingTicks.push([wordIndex, correctWords, charsTyped]);
+}
+
+function startProgressReporting() {
+    if (!progressInterval) {
+        progressInterval = setInterval(flushProgress, 1000);
+    }
+}
+
+function stopProgressReporting() {
+    clearInterval(progressInterval);
+    flushProgress();
+}
+
+function flushProgress() {
+    if (pendingTicks.length === 0) return;
+    const ticks = pendingTicks;
+    pendingTicks = [];
+    fetch(urls.submit_progress, {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json', 'X-CSRFToken': liveConfig.csrf_token},
+        body: JSON.stringify({ticks: ticks}),
+    }).catch(error => console.error('Error sending progress:', error));
+}
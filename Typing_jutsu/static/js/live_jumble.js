@@ -0,0 +1,160 @@
+// Jumble-words races on the live competition page; loads after live_competition.js.
+// --- Jumble Words Game Logic ---
+const typingInput = document.getElementById('typing-input');
+const textDisplay = document.getElementById('text-display');
+const timeElement = document.getElementById('time');
+const wpmElement = document.getElementById('wpm');
+const accuracyElement = document.getElementById('accuracy');
+
+// This participant's jumbles, each with a salted hash of its answer
+const puzzleData = document.getElementById('jumble-puzzles');
+const {salt, puzzles: questions} = puzzleData ? JSON.parse(puzzleData.textContent) : {salt: '', puzzles: []};
+const answers = []; // Checked again on the server, which decides the score
+let currentQuestionIndex = 0;
+let correctAnswers = 0;
+
+let startTime;
+
+async function answerHash(answer) {
+    // Must match jumble.answer_hash(); crypto.subtle needs HTTPS (or localhost)
+    const normalized = answer.split(/\s+/).filter(Boolean).join(' ').toLowerCase();
+    const digest = await crypto.subtle.digest('SHA-256', new TextEncoder().encode(`${salt}:${normalized}`));
+    return Array.from(new Uint8Array(digest), b => b.toString(16).padStart(2, '0')).join('')
+        .slice(0, questions[0].hash.length);
+}
+
+function displayQuestion() {
+    if (currentQuestionIndex < questions.length) {
+        const jumbled = document.createElement('p');
+        jumbled.style.cssText = 'font-size: 1.5em; text-align: center; color: var(--accent-color);';
+        jumbled.textContent = questions[currentQuestionIndex].text;
+        textDisplay.replaceChildren(jumbled);
+        typingInput.value = '';
+        typingInput.focus();
+    } else {
+        // All questions answered
+        textDisplay.innerHTML = `<p style="text-align: center; color: var(--primary-color);">You have completed all the words!</p>`;
+        endCompetition();
+    }
+}
+
+function checkInput() {
+    // This function is triggered on input, but for jumble, we check on Enter key
+}
+
+typingInput.addEventListener('keydown', async function(e) {
+    if (e.key === 'Enter') {
+        e.preventDefault(); // Prevent form submission
+        const userAnswer = typingInput.value.trim();
+        if (userAnswer === '' || currentQuestionIndex >= questions.length) return;
+
+        const question = questions[currentQuestionIndex];
+        answers.push(userAnswer);
+        currentQuestionIndex++;
+        displayQuestion();
+        if (window.crypto && crypto.subtle && await answerHash(userAnswer) === question.hash) {
+            correctAnswers++;
+        }
+        queueProgressTick(answers.length, correctAnswers, 0);
+        updateStats();
+    }
+});
+
+async function handleCompetitionStart(startTime) {
+    await TimeSync.ready;
+    const secondsUntilStart = (startTime - TimeSync.now()) / 1000;
+
+    if (secondsUntilStart > 0) {
+        startPreCompetitionCountdown(startTime);
+    } else {
+        // Competition already in progress
+        const mainTimeLeft = competitionDuration + (secondsUntilStart);
+        if (mainTimeLeft > 0) {
+            if (userRole === 'participant') {
+                enableTypingAndStartGame();
+            }
+            startMainCompetitionTimer(startTime);
+        } else {
+            endCompetition();
+        }
+    }
+}
+
+function startPreCompetitionCountdown(startTime) {
+    showCountdown(startTime, () => {
+        if (userRole === 'participant') {
+            enableTypingAndStartGame();
+        }
+        startMainCompetitionTimer(startTime);
+    });
+}
+
+function startMainCompetitionTimer(raceStart) {
+    // Recompute the time left from the synced clock on every tick, so a
+    // throttled or late interval cannot stretch the race
+    const endsAt = raceStart.getTime() + competitionDuration * 1000;
+    const totalMinutes = Math.floor(competitionDuration / 60);
+    const tick = () => {
+        const timeLeft = Math.max(0, Math.ceil((endsAt - TimeSync.now()) / 1000));
+        const minutes = Math.floor(timeLeft / 60);
+        const seconds = Math.floor(timeLeft % 60);
+        if (timeElement) {
+            timeElement.textContent = `${minutes}:${seconds.toString().padStart(2, '0')}/${totalMinutes} minute(s)`;
+        }
+        if (timeLeft <= 0) {
+            clearInterval(timerInterval);
+            endCompetition();
+        }
+    };
+    const timerInterval = setInterval(tick, 250);
+    tick();
+}
+
+function updateStats() {
+    wpmElement.textContent = correctAnswers; // Using WPM box to show correct answers
+    document.querySelector('h4:first-of-type').textContent = 'Correct:';
+
+    const accuracy = questions.length > 0 ? (correctAnswers / questions.length) * 100 : 0;
+    accuracyElement.textContent = `${accuracy.toFixed(1)}%`;
+}
+
+function endCompetition() {
+    if (typingInput.disabled) return; // Prevent multiple calls
+    typingInput.disabled = true;
+    typingInput.placeholder = "Time's up!";
+    stopProgressReporting();
+
+    const timeTaken = startTime ? (new Date() - startTime) / 1000 : competitionDuration;
+    const totalQuestions = questions.length;
+
+    // Score calculation, as on the server: (share correct * 80) + (share of time left * 20 * share correct)
+    const accuracyScore = totalQuestions > 0 ? (correctAnswers / totalQuestions) * 80 : 0;
+    const timeBonus = competitionDuration > 0 && totalQuestions > 0 && answers.length === totalQuestions
+        ? ((competitionDuration - Math.min(timeTaken, competitionDuration)) / competitionDuration) * 20 * (correctAnswers / totalQuestions)
+        : 0;
+    const finalScore = accuracyScore + timeBonus;
+
+    // Update hidden form fields; the server scores the answers itself
+    document.getElementById('form-answers').value = JSON.stringify(answers);
+    document.getElementById('form-score').value = finalScore.toFixed(2);
+    document.getElementById('form-num-correct').value = correctAnswers;
+    document.getElementById('form-total-questions').value = totalQuestions;
+    document.getElementById('form-time-taken').value = timeTaken.toFixed(2);
+
+    document.getElementById('submission-section').style.display = 'block';
+}
+
+function enableTypingAndStartGame() {
+    enableTyping();
+    startTime = new Date();
+    displayQuestion();
+    updateStats();
+}
+
+// Initial setup on page load
+document.addEventListener('DOMContentLoaded', function() {
+    if (competitionStarted) {
+        startRace(competitionStartTime);
+    }
+    listenForCompetitionEvents();
+});
@@ -0,0 +1,223 @@
+// Normal and Reverse races on the live competition page; loads after live_competition.js.
+// --- Real-time Typing Calculation ---
+const typingInput = document.getElementById('typing-input');
+const textDisplay = document.getElementById('text-display');
+const wpmElement = document.getElementById('wpm');
+const accuracyElement = document.getElementById('accuracy');
+const timeElement = document.getElementById('time');
+const racerIcon = document.getElementById('racer-icon');
+
+
+// New elements for countdown and submission
+
+let words = [];
+let currentWordIndex = 0;
+let correctWords = 0;
+let totalCharsTyped = 0;
+let wordsAttempted = 0; // New variable to track attempted words
+
+// Keystroke log for server-side scoring: k holds every key ('\b' is a
+// backspace) and t the milliseconds since the previous key.
+const keyLog = {t: [], k: ''};
+let lastKeyAt;
+let previousValue = '';
+
+const wordsData = document.getElementById('competition-words');
+if (textDisplay && wordsData) {
+    // Tokenized on the server when the text was added to the corpus
+    words = JSON.parse(wordsData.textContent);
+    // Display the words in normal order, but wrap them in spans for highlighting
+    words.forEach((word, i) => {
+        if (i) textDisplay.appendChild(document.createTextNode(' '));
+        const span = document.createElement('span');
+        span.textContent = word;
+        textDisplay.appendChild(span);
+    });
+    currentWordIndex = competitionType === 'Reverse' ? words.length - 1 : 0;
+}
+
+let startTime;
+let timerInterval;
+let competitionTimerInterval;
+
+document.addEventListener('DOMContentLoaded', function() {
+    if (competitionStarted) {
+        startRace(competitionStartTime);
+    }
+    // Participants who join before the start wait here for the signal
+    listenForCompetitionEvents();
+});
+
+async function handleCompetitionStart(startTime) {
+        await TimeSync.ready;
+        const secondsUntilStart = (startTime - TimeSync.now()) / 1000;
+
+        if (secondsUntilStart > 0) {
+            startPreCompetitionCountdown(startTime);
+        } else {
+            // Competition already in progress
+            const mainTimeLeft = competitionDuration + (secondsUntilStart);
+            if (mainTimeLeft > 0) {
+                // Only enable typing if the user is a participant
+                if (userRole === 'participant') {
+                    enableTyping();
+                }
+                startMainCompetitionTimer(startTime);
+            } else {
+                endCompetition();
+            }
+        }
+}
+
+function startPreCompetitionCountdown(startTime) {
+    showCountdown(startTime, () => {
+        if (userRole === 'participant') {
+            enableTyping();
+        }
+        startMainCompetitionTimer(startTime);
+    });
+}
+
+function checkInput() {
+    // This is the typing timer for WPM, not the main competition timer
+    if (!startTime && typingInput.value.length > 0 && !typingInput.disabled) {
+        startTime = new Date();
+        timerInterval = setInterval(updateStats, 1000); // Update stats every second
+    }
+
+    const typedValue = typingInput.value;
+    recordKeystrokes(typedValue);
+    const currentWord = words[currentWordIndex]; // The word we expect the user to type
+    const wordSpans = Array.from(textDisplay.querySelectorAll('span'));
+
+    // When space is pressed, it means the user is moving to the next word
+    if (typedValue.endsWith(' ')) {
+        const typedWord = typedValue.trim();
+
+        // Don't do anything if the user just presses space
+        if (typedWord === '') {
+            typingInput.value = '';
+            previousValue = '';
+            return;
+        }
+
+        wordsAttempted++; // Increment on every word attempt
+
+        totalCharsTyped += typedWord.length + 1; // +1 for the space
+
+        if (typedWord === currentWord) {
+            correctWords++;
+            wordSpans[currentWordIndex].classList.add('correct-word');
+        } else {
+            wordSpans[currentWordIndex].classList.add('incorrect-word');
+        }
+
+        if (competitionType === 'Reverse') {
+            currentWordIndex--;
+            if (currentWordIndex < 0) {
+                // Reset to re-type from the end
+                currentWordIndex = words.length - 1;
+                setTimeout(() => wordSpans.forEach(span => span.className = ''), 200);
+            }
+        } else {
+            currentWordIndex++;
+            if (currentWordIndex >= words.length) {
+                // Reset to re-type from the beginning
+                currentWordIndex = 0;
+                setTimeout(() => wordSpans.forEach(span => span.className = ''), 200);
+            }
+        }
+
+        typingInput.value = ''; // Clear the textarea for the next word
+        previousValue = '';
+        const position = competitionType === 'Reverse' ? words.length - 1 - currentWordIndex : currentWordIndex;
+        queueProgressTick(position, correctWords, totalCharsTyped);
+
+        // Remove the red background from the next word if it had one
+        if (wordSpans[currentWordIndex]) {
+            wordSpans[currentWordIndex].classList.remove('incorrect-word');
+        }
+
+    } else {
+        // Check the current word being typed for correctness in real-time
+        if (currentWord && currentWord.toLowerCase().startsWith(typedValue.toLowerCase())) {
+            typingInput.classList.remove('incorrect-word');
+        } else {
+            typingInput.classList.add('incorrect-word');
+        }
+    }
+
+    updateStats();
+}
+
+function recordKeystrokes(value) {
+    // Turn the change since the last input event into keys
+    let common = 0;
+    while (common < value.length && common < previousValue.length && value[common] === previousValue[common]) {
+        common++;
+    }
+    const keys = '\b'.repeat(previousValue.length - common) + value.slice(common);
+    const now = performance.now();
+    for (const key of keys) {
+        keyLog.t.push(lastKeyAt === undefined ? 0 : Math.round(now - lastKeyAt));
+        keyLog.k += key;
+        lastKeyAt = now;
+    }
+    previousValue = value;
+}
+
+const resultForm = document.getElementById('result-form');
+if (resultForm) {
+    resultForm.addEventListener('submit', function() {
+        document.getElementById('form-keystrokes').value = JSON.stringify(keyLog);
+    });
+}
+
+function startMainCompetitionTimer(raceStart) {
+    // Recompute the time left from the synced clock on every tick, so a
+    // throttled or late interval cannot stretch the race
+    const endsAt = raceStart.getTime() + competitionDuration * 1000;
+    const totalMinutes = Math.floor(competitionDuration / 60);
+    const tick = () => {
+        const timeLeft = Math.max(0, Math.ceil((endsAt - TimeSync.now()) / 1000));
+        const minutes = Math.floor(timeLeft / 60);
+        const seconds = Math.floor(timeLeft % 60);
+        timeElement.textContent = `${minutes}:${seconds.toString().padStart(2, '0')}/${totalMinutes} minute(s)`;
+        if (timeLeft <= 0) {
+            clearInterval(competitionTimerInterval);
+            endCompetition();
+        }
+    };
+    competitionTimerInterval = setInterval(tick, 250);
+    tick();
+}
+function updateStats() {
+    if (!startTime) return;
+
+    const elapsedTime = (new Date() - startTime) / 1000;
+
+    // WPM is based on a standard of 5 characters per word (including space)
+    const wpm = (totalCharsTyped / 5) / (elapsedTime / 60);
+    wpmElement.textContent = elapsedTime > 0 ? Math.round(wpm) : 0;
+
+    // Accuracy is based on correctly typed words vs total words attempted (using our new variable)
+    const accuracy = wordsAttempted > 0 ? (correctWords / wordsAttempted) * 100 : 100;
+    accuracyElement.textContent = `${Math.round(accuracy)}%`;
+
+    // Update racer position
+    if (racerIcon && words.length > 0) {
+        let progress = 0;
+        if (competitionType === 'Reverse') {
+            // Progress goes from 0 to 100 as we go from last word to first
+            progress = ((words.length - 1 - currentWordIndex) / (words.length -1)) * 100;
+        } else {
+            progress = (currentWordIndex / words.length) * 100;
+        }
+        racerIcon.style.left = `${Math.min(progress, 100)}%`;
+    }
+
+    // Update hidden form fields for submission
+    document.getElementById('form-wpm').value = wpmElement.textContent;
+    document.getElementById('form-accuracy').value = accuracyElement.textContent.replace('%', '');
+    document.getElementById('form-time-taken').value = elapsedTime;
+}
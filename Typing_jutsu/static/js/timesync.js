@@ -0,0 +1,59 @@
+// Server clock for countdowns, so a race starts at the same moment for
+// everyone whatever their own clocks say.
+//
+// TimeSync.sync(url) takes a few NTP-style samples of the time-sync
+// endpoint before the race. Each sample's offset assumes the server read its
+// clock halfway through the round trip; the sample with the shortest round
+// trip has the least room for error and wins. After that no more requests
+// are made: TimeSync.now() is the local monotonic clock plus the offset.
+const TimeSync = (function() {
+    const SAMPLES = 5;
+    let offset = 0; // server time minus local time, in ms
+    let resolveReady;
+    const ready = new Promise(resolve => { resolveReady = resolve; });
+
+    function localNow() {
+        // Unlike Date.now(), not affected by the system clock being adjusted
+        return performance.timeOrigin + performance.now();
+    }
+
+    async function sample(url) {
+        const sent = localNow();
+        const response = await fetch(url, {cache: 'no-store'});
+        const data = await response.json();
+        const received = localNow();
+        return {offset: data.server_time - (sent + received) / 2, roundTrip: received - sent};
+    }
+
+    async function sync(url, samples = SAMPLES) {
+        let best;
+        for (let i = 0; i < samples; i++) {
+            try {
+                const result = await sample(url);
+                if (!best || result.roundTrip < best.roundTrip) best = result;
+            } catch (error) {
+                console.error('Time sync sample failed:', error);
+            }
+        }
+        if (best) offset = best.offset;
+        resolveReady(best);
+        return best;
+    }
+
+    function now() {
+        return localNow() + offset;
+    }
+
+    // Call fn when the server clock reaches time (a Date or ms); timers can fire
+    // early or late, so re-arm until it's due.
+    function at(time, fn) {
+        const wait = time - now();
+        if (wait <= 0) {
+            fn();
+        } else {
+            setTimeout(() => at(time, fn), Math.min(wait, 1000));
+        }
+    }
+
+    return {sync, now, at, ready};
+})();
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class TypingGameConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'typing_game'
+
+    def ready(self):
+        from . import checks  # Registers the system checks
+        from . import identity
+        identity.connect_signals()
@@ -0,0 +1,631 @@
+"""
+Load benchmarks for the hot paths of a live competition.
+
+Run them with ``python manage.py benchmark <name>``. Benchmarks that need
+data run against a throwaway test database, so it is safe to point them at a
+real deployment's settings.
+"""
+import asyncio
+import json
+import random
+import statistics
+import threading
+import time
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import corpus, events, expiry, export, identity, jumble, metrics, progress, roster, scoring, stats
+from .models import Participant, Organizer, Competition, CompetitionResult, Paragraph, ParticipantStats
+from .testing import isolated_database
+
+# Fast hasher for creating benchmark users; login benchmarks override this.
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+def make_competition(status='active', **kwargs):
+    with override_settings(PASSWORD_HASHERS=FAST_HASHERS):
+        organizer = Organizer(name='bench-organizer', email='bench@example.com', mobile_num='9999999999')
+        organizer.set_password('benchmark')
+        organizer.save()
+    fields = {
+        'title': 'Benchmark race',
+        'type': 'Normal',
+        'start_time': timezone.now(),
+        'status': status,
+    }
+    fields.update(kwargs)
+    competition = Competition.objects.create(organizer=organizer, **fields)
+    corpus.set_competition_texts(competition, ['The quick brown fox jumps over the lazy dog.'])
+    return competition
+
+
+def make_participants(count, prefix='racer'):
+    with override_settings(PASSWORD_HASHERS=FAST_HASHERS):
+        participants = []
+        for i in range(count):
+            participant = Participant(name=f'{prefix}{i}')
+            participant.set_password('benchmark')
+            participants.append(participant)
+    Participant.objects.bulk_create(participants)
+    return list(Participant.objects.filter(name__startswith=prefix).order_by('id'))
+
+
+def make_organizers(count, prefix='host'):
+    with override_settings(PASSWORD_HASHERS=FAST_HASHERS):
+        organizers = []
+        for i in range(count):
+            organizer = Organizer(name=f'{prefix}{i}', email=f'{prefix}{i}@example.com', mobile_num='9999999999')
+            organizer.set_password('benchmark')
+            organizers.append(organizer)
+    Organizer.objects.bulk_create(organizers)
+    return list(Organizer.objects.filter(name__startswith=prefix).order_by('id'))
+
+
+def logged_in_client(user, role):
+    client = Client()
+    session = client.session
+    session['user_id'] = user.id
+    session['user_role'] = role
+    session['user_name'] = user.name
+    session.save()
+    return client
+
+
+def run_for(seconds, step):
+    """Call ``step(i)`` repeatedly for ``seconds``; return ``(calls, elapsed)``."""
+    calls = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        step(calls)
+        calls += 1
+    return calls, time.perf_counter() - started
+
+
+def status_polling(write, pollers=300, seconds=5.0):
+    """Lobby polling of ``competition_status_api``: uncached baseline vs ETag/304."""
+    with isolated_database():
+        competition = make_competition()
+        url = reverse('typing_game:competition_status_api', args=[competition.id])
+        participants = make_participants(pollers)
+
+        # Baseline: what every poll cost before the status cache, a session
+        # query plus a Competition query per request.
+        baseline = {
+            'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+            'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+        }
+        with override_settings(**baseline):
+            clients = [logged_in_client(p, 'participant') for p in participants]
+            calls, elapsed = run_for(seconds, lambda i: clients[i % pollers].get(url))
+        write(f'uncached polling:    {calls / elapsed:10.1f} req/s  ({pollers} pollers)')
+
+        clients = [logged_in_client(p, 'participant') for p in participants]
+        etags = [None] * pollers
+        not_modified = 0
+
+        def poll(i):
+            nonlocal not_modified
+            n = i % pollers
+            headers = {'If-None-Match': etags[n]} if etags[n] else {}
+            response = clients[n].get(url, headers=headers)
+            etags[n] = response['ETag']
+            not_modified += response.status_code == 304
+
+        calls, elapsed = run_for(seconds, poll)
+        write(f'conditional polling: {calls / elapsed:10.1f} req/s  ({pollers} pollers, {not_modified / calls:.0%} answered 304)')
+
+
+def race_progress(write, racers=1000, viewers=1000, ticks=40):
+    """Live progress ingest and 4 Hz fan-out for one race held in memory."""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+
+    async def subscribe():
+        return events.subscribe(0)
+
+    subscriptions = [asyncio.run_coroutine_threadsafe(subscribe(), loop).result() for _ in range(viewers)]
+    board = progress.RaceBoard(0, timezone.now())
+    for racer in range(racers):
+        board.add_racer(racer, f'racer{racer}')
+    board.take_delta()
+
+    # Each racer flushes once a second, so a quarter of them report per tick.
+    per_tick = max(1, racers // progress.TICK_RATE)
+    counters = [[0, 0, 0] for _ in range(racers)]
+    ingest_time = 0.0
+    tick_times = []
+    for _ in range(ticks):
+        started = time.perf_counter()
+        for racer in random.sample(range(racers), per_tick):
+            counters[racer][0] += 3
+            counters[racer][1] += 2
+            counters[racer][2] += 15
+            board.ingest(racer, [list(counters[racer])])
+        ingest_time += time.perf_counter() - started
+
+        started = time.perf_counter()
+        events.publish(0, 'progress', board.take_delta())
+        tick_times.append(time.perf_counter() - started)
+
+    time.sleep(0.2)  # Let the loop drain the scheduled deliveries.
+    delivered = sum(subscription.queue.qsize() for subscription in subscriptions)
+    for subscription in subscriptions:
+        events.unsubscribe(subscription)
+    loop.call_soon_threadsafe(loop.stop)
+
+    budget = 1000 / progress.TICK_RATE
+    write(f'racers={racers} viewers={viewers} ticks={ticks}')
+    write(f'ingest:    {ingest_time / (ticks * per_tick) * 1e6:8.2f} us per progress batch')
+    write(f'broadcast: {statistics.mean(tick_times) * 1000:8.2f} ms mean, {max(tick_times) * 1000:.2f} ms max per tick '
+          f'(budget {budget:.0f} ms)')
+    write(f'delivered: {delivered} of {ticks * viewers} messages')
+
+
+SAMPLE_TEXT = (
+    'Typing is a skill that rewards steady practice. Keep your eyes on the text, '
+    'let your fingers rest on the home row, and aim for accuracy before speed. '
+    'Over time the rhythm becomes natural and the words seem to flow on their own.'
+)
+
+
+def synthetic_keystroke_log(words, seconds, wpm=70, error_rate=0.05, seed=1):
+    """A delta-encoded log of ``seconds`` of typing ``words`` with occasional typos."""
+    rng = random.Random(seed)
+    mean_delta = 60000 / (wpm * 5)
+    deltas, keys = [], []
+    elapsed = index = 0
+    while elapsed < seconds * 1000:
+        word = words[index % len(words)]
+        for char in word + ' ':
+            if char != ' ' and rng.random() < error_rate:
+                keys += ['x', scoring.BACKSPACE]
+                deltas += [round(rng.expovariate(1 / mean_delta)), round(mean_delta)]
+            keys.append(char)
+            deltas.append(round(rng.expovariate(1 / mean_delta)))
+        elapsed = sum(deltas)
+        index += 1
+    deltas[0] = 0
+    return deltas, ''.join(keys)
+
+
+def keystroke_scoring(write, seconds=300, submissions=1000):
+    """Server-side replay of end-of-race keystroke logs."""
+    words = SAMPLE_TEXT.split()
+    deltas, keys = synthetic_keystroke_log(words, seconds)
+    raw = json.dumps({'t': deltas, 'k': keys})
+
+    started = time.perf_counter()
+    for _ in range(submissions):
+        parsed_deltas, parsed_keys = scoring.parse_log(raw)
+        result = scoring.score_keystrokes(words, parsed_deltas, parsed_keys, seconds + 60)
+    elapsed = time.perf_counter() - started
+
+    per_log = elapsed / submissions
+    write(f'log: {seconds}s of typing, {len(keys)} keys, {len(raw) / 1024:.1f} KiB')
+    write(f'result: {result["wpm"]} WPM, {result["accuracy"]}% accuracy, {result["correct_keystrokes"]} correct keystrokes')
+    write(f'parse + score: {per_log * 1000:.3f} ms per log ({per_log * 1e6 / seconds:.2f} us per second of typing)')
+    write(f'burst of {submissions} submissions: {elapsed:.2f} s on one core')
+
+
+def _legacy_find_account(identifier):
+    """The login lookup before ``identity.find_account``: up to two unindexed queries."""
+    if '@' in identifier:
+        return 'organizer', Organizer.objects.filter(email=identifier).first()
+    participant = Participant.objects.filter(name=identifier).first()
+    if participant:
+        return 'participant', participant
+    return 'organizer', Organizer.objects.filter(name=identifier).first()
+
+
+def login_burst(write, users=1000):
+    """A burst of logins right before a competition opens."""
+    with isolated_database():
+        # Mostly participants, plus organizers signing in by name (the old
+        # worst case, two queries) and by email.
+        organizers = make_organizers(max(1, users // 10))
+        participants = make_participants(users - len(organizers))
+        identifiers = [p.name for p in participants]
+        identifiers += [o.name if i % 2 else o.email for i, o in enumerate(organizers)]
+        random.Random(1).shuffle(identifiers)
+
+        for label, find in (('two-step lookup', _legacy_find_account), ('union lookup', identity.find_account)):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                for identifier in identifiers:
+                    find(identifier)
+                elapsed = time.perf_counter() - started
+            write(f'{label + ":":17} {elapsed / len(identifiers) * 1e6:8.1f} us, '
+                  f'{len(queries) / len(identifiers):.2f} queries per login')
+
+        url = reverse('typing_game:login')
+        latencies = []
+        with override_settings(PASSWORD_HASHERS=FAST_HASHERS), CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for identifier in identifiers:
+                begun = time.perf_counter()
+                response = Client().post(url, {'username': identifier, 'password': 'benchmark'})
+                latencies.append(time.perf_counter() - begun)
+                assert response.status_code == 302, f'login failed for {identifier}'
+            elapsed = time.perf_counter() - started
+        latencies.sort()
+        write(f'burst of {len(identifiers)} logins: {len(identifiers) / elapsed:.1f} logins/s, '
+              f'p50 {latencies[len(latencies) // 2] * 1000:.2f} ms, p95 {latencies[int(len(latencies) * 0.95)] * 1000:.2f} ms, '
+              f'{len(queries) / len(identifiers):.2f} queries per login (password hashing excluded)')
+
+
+def password_policies(write, logins=50):
+    """Logins per second on one core under each ``PASSWORD_HASHING_POLICY``."""
+    with isolated_database():
+        participants = make_participants(logins, prefix='student')
+        url = reverse('typing_game:login')
+        for policy, hasher in settings.PASSWORD_HASHING_POLICIES.items():
+            with override_settings(PASSWORD_HASHERS=[hasher]):
+                try:
+                    encoded = make_password('benchmark')
+                except ValueError as e:  # e.g. argon2-cffi isn't installed
+                    write(f'{policy:7} skipped: {e}')
+                    continue
+                Participant.objects.update(password=encoded)
+                started = time.perf_counter()
+                for participant in participants:
+                    response = Client().post(url, {'username': participant.name, 'password': 'benchmark'})
+                    assert response.status_code == 302, f'login failed under {policy}'
+                elapsed = time.perf_counter() - started
+            write(f'{policy:7} {logins / elapsed:7.1f} logins/s per core  ({elapsed / logins * 1000:6.1f} ms per login)')
+
+
+def lobby_handlers(write, clients=200, idle=1000, seconds=5.0, threads=8):
+    """Lobby polling under the WSGI handler (a thread pool) and the ASGI handler (one event loop)."""
+    import httpx  # Only needed for this benchmark
+    from django.core.handlers.asgi import ASGIHandler
+    from django.core.handlers.wsgi import WSGIHandler
+    from concurrent.futures import ThreadPoolExecutor
+
+    with isolated_database():
+        competition = make_competition()
+        participants = make_participants(clients)
+        competition.participants.add(*participants[:50])
+        status_url = reverse('typing_game:competition_status_api', args=[competition.id])
+        lobby_url = reverse('typing_game:live_competition', args=[competition.id])
+        events_url = reverse('typing_game:competition_events', args=[competition.id])
+        SessionStore = import_module(settings.SESSION_ENGINE).SessionStore
+        cookies = []
+        for participant in participants:
+            session = SessionStore()
+            session.update({'user_id': participant.id, 'user_role': 'participant', 'user_name': participant.name})
+            session.create()
+            cookies.append({settings.SESSION_COOKIE_NAME: session.session_key})
+
+        def report(label, requests, elapsed):
+            # Every client always has a request in flight, so the mean wait is
+            # clients / throughput (Little's law) for both handlers.
+            write(f'{label}: {requests / elapsed:8.1f} req/s, {threading.active_count():4} threads, '
+                  f'peak RSS {metrics.peak_rss():>8}')
+
+        # Each lobby client polls the status with its ETag and reloads the
+        # lobby page every tenth request.
+        def lobby_url_for(calls):
+            return lobby_url if calls % 10 == 9 else status_url
+
+        # WSGI: the thread pool serves the clients in turn. An event stream
+        # would pin a thread for good, so there the lobby can only poll.
+        transport = httpx.WSGITransport(app=WSGIHandler())
+        sessions = [httpx.Client(transport=transport, base_url='http://testserver', cookies=c) for c in cookies]
+        deadline = time.perf_counter() + seconds
+        requests = [0] * threads
+
+        def wsgi_worker(worker):
+            etags = [''] * clients
+            while time.perf_counter() < deadline:
+                n = (worker + requests[worker] * threads) % clients
+                response = sessions[n].get(lobby_url_for(requests[worker]), headers={'If-None-Match': etags[n]})
+                etags[n] = response.headers.get('ETag', etags[n])
+                requests[worker] += 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(threads) as pool:
+            list(pool.map(wsgi_worker, range(threads)))
+            report(f'WSGI, {threads} threads, {clients} polling clients', sum(requests), time.perf_counter() - started)
+
+        async def asgi_run():
+            transport = httpx.ASGITransport(app=ASGIHandler())
+            sessions = [httpx.AsyncClient(transport=transport, base_url='http://testserver', cookies=c) for c in cookies]
+            # Idle lobby tabs hold an event stream open and send nothing.
+            streams = [asyncio.create_task(sessions[n % clients].get(events_url)) for n in range(idle)]
+            while events.subscriber_count(competition.id) < idle:
+                await asyncio.sleep(0.1)
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + seconds
+            requests = 0
+
+            async def lobby(n):
+                nonlocal requests
+                etag, calls = '', 0
+                while loop.time() < deadline:
+                    response = await sessions[n].get(lobby_url_for(calls), headers={'If-None-Match': etag})
+                    etag = response.headers.get('ETag', etag)
+                    calls += 1
+                    requests += 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(lobby(n) for n in range(clients)))
+            report(f'ASGI, event loop, {clients} polling clients + {idle} idle streams', requests, time.perf_counter() - started)
+            for stream in streams:
+                stream.cancel()
+            await asyncio.gather(*streams, return_exceptions=True)
+
+        asyncio.run(asgi_run())
+
+
+def competition_expiry(write, competitions=5000, finished=500):
+    """Expiry scheduler with thousands of running competitions, vs. scanning for overdue ones."""
+    with isolated_database():
+        organizer = make_organizers(1)[0]
+        now = timezone.now()
+        Competition.objects.bulk_create([
+            Competition(
+                title=f'Race {i}', type='Normal', organizer=organizer, status='started', started=True,
+                # The first `finished` are overdue, the rest end over the next few hours.
+                start_time=now - timedelta(minutes=10), duration=5 if i < finished else 11 + i % 240,
+            )
+            for i in range(competitions)
+        ], batch_size=1000)
+        Competition.objects.bulk_create([
+            Competition(title=f'Old race {i}', type='Normal', organizer=organizer, status='ended',
+                        started=True, expired=True, start_time=now - timedelta(days=1))
+            for i in range(competitions * 4)
+        ], batch_size=1000)
+
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            overdue = list(Competition.objects.with_end_time().filter(status='started', ends_at__lte=now).values_list('id'))
+            scan = time.perf_counter() - started
+        write(f'periodic scan:     {scan * 1000:8.2f} ms per pass ({len(queries)} query, {len(overdue)} overdue, '
+              f'{competitions} running, {competitions * 5} rows)')
+
+        scheduler = expiry.ExpiryScheduler()
+        started = time.perf_counter()
+        scheduler.refresh(now)
+        write(f'initial load:      {(time.perf_counter() - started) * 1000:8.2f} ms for {len(scheduler)} competitions')
+
+        started = time.perf_counter()
+        scheduler.refresh(now)
+        write(f'refresh:           {(time.perf_counter() - started) * 1000:8.2f} ms with nothing new')
+
+        started = time.perf_counter()
+        next_due = scheduler.run_pending(now)
+        elapsed = time.perf_counter() - started
+        write(f'end + finalize:    {elapsed / finished * 1e6:8.1f} us per competition ({finished} ended, '
+              f'next due in {(next_due - now).total_seconds():.0f} s)')
+
+        heap = expiry.ExpiryScheduler()
+        started = time.perf_counter()
+        for i in range(competitions):
+            heap.schedule(i, now + timedelta(seconds=random.random() * 3600))
+        push = time.perf_counter() - started
+        write(f'heap push:         {push / competitions * 1e6:8.2f} us per competition')
+
+
+def _legacy_join(competition, participant_id):
+    """The join path before insert-if-absent: check, then add."""
+    if competition.participants.filter(id=participant_id).exists():
+        return False
+    competition.participants.add(participant_id)
+    return True
+
+
+def concurrent_joins(write, joins=1000, threads=16):
+    """A burst of joins from many threads, every participant clicking twice.
+
+    Runs on the configured database. SQLite serializes the writers, so the
+    race the insert-if-absent path guards against only shows under real
+    concurrency: point ``DATABASE_URL`` at PostgreSQL to measure that.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    with isolated_database(concurrent_writers=True):
+        participants = make_participants(joins)
+        write(f'{joins} participants joining twice each from {threads} threads on {connection.vendor}')
+
+        def burst(label, join):
+            competition = make_competition(title=label)
+            errors = 0
+
+            def worker(n):
+                nonlocal errors
+                try:
+                    for i in range(n, joins * 2, threads):
+                        try:
+                            join(competition, participants[i % joins])
+                        except Exception:
+                            errors += 1
+                finally:
+                    connection.close()
+
+            with CaptureQueriesContext(connection) as queries:
+                join(competition, participants[0])  # Both paths then see one duplicate click
+            started = time.perf_counter()
+            with ThreadPoolExecutor(threads) as pool:
+                list(pool.map(worker, range(threads)))
+            elapsed = time.perf_counter() - started
+            competition.refresh_from_db()
+            members = competition.participants.count()
+            write(f'{label:<18} {joins * 2 / elapsed:8.1f} joins/s  {len(queries)} statements per join  '
+                  f'{errors} errors  {members} members  participant_count={competition.participant_count}')
+            Organizer.objects.all().delete()
+
+        burst('check-then-add', lambda competition, participant: _legacy_join(competition, participant.id))
+        burst('insert-if-absent', lambda competition, participant: roster.join(competition.id, participant))
+
+        competition = make_competition(title='pre-registration')
+        names = [participant.name for participant in participants]
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            added, _ = roster.register(competition.id, names)
+            elapsed = time.perf_counter() - started
+        write(f'pre-register {added} participants: {elapsed * 1000:.1f} ms, {len(queries)} statements')
+
+
+def synthetic_paragraphs(count, vocabulary=5000, words=60, seed=1):
+    """Paragraphs of Zipf-distributed words with a little punctuation, as import lines."""
+    rng = random.Random(seed)
+    vocab = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(2, 9))) for _ in range(vocabulary)]
+    weights = [1 / rank for rank in range(1, vocabulary + 1)]
+    for _ in range(count):
+        tokens = rng.choices(vocab, weights, k=words)
+        for i in rng.sample(range(words), rng.randint(0, words // 5)):
+            tokens[i] += rng.choice(',.;:!?')
+        yield ' '.join(tokens).capitalize()
+        yield ''
+
+
+def practice_texts(write, paragraphs=20000, loads=2000):
+    """Practice text generation: index build, cold and cached texts, and page loads."""
+    from . import practice
+
+    with isolated_database():
+        corpus.import_paragraphs(synthetic_paragraphs(paragraphs))
+        write(f'{Paragraph.objects.count()} paragraphs in the corpus, index samples {practice.INDEX_SIZE}')
+
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            index = practice.build_index()
+            elapsed = time.perf_counter() - started
+        write(f'index build:   {elapsed * 1000:8.1f} ms, {len(queries)} queries')
+        for level in practice.LEVELS:
+            lengths = [statistics.mean(map(len, tokens)) for tokens in index.paragraphs[level]]
+            write(f'  {level:<6} {len(lengths):5d} paragraphs, mean word length {statistics.mean(lengths):.2f}')
+
+        cases = [(level, length, seed) for level in practice.LEVELS for length in practice.LENGTHS
+                 for seed in range(practice.SEEDS)]
+        started = time.perf_counter()
+        for case in cases:
+            index.text(*case)
+        cold = (time.perf_counter() - started) / len(cases)
+        started = time.perf_counter()
+        for case in cases:
+            index.text(*case)
+        hot = (time.perf_counter() - started) / len(cases)
+        write(f'generate:      {cold * 1e6:8.1f} us uncached, {hot * 1e6:.2f} us cached '
+              f'({len(cases)} parameter sets)')
+
+        practice._index = index
+        participant = make_participants(1)[0]
+        client = logged_in_client(participant, 'participant')
+        url = reverse('typing_game:practice')
+        client.get(url)  # Warm the profile cache and the session
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for i in range(loads):
+                client.get(url, {'level': practice.LEVELS[i % 3], 'length': practice.LENGTHS[i % 4]})
+            elapsed = time.perf_counter() - started
+        write(f'page loads:    {loads / elapsed:8.1f} /s, {len(queries) / loads:.2f} queries per load')
+        practice._index = None
+
+
+def jumble_puzzles(write, participants=2000, words=50):
+    """Per-participant Jumble-words puzzle sets: generation for the page and server-side checks."""
+    rng = random.Random(1)
+    answers = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(4, 10)))
+               for _ in range(words)]
+    competition = Competition(id=1, type='Jumble-words', duration=5, paragraphs=[{'answer': a} for a in answers])
+
+    started = time.perf_counter()
+    sets = [jumble.puzzle_set(answers, seed) for seed in range(participants)]
+    elapsed = time.perf_counter() - started
+    write(f'puzzle sets:   {participants * words / elapsed:10.0f} puzzles/s ({words} words per set)')
+    distinct = len({tuple(puzzles) for puzzles in sets})
+    write(f'               {distinct} distinct sets for {participants} seeds')
+
+    started = time.perf_counter()
+    for participant_id in range(participants):
+        jumble.client_puzzles(competition, participant_id)
+    elapsed = time.perf_counter() - started
+    write(f'page payloads: {participants / elapsed:10.0f} sets/s, {elapsed / participants * 1000:.3f} ms each '
+          f'(seed, shuffle and salted hashes)')
+
+    typed = json.dumps(answers)
+    started = time.perf_counter()
+    for participant_id in range(participants):
+        jumble.score_submission(competition, participant_id, typed, 120)
+    elapsed = time.perf_counter() - started
+    write(f'server checks: {participants / elapsed:10.0f} submissions/s')
+
+
+def participant_stats(write, races=5000, reads=500):
+    """Profile stats for a participant with many results: rollup row vs aggregating on each view."""
+    from django.db.models import Avg, Max
+
+    from .views import _store_result
+
+    with isolated_database():
+        participant = make_participants(1)[0]
+        competition = make_competition()
+        competitions = Competition.objects.bulk_create([
+            Competition(organizer_id=competition.organizer_id, title=f'Race {i}', type='Normal',
+                        start_time=timezone.now(), status='ended')
+            for i in range(races)
+        ])
+        CompetitionResult.objects.bulk_create([
+            CompetitionResult(competition=race, participant=participant, wpm=40 + i % 60, accuracy=90, score=40)
+            for i, race in enumerate(competitions)
+        ])
+        stats.rebuild([participant.id])
+        write(f'{races} results for one participant')
+
+        def aggregate():
+            results = CompetitionResult.objects.filter(participant=participant)
+            totals = results.aggregate(Avg('wpm'), Max('wpm'), Avg('accuracy'))
+            recent = list(results.select_related('competition').order_by('-submitted_at')[:stats.RECENT_SIZE])
+            return totals, recent
+
+        for label, read in [
+            ('aggregate per view', aggregate),
+            ('rollup row', lambda: ParticipantStats.objects.get(participant=participant)),
+        ]:
+            started = time.perf_counter()
+            for _ in range(reads):
+                read()
+            elapsed = time.perf_counter() - started
+            write(f'{label:<20} {elapsed / reads * 1000:8.3f} ms per profile')
+
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            _store_result(competitions[0], participant.id, {'wpm': 200, 'accuracy': 100})
+            elapsed = time.perf_counter() - started
+        write(f'submit with rollup   {elapsed * 1000:8.3f} ms, {len(queries)} queries')
+
+
+def results_export(write, competitions=200, racers=1000):
+    """Streaming CSV/NDJSON export of ``competitions * racers`` results: rows/s and memory."""
+    with isolated_database():
+        participants = make_participants(racers)
+        organizer_id = make_competition().organizer_id
+        races = Competition.objects.bulk_create([
+            Competition(organizer_id=organizer_id, title=f'Race {i}', type='Normal', start_time=timezone.now())
+            for i in range(competitions)
+        ])
+        for race in races:
+            CompetitionResult.objects.bulk_create([
+                CompetitionResult(competition=race, participant=participant, wpm=40 + rank % 60, accuracy=95,
+                                  score=38 + rank % 57, rank=rank)
+                for rank, participant in enumerate(participants, start=1)
+            ], batch_size=1000)
+        total = competitions * racers
+        write(f'{total} results; peak RSS before exporting {metrics.peak_rss()}')
+
+        for output_format, gzipped in [('csv', False), ('csv', True), ('ndjson', False), ('ndjson', True)]:
+            started = time.perf_counter()
+            size = sum(len(block) for block in export.stream(export.results(), output_format, gzipped))
+            elapsed = time.perf_counter() - started
+            label = output_format + (' + gzip' if gzipped else '')
+            write(f'{label:<14} {total / elapsed:9.0f} rows/s  {size / 2**20:7.1f} MiB  peak RSS {metrics.peak_rss()}')
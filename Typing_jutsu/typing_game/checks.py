@@ -0,0 +1,27 @@
+"""
+System checks for settings that only work together.
+"""
+from django.conf import settings
+from django.core import checks
+
+# Backends whose entries live in one process; nothing else sees a write.
+PER_PROCESS_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+@checks.register(checks.Tags.caches)
+def check_expiry_cache(app_configs, **kwargs):
+    """A ``run_expiry`` worker ends races in its own process; web workers only learn of it through the cache."""
+    if settings.COMPETITION_EXPIRY != 'worker':
+        return []
+    backend = settings.CACHES['default']['BACKEND']
+    if backend not in PER_PROCESS_CACHES:
+        return []
+    return [checks.Error(
+        "COMPETITION_EXPIRY = 'worker' needs a cache shared between processes.",
+        hint=(f"{backend} is private to each process, so web workers would keep serving the status "
+              "of ended races. Set CACHE_BACKEND to a shared backend such as Redis, Memcached or the database."),
+        id='typing_game.E001',
+    )]
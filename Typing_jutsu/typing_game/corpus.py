@@ -0,0 +1,165 @@
+"""
+Shared corpus of typing texts.
+
+Each paragraph is stored once, keyed by a hash of its normalized text, and is
+tokenized and measured when it is added. ``tokens`` are its words in typing
+order and ``offsets`` where each one starts in ``text``. Competitions point
+at paragraphs instead of carrying their own copy, and the live page and the
+scorer use the stored tokens instead of splitting the text again.
+"""
+import hashlib
+import re
+import string
+from itertools import accumulate
+
+from django.db import transaction
+
+from .models import CompetitionParagraph, Paragraph
+
+_DROP_PUNCTUATION = str.maketrans('', '', string.punctuation)
+# Capitals and digits need the shift key or a reach away from the home row.
+AWKWARD_PATTERN = re.compile(r'[A-Z0-9]')
+IMPORT_BATCH_SIZE = 1000  # paragraphs per bulk insert when importing
+MAX_PARAGRAPH_CHARS = 2000  # longer runs of text are cut into several paragraphs
+MIN_PARAGRAPH_WORDS = 5  # skips headings, page numbers and other debris
+
+
+def normalize(text):
+    """Collapse runs of whitespace; two texts that type the same are the same paragraph."""
+    return ' '.join(text.split())
+
+
+def content_hash(text):
+    return hashlib.sha256(normalize(text).encode('utf-8')).hexdigest()
+
+
+def analyze(text):
+    """Field values of a ``Paragraph`` for ``text``."""
+    text = normalize(text)
+    # Normalized text is words joined by single spaces, so everything below is
+    # plain string work; this runs for every imported paragraph.
+    tokens = text.split(' ') if text else []
+    letters = len(text) - max(len(tokens) - 1, 0)
+    punctuation = len(text) - len(text.translate(_DROP_PUNCTUATION))
+    awkward = len(AWKWARD_PATTERN.findall(text))
+    avg_word_length = letters / len(tokens) if tokens else 0.0
+    punctuation_density = punctuation / len(text) if text else 0.0
+    return {
+        'text': text,
+        'content_hash': content_hash(text),
+        'tokens': tokens,
+        'offsets': list(accumulate((len(token) + 1 for token in tokens[:-1]), initial=0)) if tokens else [],
+        'char_count': len(text),
+        'word_count': len(tokens),
+        'avg_word_length': round(avg_word_length, 3),
+        'punctuation_density': round(punctuation_density, 4),
+        'difficulty': round(avg_word_length + 20 * punctuation_density + 10 * (awkward / len(text) if text else 0), 3),
+    }
+
+
+def add_paragraphs(texts):
+    """Return the corpus paragraphs for ``texts`` in the same order, adding the missing ones."""
+    analyzed = [analyze(text) for text in texts if text.strip()]
+    hashes = [fields['content_hash'] for fields in analyzed]
+    found = Paragraph.objects.in_bulk(hashes, field_name='content_hash')
+    missing = {fields['content_hash']: fields for fields in analyzed if fields['content_hash'] not in found}
+    if missing:
+        # Another request may add the same text concurrently; whoever loses re-reads it.
+        Paragraph.objects.bulk_create([Paragraph(**fields) for fields in missing.values()], ignore_conflicts=True)
+        found.update(Paragraph.objects.in_bulk(list(missing), field_name='content_hash'))
+    return [found[content_hash] for content_hash in hashes]
+
+
+@transaction.atomic
+def set_competition_texts(competition, texts):
+    """Make ``texts`` (in order) the typing text of ``competition``."""
+    paragraphs = add_paragraphs(texts)
+    CompetitionParagraph.objects.filter(competition=competition).delete()
+    CompetitionParagraph.objects.bulk_create([
+        CompetitionParagraph(competition=competition, paragraph=paragraph, position=position)
+        for position, paragraph in enumerate(paragraphs)
+    ])
+
+
+def _linked(competition):
+    return CompetitionParagraph.objects.filter(competition=competition).order_by('position')
+
+
+def competition_tokens(competition):
+    """Words of a competition's text in reading order, from the stored tokens."""
+    return [token for tokens in _linked(competition).values_list('paragraph__tokens', flat=True) for token in tokens]
+
+
+def competition_texts(competition):
+    return list(_linked(competition).values_list('paragraph__text', flat=True))
+
+
+def _cut_line(line, max_chars):
+    """Split ``line`` into pieces of at most ``max_chars``, at spaces where possible."""
+    while len(line) > max_chars:
+        cut = line.rfind(' ', 0, max_chars + 1)
+        if cut <= 0:
+            cut = max_chars  # A single word longer than a paragraph
+        yield line[:cut]
+        line = line[cut:].lstrip()
+    if line:
+        yield line
+
+
+def iter_paragraphs(lines, max_chars=MAX_PARAGRAPH_CHARS):
+    """Yield paragraphs from an iterable of lines; blank lines separate them.
+
+    No paragraph is longer than ``max_chars``: runs of text are cut between
+    lines, and lines that are too long on their own between words. Only the
+    current line and paragraph are held in memory.
+    """
+    buffer, size = [], 0
+    for line in lines:
+        line = line.strip()
+        if not line:
+            if buffer:
+                yield ' '.join(buffer)
+                buffer, size = [], 0
+            continue
+        for piece in _cut_line(line, max_chars):
+            if buffer and size + len(piece) > max_chars:
+                yield ' '.join(buffer)
+                buffer, size = [], 0
+            buffer.append(piece)
+            size += len(piece) + 1
+    if buffer:
+        yield ' '.join(buffer)
+
+
+def _insert_new(batch):
+    """Insert the paragraphs of ``batch`` (hash -> fields) not in the corpus yet; returns how many."""
+    existing = set(Paragraph.objects.filter(content_hash__in=list(batch)).values_list('content_hash', flat=True))
+    new = [Paragraph(**fields) for content_hash, fields in batch.items() if content_hash not in existing]
+    Paragraph.objects.bulk_create(new, ignore_conflicts=True)
+    return len(new)
+
+
+def import_paragraphs(lines, batch_size=IMPORT_BATCH_SIZE, min_words=MIN_PARAGRAPH_WORDS):
+    """Stream paragraphs from ``lines`` into the corpus in batches.
+
+    Duplicates are recognized by content hash, within a batch and against
+    the corpus, so memory stays bounded by one batch however large the input.
+    Returns counts of paragraphs ``read``, ``added``, ``duplicates`` and
+    ``skipped`` (too short).
+    """
+    stats = {'read': 0, 'added': 0, 'duplicates': 0, 'skipped': 0}
+    batch = {}
+    for text in iter_paragraphs(lines):
+        stats['read'] += 1
+        fields = analyze(text)
+        if fields['word_count'] < min_words:
+            stats['skipped'] += 1
+            continue
+        batch[fields['content_hash']] = fields
+        if len(batch) >= batch_size:
+            stats['added'] += _insert_new(batch)
+            batch = {}
+    if batch:
+        stats['added'] += _insert_new(batch)
+    stats['duplicates'] = stats['read'] - stats['skipped'] - stats['added']
+    return stats
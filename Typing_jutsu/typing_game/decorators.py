@@ -3,38 +3,53 @@ from django.urls import reverse
 from django.contrib import messages
 from functools import wraps
 
-def login_required(view_func):
-    @wraps(view_func)
-    def _wrapped_view(request, *args, **kwargs):
-        # Check if user is logged in
-        if 'user_id' not in request.session:
-            messages.error(request, 'Please login to access this page.')
-            return redirect('typing_game:login')
-        return view_func(request, *args, **kwargs)
-    return _wrapped_view
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 
-def participant_required(view_func):
-    @wraps(view_func)
-    def _wrapped_view(request, *args, **kwargs):
-        # Check if user is logged in and is a participant
-        if 'user_id' not in request.session:
+def _is_logged_in(request):
+    # request.profile comes from the cache (see IdentityMiddleware), so this
+    # also catches sessions of deleted users without a query per request.
+    if 'user_id' not in request.session:
+        return False
+    if not request.profile:
+        request.session.flush()
+        return False
+    return True
+
+def _session_check(view_func, role=None):
+    """Wrap a sync or async view so it only runs for logged-in users of ``role``."""
+    def denied(request, logged_in):
+        if not logged_in:
             messages.error(request, 'Please login to access this page.')
             return redirect('typing_game:login')
-        if request.session.get('user_role') != 'participant':
-            messages.error(request, 'This page is only accessible to participants.')
+        if role and request.session.get('user_role') != role:
+            messages.error(request, f'This page is only accessible to {role}s.')
             return redirect('typing_game:home')
-        return view_func(request, *args, **kwargs)
-    return _wrapped_view
+        return None
+
+    if iscoroutinefunction(view_func):
+        async def _wrapped_view(request, *args, **kwargs):
+            # One thread hop loads the session and resolves request.profile for the view
+            response = denied(request, await sync_to_async(_is_logged_in)(request))
+            if response is not None:
+                return response
+            return await view_func(request, *args, **kwargs)
+        markcoroutinefunction(_wrapped_view)
+    else:
+        def _wrapped_view(request, *args, **kwargs):
+            response = denied(request, _is_logged_in(request))
+            if response is not None:
+                return response
+            return view_func(request, *args, **kwargs)
+    return wraps(view_func)(_wrapped_view)
+
+def login_required(view_func):
+    # Check if user is logged in
+    return _session_check(view_func)
+
+def participant_required(view_func):
+    # Check if user is logged in and is a participant
+    return _session_check(view_func, role='participant')
 
 def organizer_required(view_func):
-    @wraps(view_func)
-    def _wrapped_view(request, *args, **kwargs):
-        # Check if user is logged in and is an organizer
-        if 'user_id' not in request.session:
-            messages.error(request, 'Please login to access this page.')
-            return redirect('typing_game:login')
-        if request.session.get('user_role') != 'organizer':
-            messages.error(request, 'This page is only accessible to organizers.')
-            return redirect('typing_game:home')
-        return view_func(request, *args, **kwargs)
-    return _wrapped_view
+    # Check if user is logged in and is an organizer
+    return _session_check(view_func, role='organizer')
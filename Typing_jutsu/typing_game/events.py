@@ -0,0 +1,70 @@
+"""
+In-process publish/subscribe for live competition events.
+
+Sync views publish from worker threads; the Server-Sent Events stream in
+``views.competition_events`` consumes them on the ASGI event loop. Subscribers
+are kept per competition, so publishing only touches the clients waiting in
+that competition's lobby.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+
+_subscribers = defaultdict(set)
+_lock = threading.Lock()
+
+
+class Subscription:
+    """A single client's queue of pending events for one competition."""
+
+    def __init__(self, competition_id):
+        self.competition_id = competition_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+
+    def deliver(self, event, data):
+        try:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, (event, data))
+        except RuntimeError:
+            # The event loop that owned this subscriber has shut down.
+            unsubscribe(self)
+
+    async def get(self, timeout=None):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+def subscribe(competition_id):
+    """Register the calling coroutine for events of a competition."""
+    subscription = Subscription(competition_id)
+    with _lock:
+        _subscribers[competition_id].add(subscription)
+    return subscription
+
+
+def unsubscribe(subscription):
+    with _lock:
+        subscribers = _subscribers.get(subscription.competition_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del _subscribers[subscription.competition_id]
+
+
+def subscriber_count(competition_id):
+    with _lock:
+        return len(_subscribers.get(competition_id, ()))
+
+
+def publish(competition_id, event, data=None):
+    """Send an event to every client listening on a competition."""
+    with _lock:
+        subscribers = list(_subscribers.get(competition_id, ()))
+    for subscription in subscribers:
+        subscription.deliver(event, data or {})
+
+
+def publish_on_commit(competition_id, event, data=None):
+    """Publish once the current transaction commits, so clients never see uncommitted state."""
+    transaction.on_commit(lambda: publish(competition_id, event, data))
@@ -0,0 +1,138 @@
+"""
+Server-side end of competitions.
+
+A started competition ends ``duration`` minutes after its ``start_time``.
+``ExpiryScheduler`` keeps upcoming end times in a min-heap and sleeps until
+the earliest one is due, so each competition costs one O(log n) push and pop
+and nothing scans the table. New starts are found by ``refresh``:
+``lifecycle.start`` always sets ``start_time`` in the future, so everything
+started since the previous refresh is one range read on the
+``(status, start_time)`` index.
+
+A due competition is ended with ``lifecycle.end``, whose UPDATE also checks
+the end time stored in the database. Several processes may run a scheduler
+and exactly one of them wins each end; if an edit moved the end back, the
+update matches nothing and the entry is rescheduled from the row.
+
+Racers submit when their own timer runs out, so results are accepted for
+``SUBMISSION_GRACE`` after the end. Once that has passed, the winner re-ranks
+the leaderboard from scratch and drops the race board. No lobby event is
+sent: pages end the race on their own server-synced timer, and a separate
+``run_expiry`` worker would have no subscribers to send it to.
+"""
+import heapq
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from . import leaderboard, lifecycle, progress
+from .models import Competition
+
+logger = logging.getLogger(__name__)
+
+SUBMISSION_GRACE = timedelta(seconds=15)
+REFRESH_INTERVAL = 5  # seconds between looks for newly started competitions
+
+_END, _FINALIZE = 0, 1
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def accepts_results(competition, now=None):
+    """Whether results for ``competition`` can still be submitted."""
+    now = now or timezone.now()
+    return competition.started and now <= competition.end_time + SUBMISSION_GRACE
+
+
+def finalize(competition_id):
+    """Materialize the final ranking of an ended competition and close its race."""
+    leaderboard.rerank(competition_id)
+    progress.close_board(competition_id)
+
+
+class ExpiryScheduler:
+    """Heap of ``(due, competition_id, action)``; owned by the thread calling ``run``."""
+
+    def __init__(self):
+        self.heap = []
+        self.ends = {}  # competition_id -> end time of its current _END entry
+        self.watermark = None
+
+    def __len__(self):
+        return len(self.ends)
+
+    def schedule(self, competition_id, ends_at):
+        if self.ends.get(competition_id) == ends_at:
+            return
+        # Older entries for the competition stay in the heap and are skipped when popped.
+        self.ends[competition_id] = ends_at
+        heapq.heappush(self.heap, (ends_at, competition_id, _END))
+
+    def refresh(self, now=None):
+        """Schedule competitions started since the last refresh (every started one the first time)."""
+        now = now or timezone.now()
+        started = Competition.objects.with_end_time().filter(status='started')
+        if self.watermark is not None:
+            started = started.filter(start_time__gt=self.watermark)
+        self.watermark = now
+        for competition_id, ends_at in started.values_list('id', 'ends_at').iterator():
+            self.schedule(competition_id, ends_at)
+
+    def run_pending(self, now=None):
+        """Handle every entry that is due; returns when the next one is, or ``None``."""
+        now = now or timezone.now()
+        while self.heap and self.heap[0][0] <= now:
+            due, competition_id, action = heapq.heappop(self.heap)
+            if action == _FINALIZE:
+                finalize(competition_id)
+            elif self.ends.get(competition_id) == due:
+                del self.ends[competition_id]
+                self._end(competition_id, due, now)
+        return self.heap[0][0] if self.heap else None
+
+    def _end(self, competition_id, due, now):
+        if lifecycle.end(competition_id, now):
+            heapq.heappush(self.heap, (due + SUBMISSION_GRACE, competition_id, _FINALIZE))
+            return
+        ends_at = (
+            Competition.objects.with_end_time().filter(id=competition_id, status='started')
+            .values_list('ends_at', flat=True).first()
+        )
+        if ends_at is not None and ends_at > now:
+            self.schedule(competition_id, ends_at)
+
+    def run(self):
+        next_refresh = 0
+        while True:
+            next_due = None
+            try:
+                close_old_connections()
+                if time.monotonic() >= next_refresh:
+                    self.refresh()
+                    next_refresh = time.monotonic() + REFRESH_INTERVAL
+                next_due = self.run_pending()
+            except Exception:
+                # Entries that failed are picked up again by the next full refresh.
+                logger.exception('Ending competitions failed')
+                self.watermark = None
+            timeout = next_refresh - time.monotonic()
+            if next_due is not None:
+                timeout = min(timeout, (next_due - timezone.now()).total_seconds())
+            time.sleep(max(0, timeout))
+
+
+def ensure_scheduler():
+    """Start this process's scheduler thread, unless a ``run_expiry`` worker does the job."""
+    global _scheduler
+    if settings.COMPETITION_EXPIRY != 'thread':
+        return
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = ExpiryScheduler()
+            threading.Thread(target=_scheduler.run, name='competition-expiry', daemon=True).start()
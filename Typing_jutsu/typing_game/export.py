@@ -0,0 +1,112 @@
+"""
+Streaming export of competition results as CSV or NDJSON.
+
+Results are read with ``.iterator(chunk_size=...)`` (a server-side cursor on
+PostgreSQL) and encoded row by row into output blocks of about
+``BLOCK_SIZE`` bytes, optionally gzipped on the fly. Nothing holds more than
+a chunk of rows at a time, so an export of millions of results runs in
+constant memory, whether it goes to an HTTP response (``export_results``
+view, through ``astream``) or to a file (``manage.py export_results``).
+"""
+import csv
+import json
+import zlib
+
+from asgiref.sync import sync_to_async
+
+from .models import CompetitionResult
+
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+CHUNK_SIZE = 2000  # rows fetched from the database at a time
+BLOCK_SIZE = 64 * 1024  # bytes per yielded block
+
+COLUMNS = [
+    'competition_id', 'competition', 'participant', 'rank', 'score', 'wpm', 'accuracy', 'time_taken',
+    'total_keystrokes', 'correct_keystrokes', 'num_correct', 'total_questions', 'submitted_at',
+]
+_FIELDS = [
+    'competition_id', 'competition__title', 'participant__name', 'rank', 'score', 'wpm', 'accuracy', 'time_taken',
+    'total_keystrokes', 'correct_keystrokes', 'num_correct', 'total_questions', 'submitted_at',
+]
+
+
+def results(competition_id=None, organizer_id=None, since=None, until=None):
+    """Result rows (tuples in ``COLUMNS`` order) matching the filters, by competition and rank."""
+    queryset = CompetitionResult.objects.all()
+    if competition_id is not None:
+        queryset = queryset.filter(competition_id=competition_id)
+    if organizer_id is not None:
+        queryset = queryset.filter(competition__organizer_id=organizer_id)
+    if since is not None:
+        queryset = queryset.filter(submitted_at__gte=since)
+    if until is not None:
+        queryset = queryset.filter(submitted_at__lt=until)
+    return queryset.order_by('competition_id', 'rank', 'id').values_list(*_FIELDS)
+
+
+class _Buffer:
+    """Collects what ``csv.writer`` writes so it can be handed out in blocks."""
+
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+
+    def write(self, text):
+        self.parts.append(text)
+        self.size += len(text)
+
+    def take(self):
+        text = ''.join(self.parts)
+        self.parts.clear()
+        self.size = 0
+        return text
+
+
+def _csv_blocks(rows):
+    buffer = _Buffer()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for row in rows:
+        writer.writerow(row[:-1] + (row[-1].isoformat(),))
+        if buffer.size >= BLOCK_SIZE:
+            yield buffer.take()
+    yield buffer.take()
+
+
+def _ndjson_blocks(rows):
+    buffer = _Buffer()
+    for row in rows:
+        record = dict(zip(COLUMNS, row))
+        record['submitted_at'] = record['submitted_at'].isoformat()
+        buffer.write(json.dumps(record, separators=(',', ':')) + '\n')
+        if buffer.size >= BLOCK_SIZE:
+            yield buffer.take()
+    yield buffer.take()
+
+
+def _gzipped(blocks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip header and trailer
+    for block in blocks:
+        compressed = compressor.compress(block)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def stream(rows, format='csv', gzip=False, chunk_size=CHUNK_SIZE):
+    """Encode ``rows`` (from ``results``) into blocks of bytes."""
+    encode = _csv_blocks if format == 'csv' else _ndjson_blocks
+    blocks = (block.encode() for block in encode(rows.iterator(chunk_size=chunk_size)) if block)
+    return _gzipped(blocks) if gzip else blocks
+
+
+async def astream(rows, format='csv', gzip=False, chunk_size=CHUNK_SIZE):
+    """``stream`` for async responses: each block is produced on the sync thread.
+
+    Under ASGI Django would turn a sync iterator into a list before sending
+    anything; pulling one block per thread hop keeps the export streaming.
+    """
+    blocks = stream(rows, format, gzip, chunk_size)
+    next_block = sync_to_async(next)
+    while (block := await next_block(blocks, None)) is not None:
+        yield block
@@ -0,0 +1,109 @@
+"""
+Cache-backed identity of the logged-in user.
+
+``IdentityMiddleware`` sets ``request.profile`` to a lazy object that resolves
+to the session's ``Participant`` or ``Organizer`` (or ``None``). Its id and
+name are read from the cache, so an authenticated page view normally costs no
+identity query at all; other fields, the password hash included, are never
+cached and load from the database if read. Saving or deleting a profile
+evicts its cache entry, but only in this process's cache when it is
+per-process (``LocMemCache``), so entries also expire after a few minutes.
+"""
+from django.core.cache import cache
+from django.db import connection
+from django.db.models.signals import post_delete, post_save
+
+from .models import Participant, Organizer
+
+PROFILE_TIMEOUT = 5 * 60  # Bounds how stale another worker's copy can be
+PROFILE_FIELDS = ['id', 'name']  # All that pages read
+PROFILE_MODELS = {'participant': Participant, 'organizer': Organizer}
+_MISSING = 'missing'  # Cached marker for a session whose user no longer exists
+
+# Written out by hand: building the equivalent ORM union costs more than the
+# query itself. Both sides are served by the index on ``name``.
+_FIND_BY_NAME_SQL = (
+    'SELECT 0, id, name, password, NULL, NULL FROM {participants} WHERE name = %s '
+    'UNION ALL '
+    'SELECT 1, id, name, password, email, mobile_num FROM {organizers} WHERE name = %s '
+    'ORDER BY 1, 2 LIMIT 1'
+).format(
+    participants=connection.ops.quote_name(Participant._meta.db_table),
+    organizers=connection.ops.quote_name(Organizer._meta.db_table),
+)
+
+
+def _cache_key(role, user_id):
+    return f'profile:{role}:{user_id}'
+
+
+def _cached(profile):
+    return tuple(getattr(profile, field) for field in PROFILE_FIELDS)
+
+
+def get_profile(role, user_id):
+    """Return the profile for a session's role and user id, or ``None``.
+
+    Fields other than ``PROFILE_FIELDS`` are deferred.
+    """
+    model = PROFILE_MODELS.get(role)
+    if model is None or user_id is None:
+        return None
+    key = _cache_key(role, user_id)
+    values = cache.get(key)
+    if values is None:
+        values = model.objects.filter(id=user_id).values_list(*PROFILE_FIELDS).first() or _MISSING
+        cache.set(key, values, PROFILE_TIMEOUT)
+    if values == _MISSING:
+        return None
+    return model.from_db('default', PROFILE_FIELDS, values)
+
+
+def find_account(identifier):
+    """Resolve a login identifier to ``(role, profile)``, or ``(None, None)``.
+
+    An email can only belong to an organizer. A name is looked up in both
+    tables with one indexed ``UNION`` query; participant names are unique and
+    win over an organizer with the same name, as they always have. The
+    participant's ``created_at`` is left deferred.
+    """
+    if '@' in identifier:
+        organizer = Organizer.objects.filter(email=identifier).first()
+        return ('organizer', organizer) if organizer else (None, None)
+
+    with connection.cursor() as cursor:
+        cursor.execute(_FIND_BY_NAME_SQL, [identifier, identifier])
+        row = cursor.fetchone()
+    if row is None:
+        return None, None
+    # from_db() expects the values in model field order
+    priority, user_id, name, password, email, mobile_num = row
+    if priority == 0:
+        return 'participant', Participant.from_db('default', ['id', 'name', 'password'], [user_id, name, password])
+    return 'organizer', Organizer.from_db(
+        'default', ['id', 'name', 'email', 'mobile_num', 'password'], [user_id, name, email, mobile_num, password]
+    )
+
+
+def remember_profile(role, profile):
+    """Prime the cache right after login."""
+    cache.set(_cache_key(role, profile.id), _cached(profile), PROFILE_TIMEOUT)
+
+
+async def aremember_profile(role, profile):
+    await cache.aset(_cache_key(role, profile.id), _cached(profile), PROFILE_TIMEOUT)
+
+
+def forget_profile(role, user_id):
+    cache.delete(_cache_key(role, user_id))
+
+
+def _invalidate(sender, instance, **kwargs):
+    role = 'participant' if sender is Participant else 'organizer'
+    forget_profile(role, instance.id)
+
+
+def connect_signals():
+    for model in PROFILE_MODELS.values():
+        post_save.connect(_invalidate, sender=model, dispatch_uid=f'identity-save-{model.__name__}')
+        post_delete.connect(_invalidate, sender=model, dispatch_uid=f'identity-delete-{model.__name__}')
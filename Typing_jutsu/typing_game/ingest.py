@@ -0,0 +1,303 @@
+"""
+Batched ingestion of end-of-race results.
+
+Every racer's timer expires in the same second, so with
+``RESULT_INGEST_MODE = 'batched'`` ``submit_result`` scores the submission and
+hands it to ``enqueue`` instead of writing it. The entry is appended to this
+worker's write-ahead file and fsynced before the request is acknowledged;
+submissions arriving together share one fsync (group commit). A
+background writer then upserts everything pending into ``competition_results``
+in bulk, at most ``RESULT_INGEST_FLUSH_INTERVAL`` seconds later.
+
+The write-ahead file *is* the queue: on flush it is rotated into a numbered
+segment, the segment is written to the database and only then deleted.
+Segments left behind by a worker that died are claimed and replayed by the
+next writer to start (or by ``manage.py flush_results``), merged in the order
+their entries were submitted. Replaying is safe because the upsert is keyed
+on (competition, participant) and the newest submission wins.
+"""
+import atexit
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+
+from . import leaderboard, stats
+from .models import Competition, CompetitionResult
+
+logger = logging.getLogger(__name__)
+
+RESULT_FIELDS = [
+    'wpm', 'accuracy', 'time_taken', 'total_keystrokes', 'correct_keystrokes',
+    'num_correct', 'total_questions', 'score',
+]
+SEGMENT_PATTERN = re.compile(r'^results-(\d+)\.wal(?:\.(\d+)\.flushing)?$')
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def read_segment(path):
+    with open(path, encoding='utf-8') as segment:
+        # A crash mid-append can leave a torn last line; it was never acknowledged.
+        entries = []
+        for line in segment:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                logger.warning('Skipping torn entry in %s', path)
+        return entries
+
+
+def _previous_results(keys):
+    """Stats fields of the stored results a batch is about to replace, by (competition, participant)."""
+    keys = set(keys)
+    rows = CompetitionResult.objects.select_for_update().filter(
+        competition_id__in={competition_id for competition_id, _ in keys},
+        participant_id__in={participant_id for _, participant_id in keys},
+    ).values_list('competition_id', 'participant_id', *stats.RESULT_FIELDS)
+    return {
+        (competition_id, participant_id): dict(zip(stats.RESULT_FIELDS, values))
+        for competition_id, participant_id, *values in rows if (competition_id, participant_id) in keys
+    }
+
+
+def _roll_up(results, previous):
+    competitions = Competition.objects.only('title', 'type').in_bulk({result.competition_id for result in results})
+    stats.apply_changes([
+        (
+            result.participant_id, competitions[result.competition_id],
+            previous.get((result.competition_id, result.participant_id)),
+            {field: getattr(result, field) for field in stats.RESULT_FIELDS},
+        )
+        for result in results
+        if result.competition_id in competitions  # A deleted one fails the write anyway
+    ])
+
+
+def write_results(entries):
+    """Upsert ``entries`` into ``competition_results`` and re-rank the affected competitions."""
+    latest = {}
+    for entry in entries:
+        latest[(entry['c'], entry['p'])] = entry['f']
+    results = [
+        CompetitionResult(competition_id=competition_id, participant_id=participant_id, **fields)
+        for (competition_id, participant_id), fields in latest.items()
+    ]
+    try:
+        with transaction.atomic():
+            previous = _previous_results(latest)
+            CompetitionResult.objects.bulk_create(
+                results, batch_size=500, update_conflicts=True,
+                unique_fields=['competition', 'participant'], update_fields=RESULT_FIELDS,
+            )
+            _roll_up(results, previous)
+    except IntegrityError:
+        # A competition or participant was deleted after submitting; write
+        # row by row so one stale entry doesn't hold back the whole batch.
+        for result in results:
+            try:
+                with transaction.atomic():
+                    previous = _previous_results([(result.competition_id, result.participant_id)])
+                    CompetitionResult.objects.bulk_create(
+                        [result], update_conflicts=True,
+                        unique_fields=['competition', 'participant'], update_fields=RESULT_FIELDS,
+                    )
+                    _roll_up([result], previous)
+            except IntegrityError:
+                logger.warning('Dropping result for missing competition %s / participant %s',
+                               result.competition_id, result.participant_id)
+    for competition_id in {competition_id for competition_id, _ in latest}:
+        leaderboard.rerank(competition_id)
+    return len(results)
+
+
+class ResultWriter:
+    """Write-ahead queue of results owned by one worker process."""
+
+    def __init__(self, directory, flush_interval, batch_size):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.pid = os.getpid()
+        self.wal_path = os.path.join(directory, f'results-{self.pid}.wal')
+        self.segment = 0
+        self.pending = 0
+        self.appended = 0  # Entries appended to the write-ahead file so far
+        self.synced = 0  # ... and how many of them an fsync has covered
+        self.condition = threading.Condition()
+        self.sync_lock = threading.Lock()  # Taken before ``condition`` where both are held
+        self.flush_lock = threading.Lock()
+        self.claim_orphans()
+        self.wal = open(self.wal_path, 'a', encoding='utf-8')
+
+    def claim_orphans(self):
+        """Take over write-ahead files of workers that are no longer running.
+
+        That includes files under this process's own PID: a restarted
+        container often gets the PID of the worker it replaces. Its segments
+        are already named for this writer, so numbering continues after
+        them; its live file is claimed like any other orphan's. When more
+        than one file is claimed, their entries are merged into a single
+        segment in submission order, so an older submission left by one
+        worker never overwrites a newer one left by another.
+        """
+        claimed, orphans = [], []
+        for name in os.listdir(self.directory):
+            match = SEGMENT_PATTERN.match(name)
+            if not match:
+                continue
+            pid, segment = int(match.group(1)), int(match.group(2) or 0)
+            if pid == self.pid and segment:
+                self.segment = max(self.segment, segment)
+                claimed.append((segment, name))
+                continue
+            if pid != self.pid and _process_alive(pid):
+                continue
+            # A dead worker's flushed segments are older than its live file.
+            orphans.append((pid, segment or float('inf'), name))
+        claimed = [os.path.join(self.directory, name) for _, name in sorted(claimed)]
+        for _, _, name in sorted(orphans):
+            self.segment += 1
+            try:
+                os.replace(os.path.join(self.directory, name), self._segment_path(self.segment))
+            except FileNotFoundError:
+                continue  # Another worker claimed it first
+            claimed.append(self._segment_path(self.segment))
+        if len(claimed) > 1:
+            self._merge(claimed)
+
+    def _merge(self, paths):
+        # Entries from before submission times were recorded sort first, in file order.
+        entries = sorted((entry for path in paths for entry in read_segment(path)), key=lambda entry: entry.get('s', 0))
+        self.segment += 1
+        merged = self._segment_path(self.segment)
+        # Written aside and renamed, so a crash never leaves a partial merge to replay last.
+        with open(merged + '.tmp', 'w', encoding='utf-8') as segment:
+            segment.writelines(json.dumps(entry, separators=(',', ':')) + '\n' for entry in entries)
+            segment.flush()
+            os.fsync(segment.fileno())
+        os.replace(merged + '.tmp', merged)
+        for path in paths:
+            os.remove(path)
+
+    def _segment_path(self, number):
+        return f'{self.wal_path}.{number}.flushing'
+
+    def enqueue(self, competition_id, participant_id, fields):
+        entry = {'c': competition_id, 'p': participant_id, 'f': fields, 's': time.time()}
+        line = json.dumps(entry, separators=(',', ':'))
+        with self.condition:
+            self.wal.write(line + '\n')
+            self.wal.flush()
+            self.appended += 1
+            position = self.appended
+            self.pending += 1
+            if self.pending >= self.batch_size:
+                self.condition.notify()
+        self._sync(position)
+
+    def _sync(self, position):
+        """Return once the entry appended at ``position`` is on disk.
+
+        One fsync covers every entry appended before it started, so a burst
+        of submissions waits for a few fsyncs instead of one each.
+        """
+        with self.sync_lock:
+            if self.synced >= position:
+                return  # Another submitter's fsync covered it
+            with self.condition:
+                fileno, covered = self.wal.fileno(), self.appended
+            os.fsync(fileno)
+            self.synced = covered
+
+    def _rotate(self):
+        with self.sync_lock, self.condition:
+            if not self.pending:
+                return
+            os.fsync(self.wal.fileno())
+            self.synced = self.appended
+            self.wal.close()
+            self.segment += 1
+            os.replace(self.wal_path, self._segment_path(self.segment))
+            self.wal = open(self.wal_path, 'a', encoding='utf-8')
+            self.pending = 0
+
+    def flush(self):
+        """Write every pending segment to the database; returns the number of results written."""
+        with self.flush_lock:
+            self._rotate()
+            prefix = os.path.basename(self.wal_path) + '.'
+            segments = sorted(
+                (int(name[len(prefix):].split('.')[0]), name)
+                for name in os.listdir(self.directory)
+                if name.startswith(prefix) and name.endswith('.flushing')
+            )
+            written = 0
+            for _, name in segments:
+                path = os.path.join(self.directory, name)
+                written += write_results(read_segment(path))
+                os.remove(path)
+            return written
+
+    def close(self):
+        """Flush everything and remove this worker's write-ahead file."""
+        if self.wal.closed:
+            return 0
+        written = self.flush()
+        with self.sync_lock, self.condition:
+            self.wal.close()
+            if not self.pending:
+                os.remove(self.wal_path)
+        return written
+
+    def run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending >= self.batch_size, timeout=self.flush_interval)
+            try:
+                close_old_connections()
+                self.flush()
+            except Exception:
+                # Segments stay on disk and are retried on the next pass.
+                logger.exception('Flushing batched results failed')
+
+
+def open_writer():
+    """Create a writer for this process, claiming segments left by dead workers."""
+    return ResultWriter(
+        settings.RESULT_INGEST_DIR,
+        settings.RESULT_INGEST_FLUSH_INTERVAL,
+        settings.RESULT_INGEST_BATCH_SIZE,
+    )
+
+
+def get_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None or _writer.pid != os.getpid():
+            _writer = open_writer()
+            threading.Thread(target=_writer.run, name='result-writer', daemon=True).start()
+            atexit.register(_writer.close)
+    return _writer
+
+
+def enqueue(competition_id, participant_id, fields):
+    """Durably queue a scored result; it reaches the database within one flush interval."""
+    get_writer().enqueue(competition_id, participant_id, fields)
@@ -0,0 +1,146 @@
+"""
+Jumble-words puzzles generated on the server.
+
+A Jumble-words competition stores only its answers. Every participant gets
+their own puzzle set: the answers in a seeded order, each with its letters
+shuffled by the same seeded RNG, so a participant sees the same puzzles
+after a reload while their neighbours see different ones. The page receives
+the jumbles and a salted hash of each answer, enough to tell the typist
+instantly whether they got it right without putting the answers in the page.
+Submitted answers are checked against the regenerated set on the server,
+which alone decides the score.
+"""
+import hashlib
+import hmac
+import json
+import math
+import random
+
+from django.conf import settings
+from django.utils import timezone
+
+from .scoring import ScoringError
+
+HASH_LENGTH = 16  # hex digits of each answer hash sent to the page
+MAX_ANSWER_LENGTH = 100
+MAX_ANSWERS_BYTES = 64 * 1024
+
+
+def normalize(answer):
+    """Answers match case-insensitively and ignore extra spaces."""
+    return ' '.join(answer.split()).lower()
+
+
+def can_jumble(answer):
+    """Whether ``answer`` has a jumble that differs from it (``"a"`` and ``"zzz"`` don't)."""
+    return len(set(normalize(answer).replace(' ', ''))) > 1
+
+
+def jumble(answer, rng):
+    """Shuffle the letters of ``answer``, keeping its spaces; never returns the answer itself."""
+    answer = normalize(answer)
+    letters = answer.replace(' ', '')
+    shuffled = rng.sample(letters, len(letters))
+    if ''.join(shuffled) == letters:
+        # A rotation differs unless every letter is the same, which can_jumble() rules out
+        shuffled.append(shuffled.pop(0))
+    shuffled = iter(shuffled)
+    return ''.join(' ' if char == ' ' else next(shuffled) for char in answer)
+
+
+def puzzle_set(answers, seed):
+    """``[(jumble, answer), ...]`` for ``answers`` in the order and shuffle given by ``seed``."""
+    rng = random.Random(seed)
+    order = rng.sample(answers, len(answers))
+    return [(jumble(answer, rng), answer) for answer in order]
+
+
+def _keyed(message):
+    return hmac.new(settings.SECRET_KEY.encode(), message.encode(), hashlib.sha256).digest()
+
+
+def participant_seed(competition_id, participant_id):
+    """A participant's shuffle seed; keyed with SECRET_KEY and never sent to the page.
+
+    Whoever knows the seed can replay the shuffle and undo every jumble.
+    """
+    return int.from_bytes(_keyed(f'jumble:{competition_id}:{participant_id}')[:8], 'big')
+
+
+def participant_salt(competition_id, participant_id):
+    """The salt of a participant's answer hashes, derived separately from their seed."""
+    return _keyed(f'salt:{competition_id}:{participant_id}')[:8].hex()
+
+
+def answer_hash(salt, answer):
+    """What the page compares a typed answer against: ``sha256("<salt>:<answer>")``, truncated."""
+    return hashlib.sha256(f'{salt}:{normalize(answer)}'.encode()).hexdigest()[:HASH_LENGTH]
+
+
+def competition_answers(competition):
+    return [item['answer'] for item in competition.paragraphs if item.get('answer')]
+
+
+def client_puzzles(competition, participant_id):
+    """The puzzle set for the page: jumbles and salted answer hashes, no answers."""
+    seed = participant_seed(competition.id, participant_id)
+    salt = participant_salt(competition.id, participant_id)
+    return {
+        'salt': salt,
+        'puzzles': [
+            {'text': text, 'hash': answer_hash(salt, answer)}
+            for text, answer in puzzle_set(competition_answers(competition), seed)
+        ],
+    }
+
+
+def parse_answers(raw):
+    """Decode the submitted answers, a JSON list of strings in puzzle order."""
+    if not raw:
+        return []
+    if len(raw) > MAX_ANSWERS_BYTES:
+        raise ScoringError('Too many answers.')
+    try:
+        answers = json.loads(raw)
+    except ValueError:
+        raise ScoringError('Malformed answers.')
+    if not isinstance(answers, list) or not all(isinstance(answer, str) for answer in answers):
+        raise ScoringError('Answers must be a list of words.')
+    if not all(normalize(answer) for answer in answers):
+        raise ScoringError('Answers must not be blank.')
+    return [answer[:MAX_ANSWER_LENGTH] for answer in answers]
+
+
+def score_submission(competition, participant_id, raw_answers, time_taken=None, submitted_at=None):
+    """Check a participant's answers and return the result fields for ``CompetitionResult``.
+
+    The score is 80 points for the share of correct answers plus up to 20
+    for finishing early. Only a full set of answers finishes early, and the
+    bonus is scaled by the share answered correctly, so rushing through
+    wrong answers earns none of it. The time taken is
+    measured on the server, from the start of the race to ``submitted_at``;
+    the client's ``time_taken`` is only checked to be a number.
+    """
+    if time_taken is not None and not math.isfinite(float(time_taken)):
+        raise ScoringError('Time taken must be a finite number.')
+    puzzles = puzzle_set(competition_answers(competition), participant_seed(competition.id, participant_id))
+    typed = parse_answers(raw_answers)
+    if len(typed) > len(puzzles):
+        raise ScoringError('More answers than puzzles.')
+    correct = sum(normalize(answer) == normalize(expected) for answer, (_, expected) in zip(typed, puzzles))
+
+    duration = competition.duration * 60
+    elapsed = ((submitted_at or timezone.now()) - competition.start_time).total_seconds()
+    taken = min(max(elapsed, 0), duration)
+    accuracy_score = correct / len(puzzles) * 80 if puzzles else 0
+    finished = puzzles and len(typed) == len(puzzles)
+    time_bonus = (duration - taken) / duration * 20 * correct / len(puzzles) if finished and duration else 0
+    return {
+        'score': round(accuracy_score + time_bonus, 2),
+        'time_taken': round(taken, 2),
+        'num_correct': correct,
+        'total_questions': len(puzzles),
+        # Typing-specific fields
+        'wpm': 0,
+        'accuracy': 0,
+    }
@@ -0,0 +1,92 @@
+"""
+Incrementally maintained competition rankings.
+
+Every ``CompetitionResult`` stores its ``rank`` within its competition and every
+``Competition`` stores its ``result_count``, so leaderboard pages read ranks
+straight from an index instead of sorting every result on each view. Ranks
+are updated when a result is placed or removed, with ties broken by score
+(highest first), then time taken, then submission time.
+"""
+from django.db import transaction
+from django.db.models import F, Q
+
+from .models import Competition, CompetitionResult
+
+TOP_N = 10
+RANKING_ORDER = ('-score', 'time_taken', 'submitted_at', 'id')
+
+
+def _ranked_ahead_of(result):
+    """Results of the same competition that rank above ``result``."""
+    same_score = Q(score=result.score)
+    same_time = same_score & Q(time_taken=result.time_taken)
+    same_submission = same_time & Q(submitted_at=result.submitted_at)
+    return (
+        Q(score__gt=result.score)
+        | same_score & Q(time_taken__lt=result.time_taken)
+        | same_time & Q(submitted_at__lt=result.submitted_at)
+        | same_submission & Q(id__lt=result.id)
+    )
+
+
+def _lock_competition(competition_id):
+    # Serializes rank updates of one competition across workers.
+    Competition.objects.select_for_update().filter(id=competition_id).values_list('id').first()
+
+
+def _others(result):
+    return CompetitionResult.objects.filter(competition_id=result.competition_id).exclude(id=result.id)
+
+
+@transaction.atomic
+def place(result, created):
+    """Rank a newly saved or re-submitted result and shift the results below it."""
+    _lock_competition(result.competition_id)
+    others = _others(result)
+    if created:
+        Competition.objects.filter(id=result.competition_id).update(result_count=F('result_count') + 1)
+    elif result.rank:
+        others.filter(rank__gt=result.rank).update(rank=F('rank') - 1)
+
+    result.rank = others.filter(_ranked_ahead_of(result)).count() + 1
+    others.filter(rank__gte=result.rank).update(rank=F('rank') + 1)
+    CompetitionResult.objects.filter(id=result.id).update(rank=result.rank)
+
+
+@transaction.atomic
+def remove(result):
+    """Delete a result and close the gap it leaves in the ranking; returns ``False`` if it was already gone."""
+    _lock_competition(result.competition_id)
+    rank = CompetitionResult.objects.filter(id=result.id).values_list('rank', flat=True).first()
+    if rank is None:
+        return False
+    result.delete()
+    CompetitionResult.objects.filter(competition_id=result.competition_id, rank__gt=rank).update(rank=F('rank') - 1)
+    Competition.objects.filter(id=result.competition_id).update(result_count=F('result_count') - 1)
+    return True
+
+
+def rerank(competition_id):
+    """Recompute ranks and the result count of a competition from scratch."""
+    with transaction.atomic():
+        _lock_competition(competition_id)
+        results = list(CompetitionResult.objects.filter(competition_id=competition_id).order_by(*RANKING_ORDER))
+        for rank, result in enumerate(results, start=1):
+            result.rank = rank
+        CompetitionResult.objects.bulk_update(results, ['rank'], batch_size=500)
+        Competition.objects.filter(id=competition_id).update(result_count=len(results))
+
+
+def attach_top_results(competitions, limit=TOP_N):
+    """Set ``top_results`` on each competition using a single query."""
+    by_competition = {competition.id: competition for competition in competitions}
+    for competition in competitions:
+        competition.top_results = []
+    top = (
+        CompetitionResult.objects.filter(competition_id__in=by_competition, rank__lte=limit)
+        .select_related('participant')
+        .order_by('competition_id', 'rank')
+    )
+    for result in top:
+        by_competition[result.competition_id].top_results.append(result)
+    return competitions
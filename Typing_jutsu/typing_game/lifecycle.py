@@ -0,0 +1,54 @@
+"""
+The competition state machine: waiting -> active -> started -> ended.
+
+Every transition is one conditional ``UPDATE ... WHERE status IN (...)``
+that writes only the columns it changes, so of two concurrent requests (or
+two expiry schedulers) exactly one wins, and the paragraphs JSON is never rewritten.
+Each function returns whether the transition happened; callers only run
+their side effects when it did. Deactivating sends an active or started
+competition back to waiting.
+"""
+from datetime import timedelta
+
+from django.utils import timezone
+
+from . import status
+from .models import Competition
+
+START_DELAY = timedelta(seconds=10)  # Countdown between "start" and the race
+
+
+def _transition(competition_id, sources, target, organizer_id=None, **changes):
+    competitions = Competition.objects.filter(id=competition_id, status__in=sources)
+    if organizer_id is not None:
+        competitions = competitions.filter(organizer_id=organizer_id)
+    won = competitions.update(status=target, **changes) == 1
+    if won:
+        status.bump_version(competition_id)
+    return won
+
+
+def activate(competition_id, organizer_id):
+    return _transition(competition_id, ['waiting'], 'active', organizer_id)
+
+
+def start(competition_id, organizer_id):
+    """Start an active competition; returns its new start time, or ``None``."""
+    start_time = timezone.now() + START_DELAY
+    if _transition(competition_id, ['active'], 'started', organizer_id, started=True, start_time=start_time):
+        return start_time
+    return None
+
+
+def deactivate(competition_id, organizer_id):
+    return _transition(competition_id, ['active', 'started'], 'waiting', organizer_id, started=False)
+
+
+def end(competition_id, now=None):
+    """End a started competition, but only once its end time has passed."""
+    now = now or timezone.now()
+    competitions = Competition.objects.with_end_time().filter(id=competition_id, status='started', ends_at__lte=now)
+    won = competitions.update(status='ended', expired=True) == 1
+    if won:
+        status.bump_version(competition_id)
+    return won
@@ -0,0 +1,89 @@
+from django.core.management.base import BaseCommand
+
+from typing_game import benchmarks
+
+
+class Command(BaseCommand):
+    help = "Run a load benchmark against a throwaway test database."
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+        status = subparsers.add_parser('status', help=benchmarks.status_polling.__doc__)
+        status.add_argument('--pollers', type=int, default=300)
+        status.add_argument('--seconds', type=float, default=5.0)
+
+        race = subparsers.add_parser('progress', help=benchmarks.race_progress.__doc__)
+        race.add_argument('--racers', type=int, default=1000)
+        race.add_argument('--viewers', type=int, default=1000)
+        race.add_argument('--ticks', type=int, default=40)
+
+        score = subparsers.add_parser('scoring', help=benchmarks.keystroke_scoring.__doc__)
+        score.add_argument('--seconds', type=int, default=300)
+        score.add_argument('--submissions', type=int, default=1000)
+
+        login = subparsers.add_parser('login', help=benchmarks.login_burst.__doc__)
+        login.add_argument('--users', type=int, default=1000)
+
+        hashing = subparsers.add_parser('passwords', help=benchmarks.password_policies.__doc__)
+        hashing.add_argument('--logins', type=int, default=50)
+
+        lobby = subparsers.add_parser('lobby', help=benchmarks.lobby_handlers.__doc__)
+        lobby.add_argument('--clients', type=int, default=200)
+        lobby.add_argument('--idle', type=int, default=1000)
+        lobby.add_argument('--seconds', type=float, default=5.0)
+        lobby.add_argument('--threads', type=int, default=8)
+
+        expire = subparsers.add_parser('expiry', help=benchmarks.competition_expiry.__doc__)
+        expire.add_argument('--competitions', type=int, default=5000)
+        expire.add_argument('--finished', type=int, default=500)
+
+        joins = subparsers.add_parser('joins', help=benchmarks.concurrent_joins.__doc__)
+        joins.add_argument('--joins', type=int, default=1000)
+        joins.add_argument('--threads', type=int, default=16)
+
+        practice = subparsers.add_parser('practice', help=benchmarks.practice_texts.__doc__)
+        practice.add_argument('--paragraphs', type=int, default=20000)
+        practice.add_argument('--loads', type=int, default=2000)
+
+        puzzles = subparsers.add_parser('jumble', help=benchmarks.jumble_puzzles.__doc__)
+        puzzles.add_argument('--participants', type=int, default=2000)
+        puzzles.add_argument('--words', type=int, default=50)
+
+        profile = subparsers.add_parser('stats', help=benchmarks.participant_stats.__doc__)
+        profile.add_argument('--races', type=int, default=5000)
+        profile.add_argument('--reads', type=int, default=500)
+
+        dump = subparsers.add_parser('export', help=benchmarks.results_export.__doc__)
+        dump.add_argument('--competitions', type=int, default=200)
+        dump.add_argument('--racers', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        write = self.stdout.write
+        if options['benchmark'] == 'status':
+            benchmarks.status_polling(write, pollers=options['pollers'], seconds=options['seconds'])
+        elif options['benchmark'] == 'progress':
+            benchmarks.race_progress(write, racers=options['racers'], viewers=options['viewers'], ticks=options['ticks'])
+        elif options['benchmark'] == 'scoring':
+            benchmarks.keystroke_scoring(write, seconds=options['seconds'], submissions=options['submissions'])
+        elif options['benchmark'] == 'login':
+            benchmarks.login_burst(write, users=options['users'])
+        elif options['benchmark'] == 'passwords':
+            benchmarks.password_policies(write, logins=options['logins'])
+        elif options['benchmark'] == 'lobby':
+            benchmarks.lobby_handlers(
+                write, clients=options['clients'], idle=options['idle'],
+                seconds=options['seconds'], threads=options['threads'],
+            )
+        elif options['benchmark'] == 'expiry':
+            benchmarks.competition_expiry(write, competitions=options['competitions'], finished=options['finished'])
+        elif options['benchmark'] == 'joins':
+            benchmarks.concurrent_joins(write, joins=options['joins'], threads=options['threads'])
+        elif options['benchmark'] == 'practice':
+            benchmarks.practice_texts(write, paragraphs=options['paragraphs'], loads=options['loads'])
+        elif options['benchmark'] == 'jumble':
+            benchmarks.jumble_puzzles(write, participants=options['participants'], words=options['words'])
+        elif options['benchmark'] == 'stats':
+            benchmarks.participant_stats(write, races=options['races'], reads=options['reads'])
+        elif options['benchmark'] == 'export':
+            benchmarks.results_export(write, competitions=options['competitions'], racers=options['racers'])
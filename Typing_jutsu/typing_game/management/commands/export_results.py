@@ -0,0 +1,49 @@
+import sys
+import time
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from typing_game import export, metrics
+
+
+class Command(BaseCommand):
+    help = "Stream competition results to a CSV or NDJSON file in constant memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--competition', type=int)
+        parser.add_argument('--organizer', type=int)
+        parser.add_argument('--since', help="Only results submitted at or after this ISO datetime.")
+        parser.add_argument('--until', help="Only results submitted before this ISO datetime.")
+        parser.add_argument('--format', choices=sorted(export.FORMATS), default='csv')
+        parser.add_argument('--gzip', action='store_true', help="Compress the output (implied by a .gz file name).")
+        parser.add_argument('--chunk-size', type=int, default=export.CHUNK_SIZE)
+        parser.add_argument('-o', '--output', default='-', help="File to write; '-' is standard output.")
+
+    def _datetime(self, value):
+        if value is None:
+            return None
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise CommandError(f"Invalid datetime: {value}")
+        return parsed
+
+    def handle(self, *args, **options):
+        rows = export.results(
+            options['competition'], options['organizer'],
+            self._datetime(options['since']), self._datetime(options['until']),
+        )
+        gzipped = options['gzip'] or options['output'].endswith('.gz')
+        started = time.perf_counter()
+        written = 0
+        try:
+            target = nullcontext(sys.stdout.buffer) if options['output'] == '-' else open(options['output'], 'wb')
+        except OSError as e:
+            raise CommandError(f"Could not open {options['output']}: {e}")
+        with target as output:
+            for block in export.stream(rows, options['format'], gzipped, options['chunk_size']):
+                output.write(block)
+                written += len(block)
+        elapsed = time.perf_counter() - started
+        self.stderr.write(f"{written / 2**20:.1f} MiB written in {elapsed:.1f} s, peak RSS {metrics.peak_rss()}")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from typing_game import ingest
+
+
+class Command(BaseCommand):
+    help = "Write batched results left in write-ahead files by stopped workers to the database."
+
+    def handle(self, *args, **options):
+        written = ingest.open_writer().close()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} result(s)."))
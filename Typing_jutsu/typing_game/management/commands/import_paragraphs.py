@@ -0,0 +1,37 @@
+import io
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from typing_game import corpus, metrics
+
+
+class Command(BaseCommand):
+    help = "Add the paragraphs of large text files (separated by blank lines) to the typing corpus."
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+', help="Text files to import; '-' reads standard input.")
+        parser.add_argument('--encoding', default='utf-8')
+        parser.add_argument('--batch-size', type=int, default=corpus.IMPORT_BATCH_SIZE)
+        parser.add_argument('--min-words', type=int, default=corpus.MIN_PARAGRAPH_WORDS)
+
+    def handle(self, *args, **options):
+        for path in options['files']:
+            started = time.perf_counter()
+            try:
+                if path == '-':
+                    source = io.TextIOWrapper(sys.stdin.buffer, encoding=options['encoding'], errors='replace')
+                else:
+                    source = open(path, encoding=options['encoding'], errors='replace')
+            except OSError as e:
+                raise CommandError(f"Could not open {path}: {e}")
+            with source:
+                stats = corpus.import_paragraphs(source, options['batch_size'], options['min_words'])
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(
+                f"{path}: {stats['read']} paragraphs read, {stats['added']} added, "
+                f"{stats['duplicates']} duplicates, {stats['skipped']} too short"
+            ))
+            self.stdout.write(f"  {elapsed:.1f} s, {stats['read'] / elapsed if elapsed else 0:.0f} paragraphs/s, "
+                              f"peak RSS {metrics.peak_rss()}")
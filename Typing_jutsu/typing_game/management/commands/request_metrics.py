@@ -0,0 +1,36 @@
+import json
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from typing_game import metrics
+
+
+class Command(BaseCommand):
+    help = "Show per-view latency, query count and DB time percentiles from a running server."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help="Base URL of the running server.")
+        parser.add_argument('--json', action='store_true', help="Print the raw JSON instead of a table.")
+
+    def handle(self, *args, **options):
+        if not settings.REQUEST_METRICS_TOKEN:
+            raise CommandError("Set REQUEST_METRICS_TOKEN to read metrics.")
+        request = Request(
+            options['url'].rstrip('/') + reverse('typing_game:metrics_api'),
+            headers={'Authorization': f'Bearer {settings.REQUEST_METRICS_TOKEN}'},
+        )
+        try:
+            with urlopen(request, timeout=10) as response:
+                rows = json.load(response)['views']
+        except OSError as e:
+            raise CommandError(f"Could not fetch metrics: {e}")
+
+        if options['json']:
+            self.stdout.write(json.dumps(rows, indent=2))
+        elif rows:
+            self.stdout.write(metrics.format_table(rows))
+        else:
+            self.stdout.write("No requests recorded yet.")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from typing_game import expiry
+
+
+class Command(BaseCommand):
+    help = "End competitions when their time is up (use with COMPETITION_EXPIRY=worker)."
+
+    def handle(self, *args, **options):
+        self.stdout.write("Ending competitions as they expire. Press Ctrl+C to stop.")
+        try:
+            expiry.ExpiryScheduler().run()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,47 @@
+from contextlib import ExitStack
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from typing_game import simulation
+from typing_game.benchmarks import FAST_HASHERS
+from typing_game.testing import isolated_database
+
+
+class Command(BaseCommand):
+    help = "Simulate a whole race under load and report each phase's throughput, latency and queries."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--participants', type=int, default=100)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--mode', choices=simulation.MODES, default='threads')
+        parser.add_argument('--polls', type=int, default=5, help="Status polls per participant in the lobby.")
+        parser.add_argument('--typing-seconds', type=int, default=30, help="Length of each submitted keystroke log.")
+        parser.add_argument(
+            '--url',
+            help="Base URL of a running server sharing this database, e.g. http://127.0.0.1:8000. "
+                 "Without it the app runs in this process against a throwaway test database.",
+        )
+        parser.add_argument(
+            '--fast-hashers', action='store_true',
+            help="In-process only: hash passwords with MD5 so signup and login time the app, not PBKDF2.",
+        )
+        parser.add_argument('--keep', action='store_true', help="With --url, keep the competition and participants.")
+
+    def handle(self, *args, **options):
+        race = simulation.RaceSimulation(
+            participants=options['participants'], concurrency=options['concurrency'], mode=options['mode'],
+            base_url=options['url'], polls=options['polls'], typing_seconds=options['typing_seconds'],
+        )
+        with ExitStack() as stack:
+            if not options['url']:
+                stack.enter_context(isolated_database(concurrent_writers=True))
+                stack.enter_context(override_settings(COMPETITION_EXPIRY='worker'))
+                if options['fast_hashers']:
+                    stack.enter_context(override_settings(PASSWORD_HASHERS=FAST_HASHERS))
+            race.setup()
+            try:
+                race.run(self.stdout.write)
+            finally:
+                if options['url'] and not options['keep']:
+                    race.teardown()
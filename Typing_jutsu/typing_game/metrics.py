@@ -0,0 +1,89 @@
+"""
+Rolling per-view request metrics.
+
+``RequestMetricsMiddleware`` records the wall time, number of database
+queries and database time of every request here. Each view keeps its most
+recent ``WINDOW`` samples in a ring buffer, so recording is a single append
+and percentiles are only computed when a report is asked for.
+"""
+import threading
+from collections import deque
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+WINDOW = 1024  # samples kept per view
+
+_samples = {}
+_lock = threading.Lock()
+
+
+def record(view, wall_ms, queries, db_ms):
+    samples = _samples.get(view)
+    if samples is None:
+        with _lock:
+            samples = _samples.setdefault(view, deque(maxlen=WINDOW))
+    samples.append((wall_ms, queries, db_ms))
+
+
+def reset():
+    with _lock:
+        _samples.clear()
+
+
+def peak_rss():
+    """Peak resident memory of this process for reports, e.g. ``'42 MiB'``; ``'n/a'`` where it isn't known."""
+    if resource is None:
+        return 'n/a'
+    return f'{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB'
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summarize(values):
+    ordered = sorted(values)
+    return {
+        'p50': _percentile(ordered, 0.50),
+        'p95': _percentile(ordered, 0.95),
+        'p99': _percentile(ordered, 0.99),
+    }
+
+
+def snapshot():
+    """Percentiles of the current window for every view, slowest p95 first."""
+    with _lock:
+        windows = {view: list(samples) for view, samples in _samples.items()}
+    rows = []
+    for view, samples in windows.items():
+        if not samples:
+            continue
+        wall, queries, db = zip(*samples)
+        rows.append({
+            'view': view,
+            'count': len(samples),
+            'wall_ms': summarize(wall),
+            'queries': summarize(queries),
+            'db_ms': summarize(db),
+        })
+    rows.sort(key=lambda row: row['wall_ms']['p95'], reverse=True)
+    return rows
+
+
+def format_table(rows):
+    """Render ``snapshot()`` rows as a fixed-width text table."""
+    header = (f"{'view':<42} {'count':>6}  {'wall p50/p95/p99 ms':>22}  "
+              f"{'queries p50/p95/p99':>20}  {'db p50/p95/p99 ms':>20}")
+    lines = [header, '-' * len(header)]
+    for row in rows:
+        wall, queries, db = row['wall_ms'], row['queries'], row['db_ms']
+        lines.append(
+            f"{row['view']:<42} {row['count']:>6}  "
+            f"{wall['p50']:>6.1f} {wall['p95']:>7.1f} {wall['p99']:>7.1f}  "
+            f"{queries['p50']:>6} {queries['p95']:>6} {queries['p99']:>6}  "
+            f"{db['p50']:>6.1f} {db['p95']:>6.1f} {db['p99']:>6.1f}"
+        )
+    return '\n'.join(lines)
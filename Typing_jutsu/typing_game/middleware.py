@@ -0,0 +1,72 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.utils.functional import SimpleLazyObject
+
+from . import identity, metrics
+
+
+class QueryTimer:
+    """Database execute wrapper that counts and times queries."""
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.queries += 1
+
+
+class RequestMetricsMiddleware:
+    """Record wall time, query count and DB time per view into ``metrics``.
+
+    Removed from the stack entirely unless ``REQUEST_METRICS_ENABLED`` is set,
+    so it costs nothing when turned off. It is deliberately sync-only: under
+    ASGI the rest of the request then runs on the thread whose database
+    connection is being timed, including the async ORM calls of async views.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        metrics.record(view, (time.perf_counter() - started) * 1000, timer.queries, timer.seconds * 1000)
+        return response
+
+
+class IdentityMiddleware:
+    """Attach the logged-in ``Participant``/``Organizer`` as ``request.profile``.
+
+    The profile is only looked up when something reads it, and then from the
+    cache (see ``identity.py``). Async views can't resolve it themselves; the
+    auth decorators resolve it for them in a worker thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        request.profile = SimpleLazyObject(
+            lambda: identity.get_profile(request.session.get('user_role'), request.session.get('user_id'))
+        )
+        return self.get_response(request)
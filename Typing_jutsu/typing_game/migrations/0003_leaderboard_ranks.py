@@ -0,0 +1,40 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:02
+
+from django.db import migrations, models
+
+
+def backfill_ranks(apps, schema_editor):
+    Competition = apps.get_model('typing_game', 'Competition')
+    CompetitionResult = apps.get_model('typing_game', 'CompetitionResult')
+    for competition in Competition.objects.all():
+        results = list(competition.results.order_by('-score', 'time_taken', 'submitted_at', 'id'))
+        for rank, result in enumerate(results, start=1):
+            result.rank = rank
+        CompetitionResult.objects.bulk_update(results, ['rank'], batch_size=500)
+        competition.result_count = len(results)
+        competition.save(update_fields=['result_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('typing_game', '0002_alter_competition_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='competition',
+            name='result_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='competitionresult',
+            name='rank',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='competitionresult',
+            index=models.Index(fields=['competition', 'rank'], name='result_competition_rank_idx'),
+        ),
+        migrations.RunPython(backfill_ranks, migrations.RunPython.noop),
+    ]
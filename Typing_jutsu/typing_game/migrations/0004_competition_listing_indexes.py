@@ -0,0 +1,21 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('typing_game', '0003_leaderboard_ranks'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='competition',
+            index=models.Index(fields=['start_time', 'id'], name='competition_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='competition',
+            index=models.Index(fields=['status', 'start_time'], name='competition_status_start_idx'),
+        ),
+    ]
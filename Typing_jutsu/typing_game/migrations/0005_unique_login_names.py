@@ -0,0 +1,36 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:11
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def rename_duplicate_participants(apps, schema_editor):
+    # The oldest account keeps the name; later ones get their id appended.
+    Participant = apps.get_model('typing_game', 'Participant')
+    duplicated = Participant.objects.values('name').annotate(n=Count('id')).filter(n__gt=1)
+    for row in duplicated:
+        for participant in Participant.objects.filter(name=row['name']).order_by('id')[1:]:
+            suffix = f'-{participant.id}'
+            participant.name = participant.name[:30 - len(suffix)] + suffix
+            participant.save(update_fields=['name'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('typing_game', '0004_competition_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_duplicate_participants, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='organizer',
+            name='name',
+            field=models.CharField(db_index=True, max_length=30),
+        ),
+        migrations.AlterField(
+            model_name='participant',
+            name='name',
+            field=models.CharField(max_length=30, unique=True),
+        ),
+    ]
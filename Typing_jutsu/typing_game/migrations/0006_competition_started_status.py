@@ -0,0 +1,30 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:28
+
+from django.db import migrations, models
+
+
+def split_started(apps, schema_editor):
+    """Started competitions used to be 'active' with ``started`` set."""
+    Competition = apps.get_model('typing_game', 'Competition')
+    Competition.objects.filter(status='active', started=True).update(status='started')
+
+
+def merge_started(apps, schema_editor):
+    Competition = apps.get_model('typing_game', 'Competition')
+    Competition.objects.filter(status='started').update(status='active')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('typing_game', '0005_unique_login_names'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='competition',
+            name='status',
+            field=models.CharField(choices=[('waiting', 'Waiting'), ('active', 'Active'), ('started', 'Started'), ('ended', 'Ended')], default='waiting', max_length=10),
+        ),
+        migrations.RunPython(split_started, merge_started),
+    ]
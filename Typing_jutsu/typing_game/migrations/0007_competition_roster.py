@@ -0,0 +1,39 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_participant_counts(apps, schema_editor):
+    Competition = apps.get_model('typing_game', 'Competition')
+    for competition in Competition.objects.annotate(joined=models.Count('participants')).filter(joined__gt=0):
+        Competition.objects.filter(id=competition.id).update(participant_count=competition.joined)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('typing_game', '0006_competition_started_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='competition',
+            name='participant_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='RosterChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('join', 'Join'), ('leave', 'Leave'), ('reset', 'Reset')], max_length=5)),
+                ('competition', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='roster_changes', to='typing_game.competition')),
+                ('participant', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='typing_game.participant')),
+            ],
+            options={
+                'db_table': 'roster_changes',
+                'indexes': [models.Index(fields=['competition', 'id'], name='roster_change_version_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_participant_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,105 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:37
+
+import hashlib
+import re
+import string
+from itertools import accumulate
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# A frozen copy of typing_game.corpus.analyze as of this migration, so later
+# changes to the live tokenizer or difficulty score don't alter history.
+_DROP_PUNCTUATION = str.maketrans('', '', string.punctuation)
+_AWKWARD_PATTERN = re.compile(r'[A-Z0-9]')
+
+
+def analyze(text):
+    text = ' '.join(text.split())
+    tokens = text.split(' ') if text else []
+    letters = len(text) - max(len(tokens) - 1, 0)
+    punctuation = len(text) - len(text.translate(_DROP_PUNCTUATION))
+    awkward = len(_AWKWARD_PATTERN.findall(text))
+    avg_word_length = letters / len(tokens) if tokens else 0.0
+    punctuation_density = punctuation / len(text) if text else 0.0
+    return {
+        'text': text,
+        'content_hash': hashlib.sha256(text.encode('utf-8')).hexdigest(),
+        'tokens': tokens,
+        'offsets': list(accumulate((len(token) + 1 for token in tokens[:-1]), initial=0)) if tokens else [],
+        'char_count': len(text),
+        'word_count': len(tokens),
+        'avg_word_length': round(avg_word_length, 3),
+        'punctuation_density': round(punctuation_density, 4),
+        'difficulty': round(avg_word_length + 20 * punctuation_density + 10 * (awkward / len(text) if text else 0), 3),
+    }
+
+
+def move_texts_to_corpus(apps, schema_editor):
+    Competition = apps.get_model('typing_game', 'Competition')
+    Paragraph = apps.get_model('typing_game', 'Paragraph')
+    CompetitionParagraph = apps.get_model('typing_game', 'CompetitionParagraph')
+    for competition in Competition.objects.exclude(type='Jumble-words').exclude(paragraphs=[]):
+        for position, item in enumerate(p for p in competition.paragraphs if p.get('text', '').strip()):
+            fields = analyze(item['text'])
+            paragraph, _ = Paragraph.objects.get_or_create(content_hash=fields.pop('content_hash'), defaults=fields)
+            CompetitionParagraph.objects.create(competition=competition, paragraph=paragraph, position=position)
+        competition.paragraphs = []
+        competition.save(update_fields=['paragraphs'])
+
+
+def move_texts_back(apps, schema_editor):
+    Competition = apps.get_model('typing_game', 'Competition')
+    CompetitionParagraph = apps.get_model('typing_game', 'CompetitionParagraph')
+    for competition in Competition.objects.exclude(type='Jumble-words'):
+        links = CompetitionParagraph.objects.filter(competition=competition).order_by('position')
+        competition.paragraphs = [{'text': text} for text in links.values_list('paragraph__text', flat=True)]
+        competition.save(update_fields=['paragraphs'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('typing_game', '0007_competition_roster'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Paragraph',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.TextField()),
+                ('content_hash', models.CharField(max_length=64, unique=True)),
+                ('tokens', models.JSONField(default=list)),
+                ('offsets', models.JSONField(default=list)),
+                ('char_count', models.PositiveIntegerField(default=0)),
+                ('word_count', models.PositiveIntegerField(default=0)),
+                ('avg_word_length', models.FloatField(default=0.0)),
+                ('punctuation_density', models.FloatField(default=0.0)),
+                ('difficulty', models.FloatField(db_index=True, default=0.0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'paragraphs',
+            },
+        ),
+        migrations.CreateModel(
+            name='CompetitionParagraph',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('competition', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='text_links', to='typing_game.competition')),
+                ('paragraph', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='typing_game.paragraph')),
+            ],
+            options={
+                'db_table': 'competition_paragraphs',
+                'unique_together': {('competition', 'position')},
+            },
+        ),
+        migrations.AddField(
+            model_name='competition',
+            name='texts',
+            field=models.ManyToManyField(related_name='competitions', through='typing_game.CompetitionParagraph', to='typing_game.paragraph'),
+        ),
+        migrations.RunPython(move_texts_to_corpus, move_texts_back),
+    ]
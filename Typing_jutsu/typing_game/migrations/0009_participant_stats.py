@@ -0,0 +1,61 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+RECENT_SIZE = 20  # stats.RECENT_SIZE when this was written
+
+
+def backfill_stats(apps, schema_editor):
+    CompetitionResult = apps.get_model('typing_game', 'CompetitionResult')
+    ParticipantStats = apps.get_model('typing_game', 'ParticipantStats')
+    rows = {}
+    results = CompetitionResult.objects.order_by('participant_id', '-submitted_at', '-id').values_list(
+        'participant_id', 'competition_id', 'competition__title', 'competition__type',
+        'wpm', 'accuracy', 'score', 'submitted_at',
+    )
+    for participant_id, competition_id, title, competition_type, wpm, accuracy, score, submitted_at in results.iterator():
+        stats = rows.setdefault(participant_id, ParticipantStats(participant_id=participant_id, recent=[]))
+        stats.races += 1
+        stats.score_total += score
+        stats.best_score = max(stats.best_score, score)
+        if competition_type in ('Normal', 'Reverse'):
+            stats.typing_races += 1
+            stats.wpm_total += wpm
+            stats.accuracy_total += accuracy
+            stats.best_wpm = max(stats.best_wpm, wpm)
+        if len(stats.recent) < RECENT_SIZE:
+            stats.recent.append({
+                'wpm': wpm, 'accuracy': accuracy, 'score': score, 'competition': competition_id,
+                'title': title, 'type': competition_type, 'at': submitted_at.isoformat(),
+            })
+    ParticipantStats.objects.bulk_create(rows.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('typing_game', '0008_paragraph_corpus'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParticipantStats',
+            fields=[
+                ('participant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='typing_game.participant')),
+                ('races', models.PositiveIntegerField(default=0)),
+                ('typing_races', models.PositiveIntegerField(default=0)),
+                ('wpm_total', models.FloatField(default=0.0)),
+                ('accuracy_total', models.FloatField(default=0.0)),
+                ('score_total', models.FloatField(default=0.0)),
+                ('best_wpm', models.FloatField(default=0.0)),
+                ('best_score', models.FloatField(default=0.0)),
+                ('recent', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'participant_stats',
+            },
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
@@ -1,27 +1,50 @@
 from django.db import models
-from django.contrib.auth.hashers import make_password, check_password
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import make_password, check_password, verify_password
 from datetime import timedelta
 from django.utils import timezone
 
-class Participant(models.Model):
-    name = models.CharField(max_length=30)
-    password = models.CharField(max_length=128)
-    created_at = models.DateTimeField(auto_now_add=True)
-    class Meta:
-        db_table = 'participants'
+class PasswordMixin:
+    """Password handling shared by ``Participant`` and ``Organizer``.
+
+    A correct password stored with an outdated hasher (see
+    ``PASSWORD_HASHING_POLICY``) is rehashed and saved on the spot.
+    """
 
     def set_password(self, raw_password):
         self.password = make_password(raw_password)
-        
+
     def check_password(self, raw_password):
-        return check_password(raw_password, self.password)
+        def setter(raw_password):
+            self.set_password(raw_password)
+            self.save(update_fields=['password'])
+        return check_password(raw_password, self.password, setter)
+
+    async def acheck_password(self, raw_password):
+        """Like ``check_password`` but hashes in a worker thread, off the event loop."""
+        # hashlib releases the GIL, so concurrent logins use every core
+        is_correct, must_update = await sync_to_async(verify_password, thread_sensitive=False)(
+            raw_password, self.password
+        )
+        if is_correct and must_update:
+            self.password = await sync_to_async(make_password, thread_sensitive=False)(raw_password)
+            await self.asave(update_fields=['password'])
+        return is_correct
+
+
+class Participant(PasswordMixin, models.Model):
+    name = models.CharField(max_length=30, unique=True)
+    password = models.CharField(max_length=128)
+    created_at = models.DateTimeField(auto_now_add=True)
+    class Meta:
+        db_table = 'participants'
 
     def __str__(self):
         return f"Participant: {self.name}"
 
 
-class Organizer(models.Model):
-    name = models.CharField(max_length=30)
+class Organizer(PasswordMixin, models.Model):
+    name = models.CharField(max_length=30, db_index=True)
     email = models.EmailField(max_length=40, unique=True)
     mobile_num = models.CharField(max_length=10)
     password = models.CharField(max_length=128)
@@ -29,15 +52,40 @@ class Organizer(models.Model):
     class Meta:
         db_table = 'organizers'
 
-    def set_password(self, raw_password):
-        self.password = make_password(raw_password)
-        
-    def check_password(self, raw_password):
-        return check_password(raw_password, self.password)
-
     def __str__(self):
         return f"Organizer: {self.name} ({self.email})"
 
+class Paragraph(models.Model):
+    """A typing text in the shared corpus, tokenized and measured once when added (see corpus.py)."""
+    text = models.TextField()
+    content_hash = models.CharField(max_length=64, unique=True)  # sha256 of the normalized text
+    tokens = models.JSONField(default=list)  # Words in typing order
+    offsets = models.JSONField(default=list)  # Start of each token in ``text``
+    char_count = models.PositiveIntegerField(default=0)
+    word_count = models.PositiveIntegerField(default=0)
+    avg_word_length = models.FloatField(default=0.0)
+    punctuation_density = models.FloatField(default=0.0)
+    difficulty = models.FloatField(default=0.0, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'paragraphs'
+
+    def __str__(self):
+        return self.text[:50]
+
+
+class CompetitionQuerySet(models.QuerySet):
+    def with_end_time(self):
+        """Annotate ``ends_at`` (start_time + duration) in the database so it can be filtered on."""
+        duration = models.ExpressionWrapper(
+            models.F('duration') * models.Value(timedelta(minutes=1)), output_field=models.DurationField()
+        )
+        return self.annotate(
+            ends_at=models.ExpressionWrapper(models.F('start_time') + duration, output_field=models.DateTimeField())
+        )
+
+
 class Competition(models.Model):
     title = models.CharField(max_length=200)
     description = models.JSONField(default=list)
@@ -49,10 +97,26 @@ class Competition(models.Model):
         max_length=15,
         choices=[('Normal','Normal'), ('Reverse','Reverse'), ('Jumble-words','Jumble-words')],
     )
-    paragraphs = models.JSONField(default=list) 
+    paragraphs = models.JSONField(default=list)  # Jumble-words pairs; typing texts are in ``texts``
+    texts = models.ManyToManyField(Paragraph, through='CompetitionParagraph', related_name='competitions')
     expired = models.BooleanField(default=False)
     started = models.BooleanField(default=False)
-    status = models.CharField(max_length=10, choices=[('waiting', 'Waiting'), ('active','Active'), ( 'ended','Ended')], default='waiting')
+    # Changed only through lifecycle.py
+    status = models.CharField(
+        max_length=10,
+        choices=[('waiting', 'Waiting'), ('active','Active'), ('started', 'Started'), ( 'ended','Ended')],
+        default='waiting',
+    )
+    result_count = models.PositiveIntegerField(default=0, editable=False)  # Maintained by leaderboard.place/remove
+    participant_count = models.PositiveIntegerField(default=0, editable=False)  # Maintained by roster.py
+
+    objects = CompetitionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['start_time', 'id'], name='competition_start_idx'),
+            models.Index(fields=['status', 'start_time'], name='competition_status_start_idx'),
+        ]
 
     @property
     def end_time(self):
@@ -65,6 +129,16 @@ class Competition(models.Model):
     def __str__(self):
         return self.title
 
+class CompetitionParagraph(models.Model):
+    """Position of a corpus paragraph in a competition's text."""
+    competition = models.ForeignKey(Competition, on_delete=models.CASCADE, related_name='text_links')
+    paragraph = models.ForeignKey(Paragraph, on_delete=models.PROTECT, related_name='+')
+    position = models.PositiveIntegerField()
+
+    class Meta:
+        db_table = 'competition_paragraphs'
+        unique_together = ('competition', 'position')
+
 # Add to models.py
 class CompetitionResult(models.Model):
     competition = models.ForeignKey(Competition, on_delete=models.CASCADE, related_name='results')
@@ -78,17 +152,71 @@ class CompetitionResult(models.Model):
     total_questions = models.IntegerField(default=0) # For jumble-words
     submitted_at = models.DateTimeField(auto_now_add=True)
     score = models.FloatField(default=0.0, editable=False)
+    rank = models.PositiveIntegerField(default=0, editable=False)  # Position within the competition, see leaderboard.py
 
     class Meta:
         db_table = 'competition_results'
         unique_together = ('competition', 'participant')
+        indexes = [
+            models.Index(fields=['competition', 'rank'], name='result_competition_rank_idx'),
+        ]
 
-    def save(self, *args, **kwargs):
+    def compute_score(self):
+        """Set ``score`` from WPM and accuracy; returns whether it was computed."""
         # Only calculate score for typing-based games.
         # Jumble-word score is calculated on the client and saved directly.
         if self.competition.type in ['Normal', 'Reverse'] and self.accuracy > 0:
             self.score = self.wpm * (self.accuracy / 100)
+            return True
+        return False
+
+    def save(self, *args, **kwargs):
+        # update_or_create() saves only the fields it was given
+        if self.compute_score() and kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'score'}
         super().save(*args, **kwargs)
 
     def __str__(self):
-        return f"{self.participant.name} - {self.competition.title}"
\ No newline at end of file
+        return f"{self.participant.name} - {self.competition.title}"
+
+
+class ParticipantStats(models.Model):
+    """Rolled-up results of one participant, kept current by ``stats.py``."""
+    participant = models.OneToOneField(Participant, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    races = models.PositiveIntegerField(default=0)
+    typing_races = models.PositiveIntegerField(default=0)  # Normal and Reverse; the WPM averages cover only these
+    wpm_total = models.FloatField(default=0.0)
+    accuracy_total = models.FloatField(default=0.0)
+    score_total = models.FloatField(default=0.0)
+    best_wpm = models.FloatField(default=0.0)
+    best_score = models.FloatField(default=0.0)
+    recent = models.JSONField(default=list)  # Latest results first, see stats.RECENT_SIZE
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'participant_stats'
+
+    @property
+    def avg_wpm(self):
+        return self.wpm_total / self.typing_races if self.typing_races else 0.0
+
+    @property
+    def avg_accuracy(self):
+        return self.accuracy_total / self.typing_races if self.typing_races else 0.0
+
+    @property
+    def avg_score(self):
+        return self.score_total / self.races if self.races else 0.0
+
+
+class RosterChange(models.Model):
+    """One join, leave or reset of a competition's roster; ``id`` is the roster version."""
+    competition = models.ForeignKey(Competition, on_delete=models.CASCADE, related_name='roster_changes')
+    participant = models.ForeignKey(Participant, on_delete=models.CASCADE, null=True, related_name='+')
+    kind = models.CharField(max_length=5, choices=[('join', 'Join'), ('leave', 'Leave'), ('reset', 'Reset')])
+
+    class Meta:
+        db_table = 'roster_changes'
+        indexes = [
+            models.Index(fields=['competition', 'id'], name='roster_change_version_idx'),
+        ]
@@ -0,0 +1,126 @@
+"""
+Practice texts generated from the paragraph corpus.
+
+Each process builds a ``PracticeIndex`` from a sample of the corpus and
+rebuilds it every ``INDEX_TTL`` seconds. The index ranks words by
+frequency and sorts the sampled paragraphs into difficulty levels by the
+difficulty scored when they were imported. Generating a text
+is then plain Python over the index, and generated texts sit in an LRU cache
+keyed by (level, length, seed), so a practice page load normally costs no
+database query and no generation at all.
+"""
+import random
+import re
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+
+from .models import Paragraph
+
+LEVELS = ('easy', 'medium', 'hard')
+LENGTHS = (25, 50, 100, 200)  # words
+DEFAULT_LEVEL = 'easy'
+DEFAULT_LENGTH = 50
+SEEDS = 64  # distinct texts per (level, length); page loads pick one at random
+INDEX_SIZE = 5000  # paragraphs sampled into the index
+INDEX_TTL = 10 * 60  # seconds
+CACHE_SIZE = len(LEVELS) * len(LENGTHS) * SEEDS
+
+# Word bands by frequency rank, used when the corpus has no paragraphs for a level
+WORD_BANDS = {'easy': (0, 200), 'medium': (0, 1000), 'hard': (200, 5000)}
+# Until anything is imported, practice draws from these.
+FALLBACK_WORDS = (
+    'the be to of and a in that have it for not on with he as you do at this but his by from they we say her she '
+    'or an will my one all would there their what so up out if about who get which go me when make can like time '
+    'no just him know take people into year your good some could them see other than then now look only come its '
+    'over think also back after use two how our work first well way even new want because any these give day most'
+).split()
+
+WORD_PATTERN = re.compile(r"[a-z']+")
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _plain_words(tokens):
+    for token in tokens:
+        match = WORD_PATTERN.search(token.lower())
+        if match:
+            yield match.group()
+
+
+class PracticeIndex:
+    """Word-frequency ranking and difficulty-sorted paragraphs of a corpus sample."""
+
+    def __init__(self, paragraphs):
+        """``paragraphs`` is a list of ``(tokens, difficulty)`` pairs."""
+        frequency = Counter(word for tokens, _ in paragraphs for word in _plain_words(tokens))
+        ranked = [word for word, _ in frequency.most_common()]
+
+        scored = sorted((difficulty, tokens) for tokens, difficulty in paragraphs)
+        count = len(scored)
+        self.paragraphs = {
+            level: [tokens for _, tokens in scored[i * count // len(LEVELS):(i + 1) * count // len(LEVELS)]]
+            for i, level in enumerate(LEVELS)
+        }
+        self.words = {}
+        for level, (low, high) in WORD_BANDS.items():
+            self.words[level] = ranked[low:high] or ranked or list(FALLBACK_WORDS)
+        self.built_at = time.monotonic()
+        self.text = lru_cache(maxsize=CACHE_SIZE)(self.generate)
+
+    def generate(self, level, length, seed):
+        """A text of exactly ``length`` words; the same arguments always give the same text."""
+        rng = random.Random(f'{level}:{length}:{seed}')
+        paragraphs = self.paragraphs[level]
+        if paragraphs:
+            words = []
+            while len(words) < length:
+                words.extend(rng.choice(paragraphs))
+            words = words[:length]
+        else:
+            words = rng.choices(self.words[level], k=length)
+        return ' '.join(words)
+
+
+def build_index(size=INDEX_SIZE):
+    """Sample up to ``size`` corpus paragraphs by primary key (no full-table sort) and index them."""
+    last_id = Paragraph.objects.order_by('-id').values_list('id', flat=True).first() or 0
+    rows = Paragraph.objects.values_list('tokens', 'difficulty')
+    if last_id > size:
+        # Ids have gaps where imports lost races; oversample a little to make up for them.
+        rows = rows.filter(id__in=random.sample(range(1, last_id + 1), min(last_id, size * 5 // 4)))[:size]
+    return PracticeIndex([(tokens, difficulty) for tokens, difficulty in rows if tokens])
+
+
+def get_index():
+    """This process's index, rebuilt by one request when it goes stale while others keep using it."""
+    global _index
+    index = _index
+    if index is None:
+        with _index_lock:
+            if _index is None:
+                _index = build_index()
+            return _index
+    if time.monotonic() - index.built_at > INDEX_TTL and _index_lock.acquire(blocking=False):
+        try:
+            _index = build_index()
+        finally:
+            _index_lock.release()
+    return _index
+
+
+def practice_text(level=DEFAULT_LEVEL, length=DEFAULT_LENGTH, seed=None):
+    """Return ``{'level', 'length', 'seed', 'text'}``; unknown levels and lengths fall back to the defaults."""
+    level = level if level in LEVELS else DEFAULT_LEVEL
+    try:
+        length = int(length)
+    except (TypeError, ValueError):
+        length = DEFAULT_LENGTH
+    length = length if length in LENGTHS else DEFAULT_LENGTH
+    try:
+        seed = int(seed) % SEEDS
+    except (TypeError, ValueError):
+        seed = random.randrange(SEEDS)
+    return {'level': level, 'length': length, 'seed': seed, 'text': get_index().text(level, length, seed)}
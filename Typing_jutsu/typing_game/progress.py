@@ -0,0 +1,146 @@
+"""
+In-memory aggregation of live race progress.
+
+Racers post small batches of progress ticks; only the latest tick per racer is
+kept. A single broadcaster thread wakes up ``TICK_RATE`` times a second and,
+for every race with new ticks, publishes one compact delta to all viewers of
+that competition through ``events``. The delta is encoded once per tick, so
+fan-out cost is one queue put per viewer no matter how many racers moved, and
+per-tick work is bounded by the number of racers that changed.
+
+Snapshot rows are ``[participant_id, word_index, correct_words, wpm]``.
+"""
+import json
+import threading
+import time
+
+from django.utils import timezone
+
+from . import events
+from .models import Competition
+
+TICK_RATE = 4  # broadcasts per second
+IDLE_TIMEOUT = 10 * 60  # seconds without ticks before a race board is dropped
+
+_boards = {}
+_boards_lock = threading.Lock()
+_broadcaster = None
+
+
+class RaceBoard:
+    """Latest progress of every racer in one competition."""
+
+    def __init__(self, competition_id, start_time):
+        self.competition_id = competition_id
+        self.start_time = start_time
+        self.racers = {}  # participant_id -> [word_index, correct_words, chars_typed]
+        self.names = {}
+        self.dirty = set()
+        self.new_names = {}
+        self.seq = 0
+        self.last_tick = time.monotonic()
+        self.lock = threading.Lock()
+
+    def has_racer(self, participant_id):
+        return participant_id in self.names
+
+    def add_racer(self, participant_id, name):
+        with self.lock:
+            self.names[participant_id] = name
+            self.new_names[participant_id] = name
+
+    def ingest(self, participant_id, ticks):
+        """Record a batch of ``[word_index, correct_words, chars_typed]`` ticks."""
+        # Counters are cumulative, so the newest tick supersedes the rest.
+        word_index, correct_words, chars_typed = (int(value) for value in ticks[-1][:3])
+        with self.lock:
+            self.racers[participant_id] = [word_index, correct_words, chars_typed]
+            self.dirty.add(participant_id)
+            self.last_tick = time.monotonic()
+
+    def _row(self, participant_id, minutes):
+        word_index, correct_words, chars_typed = self.racers[participant_id]
+        wpm = round(chars_typed / 5 / minutes) if minutes > 0 else 0
+        return [participant_id, word_index, correct_words, wpm]
+
+    def _minutes_elapsed(self):
+        return (timezone.now() - self.start_time).total_seconds() / 60
+
+    def take_delta(self):
+        """Return the encoded delta since the last call, or ``None`` if nothing moved."""
+        with self.lock:
+            if not self.dirty:
+                return None
+            dirty, self.dirty = self.dirty, set()
+            names, self.new_names = self.new_names, {}
+            self.seq += 1
+            minutes = self._minutes_elapsed()
+            rows = [self._row(participant_id, minutes) for participant_id in dirty]
+            seq = self.seq
+        return json.dumps({'seq': seq, 'racers': rows, 'names': names}, separators=(',', ':'))
+
+    def full_snapshot(self):
+        """Encoded state of every racer, for viewers that connect mid-race."""
+        with self.lock:
+            minutes = self._minutes_elapsed()
+            rows = [self._row(participant_id, minutes) for participant_id in self.racers]
+            payload = {'seq': self.seq, 'full': True, 'racers': rows, 'names': dict(self.names)}
+        return json.dumps(payload, separators=(',', ':'))
+
+
+def get_board(competition_id):
+    """Return the race board of a running competition, loading it on first use."""
+    board = _boards.get(competition_id)
+    if board is not None:
+        return board
+    competition = Competition.objects.filter(id=competition_id, status='started').values('start_time').first()
+    if competition is None:
+        return None
+    with _boards_lock:
+        board = _boards.setdefault(competition_id, RaceBoard(competition_id, competition['start_time']))
+    _ensure_broadcaster()
+    return board
+
+
+def find_board(competition_id):
+    """Return the race board if it is already in memory, without touching the database."""
+    return _boards.get(competition_id)
+
+
+def close_board(competition_id):
+    with _boards_lock:
+        _boards.pop(competition_id, None)
+
+
+def broadcast_once():
+    """Publish one delta per race that changed since the last tick."""
+    now = time.monotonic()
+    with _boards_lock:
+        boards = list(_boards.values())
+    for board in boards:
+        delta = board.take_delta()
+        if delta is not None:
+            events.publish(board.competition_id, 'progress', delta)
+        elif now - board.last_tick > IDLE_TIMEOUT:
+            close_board(board.competition_id)
+
+
+def _broadcast_loop():
+    global _broadcaster
+    interval = 1 / TICK_RATE
+    while True:
+        started = time.monotonic()
+        broadcast_once()
+        with _boards_lock:
+            if not _boards:
+                _broadcaster = None
+                return
+        time.sleep(max(0, interval - (time.monotonic() - started)))
+
+
+def _ensure_broadcaster():
+    global _broadcaster
+    with _boards_lock:
+        if _broadcaster is None:
+            _broadcaster = threading.Thread(target=_broadcast_loop, name='race-progress', daemon=True)
+            _broadcaster.start()
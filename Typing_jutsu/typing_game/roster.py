@@ -0,0 +1,161 @@
+"""
+Competition rosters with incremental updates.
+
+Every join, leave or reset appends a ``RosterChange``; its id is the roster
+version. A lobby page renders only the first ``PREVIEW_SIZE`` names and the
+denormalized ``participant_count``, then follows changes as they are pushed
+through ``events`` (or fetched with ``changes_since`` after a reconnect). A
+join therefore costs a fixed handful of writes and one small event, however
+large the lobby already is.
+
+Diffs look like ``{"version": 7, "reset": false, "joined": [[id, name], ...],
+"left": [id, ...]}``; applying one is idempotent. Pushed diffs only list
+changes that really happened, so clients keep the count themselves; fetched
+ones carry ``count``.
+"""
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.constants import OnConflict
+
+from . import events
+from .models import Competition, Participant, RosterChange
+
+PREVIEW_SIZE = 50  # names rendered into the lobby page
+DIFF_LIMIT = 500  # changes per diff; a client further behind gets a fresh preview
+REGISTER_BATCH_SIZE = 400  # rows per insert; two parameters each stays under SQLite's old 999 limit
+
+Membership = Competition.participants.through
+
+# Insert-if-absent on the unique (competition, participant) pair:
+# INSERT OR IGNORE on SQLite, INSERT ... ON CONFLICT DO NOTHING on PostgreSQL.
+_INSERT_MEMBERSHIP_SQL = '{insert} {table} ({competition}, {participant}) VALUES {{values}} {suffix}'.format(
+    insert=connection.ops.insert_statement(on_conflict=OnConflict.IGNORE),
+    table=connection.ops.quote_name(Membership._meta.db_table),
+    competition=connection.ops.quote_name('competition_id'),
+    participant=connection.ops.quote_name('participant_id'),
+    suffix=connection.ops.on_conflict_suffix_sql([], OnConflict.IGNORE, None, None),
+)
+
+
+def _insert_memberships(competition_id, participant_ids):
+    """Add the missing memberships in one statement; returns the newly added participant ids."""
+    sql = _INSERT_MEMBERSHIP_SQL.format(values=', '.join(['(%s, %s)'] * len(participant_ids)))
+    params = [value for participant_id in participant_ids for value in (competition_id, participant_id)]
+    with connection.cursor() as cursor:
+        if len(participant_ids) == 1:
+            cursor.execute(sql, params)
+            return list(participant_ids) if cursor.rowcount == 1 else []
+        cursor.execute(sql + ' RETURNING ' + connection.ops.quote_name('participant_id'), params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _record(competition_id, kind, participant=None, delta=0):
+    change = RosterChange.objects.create(competition_id=competition_id, participant=participant, kind=kind)
+    if delta:
+        Competition.objects.filter(id=competition_id).update(participant_count=F('participant_count') + delta)
+    return change.id
+
+
+def _publish(competition_id, version, joined=(), left=(), reset=False):
+    events.publish_on_commit(competition_id, 'roster', {
+        'version': version, 'reset': reset, 'joined': list(joined), 'left': list(left),
+    })
+
+
+@transaction.atomic
+def join(competition_id, participant):
+    """Add a participant; returns ``False`` if they had already joined.
+
+    Safe against double clicks and concurrent joins: the insert itself
+    decides, so a participant is counted exactly once.
+    """
+    if not _insert_memberships(competition_id, [participant.id]):
+        return False
+    version = _record(competition_id, 'join', participant, +1)
+    _publish(competition_id, version, joined=[[participant.id, participant.name]])
+    return True
+
+
+@transaction.atomic
+def register(competition_id, names):
+    """Pre-register participants by name; returns ``(added, unknown_names)``.
+
+    Names already on the roster are skipped. Each batch of memberships is a
+    single insert and the roster changes are written in bulk.
+    """
+    participants = dict(Participant.objects.filter(name__in=set(names)).values_list('id', 'name'))
+    unknown = sorted(set(names) - set(participants.values()))
+    ids = list(participants)
+    added = []
+    for start in range(0, len(ids), REGISTER_BATCH_SIZE):
+        added += _insert_memberships(competition_id, ids[start:start + REGISTER_BATCH_SIZE])
+    if added:
+        changes = RosterChange.objects.bulk_create([
+            RosterChange(competition_id=competition_id, participant_id=participant_id, kind='join')
+            for participant_id in added
+        ])
+        Competition.objects.filter(id=competition_id).update(participant_count=F('participant_count') + len(added))
+        joined = [[participant_id, participants[participant_id]] for participant_id in added]
+        _publish(competition_id, changes[-1].id, joined=joined)
+    return len(added), unknown
+
+
+@transaction.atomic
+def leave(competition_id, participant_id):
+    """Remove a participant; returns ``False`` if they weren't on the roster."""
+    deleted, _ = Membership.objects.filter(competition_id=competition_id, participant_id=participant_id).delete()
+    if not deleted:
+        return False
+    version = _record(competition_id, 'leave', Participant(id=participant_id), -1)
+    _publish(competition_id, version, left=[participant_id])
+    return True
+
+
+@transaction.atomic
+def reset(competition_id):
+    """Empty the roster, e.g. when a competition is deactivated."""
+    Membership.objects.filter(competition_id=competition_id).delete()
+    # Older changes are superseded by the reset.
+    RosterChange.objects.filter(competition_id=competition_id).delete()
+    Competition.objects.filter(id=competition_id).update(participant_count=0)
+    _publish(competition_id, _record(competition_id, 'reset'), reset=True)
+
+
+def preview(competition_id):
+    """The first ``PREVIEW_SIZE`` names of the roster as a diff that replaces everything."""
+    version = (
+        RosterChange.objects.filter(competition_id=competition_id)
+        .order_by('-id').values_list('id', flat=True).first()
+    ) or 0
+    joined = (
+        Membership.objects.filter(competition_id=competition_id)
+        .order_by('id').values_list('participant_id', 'participant__name')[:PREVIEW_SIZE]
+    )
+    return {'version': version, 'reset': True, 'joined': [list(row) for row in joined], 'left': []}
+
+
+def changes_since(competition_id, version):
+    """The net roster changes after ``version``, or a fresh preview if there are too many."""
+    changes = list(
+        RosterChange.objects.filter(competition_id=competition_id, id__gt=version)
+        .order_by('id').values_list('id', 'kind', 'participant_id', 'participant__name')[:DIFF_LIMIT + 1]
+    )
+    if len(changes) > DIFF_LIMIT:
+        diff = preview(competition_id)
+    else:
+        diff = {'version': changes[-1][0] if changes else version, 'reset': False, 'joined': [], 'left': []}
+        latest = {}  # participant_id -> (kind, name) of their last change
+        for _, kind, participant_id, name in changes:
+            if kind == 'reset':
+                diff['reset'] = True
+                latest.clear()
+            else:
+                latest.pop(participant_id, None)
+                latest[participant_id] = (kind, name)
+        for participant_id, (kind, name) in latest.items():
+            if kind == 'join':
+                diff['joined'].append([participant_id, name])
+            else:
+                diff['left'].append(participant_id)
+    diff['count'] = Competition.objects.filter(id=competition_id).values_list('participant_count', flat=True).first()
+    return diff
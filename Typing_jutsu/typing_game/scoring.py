@@ -0,0 +1,104 @@
+"""
+Authoritative scoring of Normal and Reverse races from keystroke logs.
+
+Clients upload a compact, delta-encoded log of what they typed:
+
+    {"t": [0, 143, 97, ...], "k": "The q\\bquick ..."}
+
+``k`` holds every key in order (``"\\b"`` is a backspace) and ``t[i]`` is the
+number of milliseconds between key ``i - 1`` and key ``i``. The log is
+replayed word by word against the competition text, the same way the live
+page checks input, so WPM, accuracy and keystroke counts never come from
+the client.
+"""
+import json
+
+from . import corpus
+
+BACKSPACE = '\b'
+MAX_LOG_BYTES = 512 * 1024  # ~60 minutes of very fast typing
+GRACE_SECONDS = 5  # Allowance for network and timer skew at the end of a race
+
+
+class ScoringError(ValueError):
+    """Raised when a keystroke log is malformed or impossible."""
+
+
+def competition_words(competition):
+    """Words of the competition text in the order they must be typed."""
+    words = corpus.competition_tokens(competition)
+    if competition.type == 'Reverse':
+        words.reverse()
+    return words
+
+
+def parse_log(raw):
+    """Decode a keystroke log into ``(deltas, keys)``."""
+    if not raw:
+        raise ScoringError('Missing keystroke log.')
+    if len(raw) > MAX_LOG_BYTES:
+        raise ScoringError('Keystroke log is too large.')
+    try:
+        log = json.loads(raw)
+        deltas, keys = log['t'], log['k']
+    except (ValueError, KeyError, TypeError):
+        raise ScoringError('Malformed keystroke log.')
+    if not isinstance(keys, str) or not isinstance(deltas, list) or len(deltas) != len(keys):
+        raise ScoringError('Keystroke log timings do not match its keys.')
+    if not all(type(delta) is int and delta >= 0 for delta in deltas):
+        raise ScoringError('Keystroke log timings must be non-negative integers.')
+    return deltas, keys
+
+
+def score_keystrokes(words, deltas, keys, duration_seconds, time_taken=None):
+    """Replay a keystroke log and return the result fields for ``CompetitionResult``.
+
+    ``time_taken`` is the client's reported typing time; it is only trusted
+    within the bounds of the log itself and the competition duration.
+    """
+    typing_seconds = sum(deltas) / 1000
+    if typing_seconds > duration_seconds + GRACE_SECONDS:
+        raise ScoringError('Keystroke log is longer than the competition.')
+    elapsed = typing_seconds
+    if time_taken is not None:
+        elapsed = max(elapsed, min(float(time_taken), duration_seconds))
+
+    word_count = len(words)
+    index = 0
+    attempted = correct = chars_typed = correct_keystrokes = 0
+    buffer = []
+    if word_count:
+        for key in keys:
+            if key == ' ':
+                typed = ''.join(buffer).strip()
+                buffer.clear()
+                if not typed:
+                    continue
+                attempted += 1
+                chars_typed += len(typed) + 1  # +1 for the space
+                if typed == words[index]:
+                    correct += 1
+                    correct_keystrokes += len(typed) + 1
+                index += 1
+                if index == word_count:
+                    index = 0  # The text repeats until time runs out
+            elif key == BACKSPACE:
+                if buffer:
+                    buffer.pop()
+            else:
+                buffer.append(key)
+
+    minutes = elapsed / 60
+    return {
+        'wpm': round(chars_typed / 5 / minutes, 2) if minutes > 0 else 0.0,
+        'accuracy': round(correct / attempted * 100, 2) if attempted else 0.0,
+        'time_taken': round(elapsed, 2),
+        'total_keystrokes': len(keys),
+        'correct_keystrokes': correct_keystrokes,
+    }
+
+
+def score_submission(competition, raw_log, time_taken=None):
+    """Score a submitted log against ``competition``; raises ``ScoringError``."""
+    deltas, keys = parse_log(raw_log)
+    return score_keystrokes(competition_words(competition), deltas, keys, competition.duration * 60, time_taken)
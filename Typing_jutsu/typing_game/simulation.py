@@ -0,0 +1,384 @@
+"""
+End-to-end load simulation of one race, phase by phase.
+
+``simulate_race`` drives synthetic participants through what a real race
+asks of a deployment: sign up, log in, join the lobby, poll the competition
+status, the organizer's start, everyone seeing the start, and the burst of
+result submissions when the timer runs out. Each phase reports throughput,
+p50/p95/p99 latency, failed requests and, when the app runs in this
+process, the database queries it took.
+
+Requests go through Django's test clients into the app running in this
+process, or over HTTP (``httpx``) to a server at ``base_url``. Either way
+they are issued by ``concurrency`` workers, as threads or as asyncio tasks.
+A session is only ever used by one worker, which issues its requests in
+order. Run it with ``manage.py simulate_race``.
+"""
+import asyncio
+import json
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client
+from django.urls import reverse
+from django.utils import timezone
+
+from . import corpus, metrics
+from .benchmarks import synthetic_keystroke_log
+from .models import Competition, Organizer, Participant
+
+MODES = ('threads', 'asyncio')
+PASSWORD = 'simulate-race'
+KEYSTROKE_LOGS = 8  # distinct logs, shared round-robin by the participants
+
+
+class QueryCounter:
+    """Counts queries on every database connection of this process, in any thread."""
+
+    def __init__(self):
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self.lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+    def attach(self, sender=None, connection=None, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+    def install(self):
+        connection_created.connect(self.attach)
+        for existing in connections.all():
+            self.attach(connection=existing)
+
+    def uninstall(self):
+        connection_created.disconnect(self.attach)
+        for existing in connections.all():
+            if self in existing.execute_wrappers:
+                existing.execute_wrappers.remove(self)
+
+
+class _DjangoSession:
+    """A browser against the in-process app."""
+
+    def __init__(self):
+        self.client = Client()
+
+    def request(self, method, path, data=None, headers=None):
+        call = self.client.post if method == 'POST' else self.client.get
+        response = call(path, data, headers=headers)
+        return response.status_code, response.get('Location', ''), response.get('ETag')
+
+    def close(self):
+        pass
+
+
+class _AsyncDjangoSession(_DjangoSession):
+    def __init__(self):
+        self.client = AsyncClient()
+
+    async def request(self, method, path, data=None, headers=None):
+        call = self.client.post if method == 'POST' else self.client.get
+        response = await call(path, data, headers=headers)
+        return response.status_code, response.get('Location', ''), response.get('ETag')
+
+    async def aclose(self):
+        pass
+
+
+class _HttpSession:
+    """A browser against a server at ``base_url``; sends the CSRF token a real form would."""
+
+    def __init__(self, base_url):
+        import httpx
+
+        self.base_url = base_url
+        self.client = httpx.Client(base_url=base_url, timeout=120)
+
+    def _headers(self, method, headers):
+        headers = dict(headers or {})
+        if method == 'POST':
+            headers.update({'X-CSRFToken': self.client.cookies.get('csrftoken', ''), 'Referer': self.base_url})
+        return headers
+
+    def prepare(self):
+        self.client.get(reverse('typing_game:login'))  # Sets the CSRF cookie
+
+    def request(self, method, path, data=None, headers=None):
+        response = self.client.request(method, path, data=data, headers=self._headers(method, headers))
+        return response.status_code, response.headers.get('location', ''), response.headers.get('etag')
+
+    def close(self):
+        self.client.close()
+
+
+class _AsyncHttpSession(_HttpSession):
+    def __init__(self, base_url):
+        import httpx
+
+        self.base_url = base_url
+        self.client = httpx.AsyncClient(base_url=base_url, timeout=120)
+
+    async def prepare(self):
+        await self.client.get(reverse('typing_game:login'))
+
+    async def request(self, method, path, data=None, headers=None):
+        response = await self.client.request(method, path, data=data, headers=self._headers(method, headers))
+        return response.status_code, response.headers.get('location', ''), response.headers.get('etag')
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+class Phase:
+    """Latencies and failures of the requests of one phase."""
+
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.errors = 0
+        self.elapsed = 0.0
+        self.queries = None
+
+    def report(self):
+        requests = len(self.latencies)
+        latency = metrics.summarize(self.latencies) if requests else dict.fromkeys(['p50', 'p95', 'p99'], 0)
+        queries = '-' if self.queries is None else f'{self.queries / max(requests, 1):.1f}'
+        return (
+            f'{self.name:<18} {requests:6d} {self.errors:6d} {requests / self.elapsed if self.elapsed else 0:9.1f} '
+            f'{latency["p50"]:9.1f} {latency["p95"]:9.1f} {latency["p99"]:9.1f} {queries:>9}'
+        )
+
+
+REPORT_HEADER = f'{"phase":<18} {"reqs":>6} {"errors":>6} {"req/s":>9} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"queries":>9}'
+
+
+def _close_connections():
+    for conn in connections.all(initialized_only=True):
+        conn.close()
+
+
+def _run_threads(sessions, tasks, concurrency, phase):
+    lock = threading.Lock()
+
+    def worker(n):
+        try:
+            for session_index, call in tasks:
+                if session_index % concurrency != n:
+                    continue
+                method, path, data, headers, ok = call()
+                started = time.perf_counter()
+                try:
+                    status, location, etag = sessions[session_index].request(method, path, data, headers)
+                    failed = not ok(status, location, etag)
+                except Exception:
+                    failed = True
+                with lock:
+                    phase.latencies.append((time.perf_counter() - started) * 1000)
+                    phase.errors += failed
+        finally:
+            _close_connections()
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+
+
+async def _run_async(sessions, tasks, concurrency, phase):
+    async def worker(n):
+        for session_index, call in tasks:
+            if session_index % concurrency != n:
+                continue
+            method, path, data, headers, ok = call()
+            started = time.perf_counter()
+            try:
+                status, location, etag = await sessions[session_index].request(method, path, data, headers)
+                failed = not ok(status, location, etag)
+            except Exception:
+                failed = True
+            phase.latencies.append((time.perf_counter() - started) * 1000)
+            phase.errors += failed
+
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+
+
+class RaceSimulation:
+    """One competition, an organizer and ``participants`` synthetic racers."""
+
+    def __init__(self, participants=100, concurrency=16, mode='threads', base_url=None, polls=5,
+                 typing_seconds=30):
+        if mode not in MODES:
+            raise ValueError(f'Unknown mode: {mode}')
+        self.participants = participants
+        self.concurrency = max(1, min(concurrency, participants))
+        self.mode = mode
+        self.base_url = base_url
+        self.polls = polls
+        self.typing_seconds = typing_seconds
+        self.prefix = f'sim-{secrets.token_hex(3)}-'
+        self.names = [f'{self.prefix}{i}' for i in range(participants)]
+        self.counter = None if base_url else QueryCounter()
+        self.phases = []
+
+    def _session(self):
+        if self.base_url:
+            return _AsyncHttpSession(self.base_url) if self.mode == 'asyncio' else _HttpSession(self.base_url)
+        return _AsyncDjangoSession() if self.mode == 'asyncio' else _DjangoSession()
+
+    def setup(self):
+        """Create the organizer and an active competition directly in the database."""
+        self.organizer = Organizer.objects.create(
+            name=f'{self.prefix}organizer', email=f'{self.prefix}organizer@example.com', mobile_num='9999999999',
+            password=make_password(PASSWORD),
+        )
+        self.competition = Competition.objects.create(
+            title=f'{self.prefix}race', description='Load simulation', type='Normal', organizer=self.organizer,
+            start_time=timezone.now(), duration=max(1, -(-self.typing_seconds // 60)), status='active',
+        )
+        corpus.set_competition_texts(self.competition, [
+            'The quick brown fox jumps over the lazy dog while the typist keeps a steady rhythm.'
+        ])
+        words = corpus.competition_tokens(self.competition)
+        self.keystrokes = []
+        for seed in range(KEYSTROKE_LOGS):
+            deltas, keys = synthetic_keystroke_log(words, self.typing_seconds, seed=seed)
+            self.keystrokes.append(json.dumps({'t': deltas, 'k': keys}))
+
+    def teardown(self):
+        """Remove everything the simulation created."""
+        self.competition.delete()
+        self.organizer.delete()
+        Participant.objects.filter(name__startswith=self.prefix).delete()
+
+    def _measure(self, name, run):
+        phase = Phase(name)
+        queries_before = self.counter.count if self.counter else 0
+        started = time.perf_counter()
+        run(phase)
+        phase.elapsed = time.perf_counter() - started
+        if self.counter:
+            phase.queries = self.counter.count - queries_before
+        self.phases.append(phase)
+        return phase
+
+    async def _ameasure(self, name, run):
+        phase = Phase(name)
+        queries_before = self.counter.count if self.counter else 0
+        started = time.perf_counter()
+        await run(phase)
+        phase.elapsed = time.perf_counter() - started
+        if self.counter:
+            phase.queries = self.counter.count - queries_before
+        self.phases.append(phase)
+        return phase
+
+    def _plan(self, sessions, organizer):
+        """The phases in order, as ``(name, sessions, tasks, reported)``."""
+        competition_id = self.competition.id
+        urls = {
+            'signup': reverse('typing_game:signup'),
+            'login': reverse('typing_game:login'),
+            'home': reverse('typing_game:home'),
+            'join': reverse('typing_game:join_competition', args=[competition_id]),
+            'live': reverse('typing_game:live_competition', args=[competition_id]),
+            'status': reverse('typing_game:competition_status_api', args=[competition_id]),
+            'start': reverse('typing_game:start_competition', args=[competition_id]),
+            'submit': reverse('typing_game:submit_result', args=[competition_id]),
+            'competitions': reverse('typing_game:competitions'),
+        }
+        etags = [None] * self.participants
+
+        def redirects_to(url):
+            return lambda status, location, etag: status == 302 and location.endswith(url)
+
+        def post(url, data, expected):
+            return lambda: ('POST', url, data, None, redirects_to(expected))
+
+        def polled(i):
+            def ok(status, location, etag):
+                etags[i] = etag or etags[i]
+                return status in (200, 304)
+            return ok
+
+        def poll(i):
+            def call():
+                headers = {'If-None-Match': etags[i]} if etags[i] else None
+                return 'GET', urls['status'], None, headers, polled(i)
+            return call
+
+        participants = range(self.participants)
+        return [
+            ('signup', sessions, [
+                (i, post(urls['signup'], {'role': 'participant', 'username': n, 'password': PASSWORD}, urls['login']))
+                for i, n in enumerate(self.names)
+            ], True),
+            ('login', sessions, [
+                (i, post(urls['login'], {'username': n, 'password': PASSWORD}, urls['home']))
+                for i, n in enumerate(self.names)
+            ], True),
+            ('join', sessions, [(i, post(urls['join'], {}, urls['live'])) for i in participants], True),
+            ('lobby polling', sessions, [(i, poll(i)) for _ in range(self.polls) for i in participants], True),
+            ('organizer login', organizer, [
+                (0, post(urls['login'], {'username': self.organizer.name, 'password': PASSWORD}, urls['home'])),
+            ], False),
+            ('start', organizer, [(0, post(urls['start'], {}, urls['live']))], True),
+            ('start seen', sessions, [(i, poll(i)) for i in participants], True),
+            ('submit', sessions, [
+                (i, post(urls['submit'], {
+                    'keystrokes': self.keystrokes[i % KEYSTROKE_LOGS], 'time_taken': self.typing_seconds,
+                }, urls['competitions']))
+                for i in participants
+            ], True),
+        ]
+
+    def _race_in_threads(self, sessions, plan, write):
+        try:
+            if self.base_url:
+                for session in sessions:
+                    session.prepare()  # Untimed: the CSRF cookie a browser would already have
+            for name, phase_sessions, tasks, reported in plan:
+                phase = self._measure(name, lambda phase: _run_threads(phase_sessions, tasks, self.concurrency, phase))
+                if reported:
+                    write(phase.report())
+        finally:
+            for session in sessions:
+                session.close()
+
+    async def _race_in_loop(self, sessions, plan, write):
+        # One event loop for the whole race: pooled httpx connections belong to the loop that opened them
+        try:
+            if self.base_url:
+                await asyncio.gather(*(session.prepare() for session in sessions))
+            for name, phase_sessions, tasks, reported in plan:
+                phase = await self._ameasure(
+                    name, lambda phase: _run_async(phase_sessions, tasks, self.concurrency, phase),
+                )
+                if reported:
+                    write(phase.report())
+        finally:
+            await asyncio.gather(*(session.aclose() for session in sessions))
+
+    def run(self, write):
+        sessions = [self._session() for _ in range(self.participants)]
+        organizer = [self._session()]
+        plan = self._plan(sessions, organizer)
+        write(f'{self.participants} participants, {self.concurrency} {self.mode} workers, '
+              f'{"server " + self.base_url if self.base_url else "in-process app"}')
+        write(REPORT_HEADER)
+        if self.counter:
+            self.counter.install()
+        try:
+            if self.mode == 'asyncio':
+                asyncio.run(self._race_in_loop(sessions + organizer, plan, write))
+            else:
+                self._race_in_threads(sessions + organizer, plan, write)
+        finally:
+            if self.counter:
+                self.counter.uninstall()
+        return self.phases
@@ -0,0 +1,161 @@
+"""
+Per-participant statistics rolled up as results come and go.
+
+A ``ParticipantStats`` row holds running totals, personal bests and the
+latest ``RECENT_SIZE`` results of one participant, so a profile page reads a
+single row however many races they have run. Every write to
+``competition_results`` is followed by ``apply_changes`` in the same
+transaction, which folds in the difference. Only when a personal best is
+lost, or a deletion empties part of the recent list, does it look at the
+participant's results again. ``rebuild`` recomputes rows from scratch.
+"""
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Sum, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from .models import CompetitionResult, ParticipantStats
+
+RECENT_SIZE = 20
+TYPING_TYPES = ('Normal', 'Reverse')
+RESULT_FIELDS = ('wpm', 'accuracy', 'score')
+STATS_FIELDS = [
+    'races', 'typing_races', 'wpm_total', 'accuracy_total', 'score_total', 'best_wpm', 'best_score', 'recent',
+]
+
+
+def _entry(competition_id, title, competition_type, fields, at):
+    entry = {field: fields[field] for field in RESULT_FIELDS}
+    entry.update(competition=competition_id, title=title, type=competition_type, at=at.isoformat())
+    return entry
+
+
+def _add(stats, competition, fields, sign):
+    stats.races += sign
+    stats.score_total += sign * fields['score']
+    if competition.type in TYPING_TYPES:
+        stats.typing_races += sign
+        stats.wpm_total += sign * fields['wpm']
+        stats.accuracy_total += sign * fields['accuracy']
+
+
+def _lost_best(stats, competition, old, new):
+    """Whether replacing ``old`` with ``new`` may have lowered a personal best."""
+    def lowered(field, best):
+        return old[field] >= best and (new is None or new[field] < old[field])
+    typing = competition.type in TYPING_TYPES
+    return lowered('score', stats.best_score) or typing and lowered('wpm', stats.best_wpm)
+
+
+def _totals(participant_ids):
+    totals = (
+        CompetitionResult.objects.filter(participant_id__in=participant_ids).values('participant_id')
+        .annotate(
+            races=Count('id'),
+            typing_races=Count('id', filter=Q(competition__type__in=TYPING_TYPES)),
+            wpm_total=Sum('wpm', filter=Q(competition__type__in=TYPING_TYPES), default=0.0),
+            accuracy_total=Sum('accuracy', filter=Q(competition__type__in=TYPING_TYPES), default=0.0),
+            score_total=Sum('score', default=0.0),
+            best_wpm=Max('wpm', filter=Q(competition__type__in=TYPING_TYPES), default=0.0),
+            best_score=Max('score', default=0.0),
+        )
+    )
+    return {row.pop('participant_id'): row for row in totals}
+
+
+def _recent(participant_ids):
+    latest = (
+        CompetitionResult.objects.filter(participant_id__in=participant_ids)
+        .annotate(position=Window(
+            RowNumber(), partition_by=F('participant_id'), order_by=[F('submitted_at').desc(), F('id').desc()],
+        ))
+        .filter(position__lte=RECENT_SIZE)
+        .order_by('participant_id', 'position')
+        .values('participant_id', 'competition_id', 'competition__title', 'competition__type', 'submitted_at',
+                *RESULT_FIELDS)
+    )
+    recent = {participant_id: [] for participant_id in participant_ids}
+    for row in latest:
+        recent[row['participant_id']].append(_entry(
+            row['competition_id'], row['competition__title'], row['competition__type'], row, row['submitted_at'],
+        ))
+    return recent
+
+
+def _locked(participant_ids):
+    ParticipantStats.objects.bulk_create(
+        [ParticipantStats(participant_id=participant_id) for participant_id in participant_ids],
+        ignore_conflicts=True,
+    )
+    return ParticipantStats.objects.select_for_update().in_bulk(participant_ids)
+
+
+@transaction.atomic
+def apply_changes(changes):
+    """Fold result changes into the stats of their participants.
+
+    ``changes`` are ``(participant_id, competition, old_fields, new_fields)``;
+    the field dicts hold ``wpm``, ``accuracy`` and ``score``. ``old_fields``
+    is ``None`` for a first submission and ``new_fields`` is ``None`` for a
+    deleted result. Call it after the results themselves have been written.
+    """
+    rows = _locked({participant_id for participant_id, *_ in changes})
+    now = timezone.now()
+    stale_bests, short_recent = set(), set()
+    for participant_id, competition, old, new in changes:
+        stats = rows[participant_id]
+        stats.recent = [entry for entry in stats.recent if entry['competition'] != competition.id]
+        if old is not None:
+            _add(stats, competition, old, -1)
+            if _lost_best(stats, competition, old, new):
+                stale_bests.add(participant_id)
+        if new is not None:
+            _add(stats, competition, new, +1)
+            stats.best_score = max(stats.best_score, new['score'])
+            if competition.type in TYPING_TYPES:
+                stats.best_wpm = max(stats.best_wpm, new['wpm'])
+            stats.recent = [_entry(competition.id, competition.title, competition.type, new, now)] + stats.recent
+            del stats.recent[RECENT_SIZE:]
+        elif len(stats.recent) < min(stats.races, RECENT_SIZE):
+            short_recent.add(participant_id)
+
+    for participant_id, totals in _totals(stale_bests).items():
+        rows[participant_id].best_wpm, rows[participant_id].best_score = totals['best_wpm'], totals['best_score']
+    for participant_id in stale_bests:
+        if not rows[participant_id].races:
+            rows[participant_id].best_wpm = rows[participant_id].best_score = 0.0
+    for participant_id, recent in _recent(short_recent).items():
+        rows[participant_id].recent = recent
+    for stats in rows.values():
+        stats.updated_at = now
+    ParticipantStats.objects.bulk_update(rows.values(), STATS_FIELDS + ['updated_at'])
+
+
+def record(result, competition, previous=None):
+    """Fold a saved result in; ``previous`` holds the fields of the submission it replaced."""
+    fields = {field: getattr(result, field) for field in RESULT_FIELDS}
+    apply_changes([(result.participant_id, competition, previous, fields)])
+
+
+def forget(result, competition):
+    """Take a deleted result back out."""
+    fields = {field: getattr(result, field) for field in RESULT_FIELDS}
+    apply_changes([(result.participant_id, competition, fields, None)])
+
+
+@transaction.atomic
+def rebuild(participant_ids):
+    """Recompute the stats of ``participant_ids`` from their results."""
+    participant_ids = set(participant_ids)
+    rows = _locked(participant_ids)
+    totals = _totals(participant_ids)
+    for participant_id, recent in _recent(participant_ids).items():
+        stats = rows[participant_id]
+        for field, value in totals.get(participant_id, {}).items():
+            setattr(stats, field, value)
+        if participant_id not in totals:
+            for field in STATS_FIELDS:
+                setattr(stats, field, ParticipantStats._meta.get_field(field).get_default())
+        stats.recent = recent
+        stats.updated_at = timezone.now()
+    ParticipantStats.objects.bulk_update(rows.values(), STATS_FIELDS + ['updated_at'])
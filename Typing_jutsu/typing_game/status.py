@@ -0,0 +1,65 @@
+"""
+Cached competition status used by the lobby polling endpoint.
+
+Each competition has a state version in the cache. Views that change
+``started``/``start_time``/``status`` call ``bump_version`` and the cached
+payload for the old version simply stops being read. The version is seeded
+from the clock rather than counted from 1, so a version lost to cache
+eviction is never handed out again with different contents. Every process
+that changes a status must share the cache, which is why a separate
+``run_expiry`` worker needs a shared backend (see ``checks.py``).
+"""
+import time
+
+from django.core.cache import cache
+
+from .models import Competition
+
+STATUS_TIMEOUT = 60 * 60  # Payloads are immutable per version; this only bounds memory.
+
+
+def _version_key(competition_id):
+    return f'competition:{competition_id}:status_version'
+
+
+def _payload_key(competition_id, version):
+    return f'competition:{competition_id}:status:{version}'
+
+
+def bump_version(competition_id):
+    """Invalidate the cached status of a competition."""
+    cache.set(_version_key(competition_id), time.time_ns(), None)
+
+
+async def aget_version(competition_id):
+    version = await cache.aget(_version_key(competition_id))
+    if version is None:
+        await cache.aadd(_version_key(competition_id), time.time_ns(), None)
+        version = await cache.aget(_version_key(competition_id))
+    return version
+
+
+def make_etag(competition_id, version):
+    return f'"{competition_id}-{version}"'
+
+
+async def aget_status(competition_id):
+    """Return ``(etag, payload)``, or ``(None, None)`` if the competition doesn't exist.
+
+    Only a cache miss reads the database.
+    """
+    version = await aget_version(competition_id)
+    payload = await cache.aget(_payload_key(competition_id, version))
+    if payload is None:
+        competition = await Competition.objects.filter(id=competition_id).values('status', 'started', 'start_time').afirst()
+        if competition is None:
+            return None, None
+        payload = {
+            'status': competition['status'],
+            'started': competition['started'],
+            'start_time': competition['start_time'].isoformat() if competition['started'] else None,
+        }
+        # Stored under the version read *before* the query: if a bump raced us,
+        # this entry is already unreachable.
+        await cache.aset(_payload_key(competition_id, version), payload, STATUS_TIMEOUT)
+    return make_etag(competition_id, version), payload
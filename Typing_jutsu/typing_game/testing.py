@@ -0,0 +1,45 @@
+"""
+Settings helpers shared by the tests, the benchmarks and ``simulate_race``.
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+
+def plain_static_files():
+    """Serve ``{% static %}`` under plain names, for pages rendered without a collectstatic manifest."""
+    return override_settings(STORAGES={
+        **settings.STORAGES,
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    })
+
+
+@contextmanager
+def isolated_database(concurrent_writers=False):
+    """Run the enclosed block against a fresh test database, with plain static file names.
+
+    With ``concurrent_writers`` a SQLite test database lives in a file and
+    takes its write lock up front, as a deployed one would; the default
+    in-memory database fails concurrent writers with "table is locked".
+    """
+    setup_test_environment()
+    static_files = plain_static_files()
+    static_files.enable()
+    settings_dict = connection.settings_dict
+    old_name, old_test, old_options = settings_dict['NAME'], dict(settings_dict['TEST']), dict(settings_dict['OPTIONS'])
+    if concurrent_writers and connection.vendor == 'sqlite':
+        settings_dict['TEST']['NAME'] = os.path.join(tempfile.gettempdir(), 'typing_jutsu_benchmark.sqlite3')
+        settings_dict['OPTIONS'].update(transaction_mode='IMMEDIATE', timeout=30)
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        settings_dict['TEST'], settings_dict['OPTIONS'] = old_test, old_options
+        static_files.disable()
+        teardown_test_environment()
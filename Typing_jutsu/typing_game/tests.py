@@ -1,3 +1,1035 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test import LiveServerTestCase, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import checks, corpus, events, expiry, identity, ingest, jumble, leaderboard, lifecycle, metrics, practice, roster, scoring, simulation
+from .models import Participant, Organizer, Competition, CompetitionResult, Paragraph
+from .testing import plain_static_files
+from .views import COMPETITIONS_PER_PAGE, _store_result
+
+# Pages render {% static %} here without a collectstatic manifest
+_static_files = plain_static_files()
+
+
+def setUpModule():
+    _static_files.enable()
+
+
+def tearDownModule():
+    _static_files.disable()
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class CompetitionListingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.organizer = Organizer(name='organizer', email='organizer@example.com', mobile_num='9999999999')
+        self.organizer.set_password('password123')
+        self.organizer.save()
+        participant = Participant(name='participant')
+        participant.set_password('password123')
+        participant.save()
+        session = self.client.session
+        session['user_id'] = participant.id
+        session['user_role'] = 'participant'
+        session.save()
+
+    def create_competitions(self, count, start=None):
+        start = start or timezone.now()
+        Competition.objects.bulk_create([
+            Competition(
+                title=f'Competition {i}', type='Normal', organizer=self.organizer,
+                start_time=start - timedelta(hours=i), paragraphs=[{'text': 'lorem ipsum ' * 200}],
+            )
+            for i in range(count)
+        ])
+
+    def count_listing_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('typing_game:competitions'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_competitions(self):
+        self.create_competitions(3)
+        self.count_listing_queries()  # Warm the cached profile
+        few = self.count_listing_queries()
+        self.create_competitions(COMPETITIONS_PER_PAGE * 3)
+        many = self.count_listing_queries()
+        self.assertEqual(few, many)
+
+    def test_cursor_pages_cover_every_competition_once(self):
+        self.create_competitions(COMPETITIONS_PER_PAGE * 2 + 5)
+        seen = []
+        url = reverse('typing_game:competitions')
+        while url:
+            response = self.client.get(url)
+            page = response.context['competitions']
+            self.assertLessEqual(len(page), COMPETITIONS_PER_PAGE)
+            seen.extend(competition.id for competition in page)
+            next_query = response.context.get('next_page_query')
+            url = f"{reverse('typing_game:competitions')}?{next_query}" if next_query else None
+        self.assertEqual(sorted(seen), sorted(Competition.objects.values_list('id', flat=True)))
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_when_filter_uses_computed_end_time(self):
+        now = timezone.now()
+        Competition.objects.create(title='Running', type='Normal', organizer=self.organizer,
+                                   start_time=now - timedelta(minutes=1), duration=5)
+        Competition.objects.create(title='Finished', type='Normal', organizer=self.organizer,
+                                   start_time=now - timedelta(minutes=10), duration=5)
+        Competition.objects.create(title='Upcoming', type='Normal', organizer=self.organizer,
+                                   start_time=now + timedelta(hours=1))
+        url = reverse('typing_game:competitions')
+        past = self.client.get(url, {'when': 'past'}).context['competitions']
+        upcoming = self.client.get(url, {'when': 'upcoming'}).context['competitions']
+        self.assertEqual([c.title for c in past], ['Finished'])
+        self.assertEqual([c.title for c in upcoming], ['Upcoming'])
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ProfileCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.participant = Participant(name='participant')
+        self.participant.set_password('password123')
+        self.participant.save()
+        self.client.post(reverse('typing_game:login'), {'username': 'participant', 'password': 'password123'})
+
+    def test_logged_in_pages_skip_profile_lookup(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('typing_game:home'))
+        self.assertEqual(response.context['profile_user'], self.participant)
+        self.assertFalse([q for q in queries if 'participants' in q['sql']])
+
+    def test_only_the_fields_pages_need_are_cached(self):
+        cached = cache.get(identity._cache_key('participant', self.participant.id))
+        self.assertEqual(cached, (self.participant.id, 'participant'))
+        profile = identity.get_profile('participant', self.participant.id)
+        self.assertIsInstance(profile, Participant)
+        self.assertEqual(profile.get_deferred_fields(), {'password', 'created_at'})
+
+    def test_deleted_profile_ends_session(self):
+        self.participant.delete()
+        response = self.client.get(reverse('typing_game:competitions'))
+        self.assertRedirects(response, reverse('typing_game:login'))
+        self.assertNotIn('user_id', self.client.session)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class LoginTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        organizer = Organizer(name='host', email='host@example.com', mobile_num='9999999999')
+        organizer.set_password('password123')
+        organizer.save()
+
+    def test_organizer_logs_in_by_name_with_one_lookup_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('typing_game:login'), {'username': 'host', 'password': 'password123'})
+        self.assertRedirects(response, reverse('typing_game:home'), fetch_redirect_response=False)
+        self.assertEqual(self.client.session['user_role'], 'organizer')
+        self.assertEqual(len([q for q in queries if 'organizers' in q['sql']]), 1)
+
+    def test_signup_rejects_taken_name(self):
+        self.client.post(reverse('typing_game:signup'), {'role': 'participant', 'username': 'host', 'password': 'password123'})
+        self.assertFalse(Participant.objects.filter(name='host').exists())
+
+    def test_organizer_signup_losing_an_email_race_reports_it(self):
+        # The email check passes, but a concurrent signup takes the row first
+        with mock.patch('django.db.models.QuerySet.exists', return_value=False):
+            response = self.client.post(reverse('typing_game:signup'), {
+                'role': 'organizer', 'username': 'other', 'password': 'password123',
+                'email': 'host@example.com', 'mobile_num': '8888888888',
+            })
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Email already registered')
+        self.assertEqual(Organizer.objects.filter(email='host@example.com').count(), 1)
+
+    @override_settings(PASSWORD_HASHERS=[
+        'django.contrib.auth.hashers.MD5PasswordHasher', 'typing_game.hashers.BurstScryptPasswordHasher',
+    ])
+    def test_login_rehashes_with_current_policy(self):
+        participant = Participant.objects.create(
+            name='student', password=make_password('password123', hasher='scrypt_burst'),
+        )
+        self.client.post(reverse('typing_game:login'), {'username': 'student', 'password': 'password123'})
+        participant.refresh_from_db()
+        self.assertTrue(participant.password.startswith('md5$'))
+        self.assertEqual(self.client.session['user_id'], participant.id)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AsyncViewAccessTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.organizer = Organizer(name='host', email='host@example.com', mobile_num='9999999999')
+        self.organizer.set_password('password123')
+        self.organizer.save()
+        self.race = Competition.objects.create(title='Race', type='Normal', description='Race', duration=1,
+                                               organizer=self.organizer, start_time=timezone.now(), status='active')
+
+    async def log_in_as(self, profile, role):
+        session = await self.async_client.asession()
+        await session.aupdate({'user_id': profile.id, 'user_role': role})
+        await session.asave()
+
+    async def test_anonymous_users_are_sent_to_login(self):
+        for url in (reverse('typing_game:live_competition', args=[self.race.id]),
+                    reverse('typing_game:competition_status_api', args=[self.race.id])):
+            response = await self.async_client.get(url)
+            self.assertRedirects(response, reverse('typing_game:login'), fetch_redirect_response=False)
+
+    async def test_wrong_role_is_sent_home(self):
+        await self.log_in_as(self.organizer, 'organizer')
+        response = await self.async_client.post(reverse('typing_game:submit_result', args=[self.race.id]), {'wpm': 50})
+        self.assertRedirects(response, reverse('typing_game:home'), fetch_redirect_response=False)
+        self.assertFalse(await CompetitionResult.objects.aexists())
+
+        await self.log_in_as(await Participant.objects.acreate(name='racer'), 'participant')
+        response = await self.async_client.get(reverse('typing_game:export_results'))
+        self.assertRedirects(response, reverse('typing_game:home'), fetch_redirect_response=False)
+
+    async def test_async_login_opens_async_views(self):
+        response = await self.async_client.post(reverse('typing_game:login'), {'username': 'host', 'password': 'password123'})
+        self.assertRedirects(response, reverse('typing_game:home'), fetch_redirect_response=False)
+        session = await self.async_client.asession()
+        self.assertEqual(await session.aget('user_role'), 'organizer')
+        response = await self.async_client.get(reverse('typing_game:competition_status_api', args=[self.race.id]))
+        self.assertEqual(response.status_code, 200)
+
+    async def test_session_of_a_deleted_profile_is_flushed(self):
+        participant = await Participant.objects.acreate(name='racer')
+        await self.log_in_as(participant, 'participant')
+        await participant.adelete()
+        response = await self.async_client.get(reverse('typing_game:competition_status_api', args=[self.race.id]))
+        self.assertRedirects(response, reverse('typing_game:login'), fetch_redirect_response=False)
+        session = await self.async_client.asession()
+        self.assertIsNone(await session.aget('user_id'))
+
+
+class LifecycleTests(TestCase):
+    def setUp(self):
+        self.organizer = Organizer.objects.create(name='host', email='host@example.com', mobile_num='9999999999')
+        self.competition = Competition.objects.create(
+            title='Race', type='Normal', organizer=self.organizer, start_time=timezone.now(),
+        )
+
+    def test_each_transition_wins_once(self):
+        cid, oid = self.competition.id, self.organizer.id
+        self.assertTrue(lifecycle.activate(cid, oid))
+        self.assertFalse(lifecycle.activate(cid, oid))
+        self.assertIsNotNone(lifecycle.start(cid, oid))
+        self.assertIsNone(lifecycle.start(cid, oid))
+        self.assertFalse(lifecycle.end(cid))  # Not over yet
+        self.assertTrue(lifecycle.end(cid, timezone.now() + timedelta(hours=1)))
+        self.assertFalse(lifecycle.deactivate(cid, oid))
+        self.competition.refresh_from_db()
+        self.assertEqual((self.competition.status, self.competition.started, self.competition.expired),
+                         ('ended', True, True))
+
+    def test_transition_only_writes_changed_columns(self):
+        Competition.objects.filter(id=self.competition.id).update(status='active')
+        with CaptureQueriesContext(connection) as queries:
+            lifecycle.start(self.competition.id, self.organizer.id)
+        update = next(q['sql'] for q in queries if q['sql'].startswith('UPDATE'))
+        self.assertNotIn('paragraphs', update)
+        self.assertNotIn('title', update)
+
+    def test_other_organizer_cannot_activate(self):
+        other = Organizer.objects.create(name='other', email='other@example.com', mobile_num='8888888888')
+        self.assertFalse(lifecycle.activate(self.competition.id, other.id))
+
+    @override_settings(COMPETITION_EXPIRY='worker')
+    def test_joined_participant_can_reenter_a_started_race(self):
+        joined, stranger = Participant.objects.create(name='joined'), Participant.objects.create(name='stranger')
+        Competition.objects.filter(id=self.competition.id).update(status='active')
+        roster.join(self.competition.id, joined)
+        lifecycle.start(self.competition.id, self.organizer.id)
+        join_url = reverse('typing_game:join_competition', args=[self.competition.id])
+        live_url = reverse('typing_game:live_competition', args=[self.competition.id])
+        for participant, expected in [(joined, live_url), (stranger, reverse('typing_game:competitions'))]:
+            session = self.client.session
+            session['user_id'] = participant.id
+            session['user_role'] = 'participant'
+            session.save()
+            self.assertRedirects(self.client.get(join_url), expected, fetch_redirect_response=False)
+            listing = self.client.get(reverse('typing_game:competitions'))
+            self.assertEqual(live_url in listing.content.decode(), participant == joined)
+
+
+class ExpiryTests(TestCase):
+    def setUp(self):
+        self.organizer = Organizer.objects.create(name='host', email='host@example.com', mobile_num='9999999999')
+        self.now = timezone.now()
+
+    def started_competition(self, minutes_left):
+        return Competition.objects.create(
+            title='Race', type='Normal', organizer=self.organizer, status='started', started=True,
+            start_time=self.now - timedelta(minutes=5 - minutes_left), duration=5,
+        )
+
+    def test_ends_only_due_competitions(self):
+        over, running = self.started_competition(-1), self.started_competition(2)
+        scheduler = expiry.ExpiryScheduler()
+        scheduler.refresh(self.now)
+        next_due = scheduler.run_pending(self.now)
+        self.assertEqual(Competition.objects.get(id=over.id).status, 'ended')
+        self.assertEqual(Competition.objects.get(id=running.id).status, 'started')
+        self.assertEqual(next_due, running.end_time)
+
+    def test_edit_moves_end_back(self):
+        competition = self.started_competition(1)
+        scheduler = expiry.ExpiryScheduler()
+        scheduler.refresh(self.now)
+        Competition.objects.filter(id=competition.id).update(duration=10)
+        later = self.now + timedelta(minutes=2)
+        self.assertEqual(scheduler.run_pending(later), competition.start_time + timedelta(minutes=10))
+        self.assertEqual(Competition.objects.get(id=competition.id).status, 'started')
+
+    def test_submissions_close_after_grace(self):
+        competition = self.started_competition(-1)
+        self.assertTrue(expiry.accepts_results(competition, competition.end_time + expiry.SUBMISSION_GRACE))
+        self.assertFalse(expiry.accepts_results(competition, competition.end_time + expiry.SUBMISSION_GRACE * 2))
+
+
+@override_settings(COMPETITION_EXPIRY='worker')  # Keep the scheduler thread off the test database
+class RosterTests(TestCase):
+    def setUp(self):
+        self.organizer = Organizer.objects.create(name='host', email='host@example.com', mobile_num='9999999999')
+        self.competition = Competition.objects.create(
+            title='Race', type='Normal', organizer=self.organizer, start_time=timezone.now(), status='active',
+        )
+        self.racers = Participant.objects.bulk_create([Participant(name=f'racer{i}') for i in range(3)])
+
+    def test_diff_nets_out_changes(self):
+        cid = self.competition.id
+        first, second, third = self.racers
+        roster.join(cid, first)
+        version = roster.preview(cid)['version']
+        self.assertFalse(roster.join(cid, first))
+        roster.join(cid, second)
+        roster.leave(cid, first.id)
+        roster.join(cid, third)
+        roster.leave(cid, third.id)
+        roster.join(cid, third)
+        diff = roster.changes_since(cid, version)
+        self.assertEqual(diff['joined'], [[second.id, 'racer1'], [third.id, 'racer2']])
+        self.assertEqual(diff['left'], [first.id])
+        self.assertEqual(diff['count'], 2)
+        self.assertEqual(roster.changes_since(cid, diff['version'])['joined'], [])
+
+    def test_register_skips_joined_and_unknown_names(self):
+        cid = self.competition.id
+        roster.join(cid, self.racers[0])
+        added, unknown = roster.register(cid, ['racer0', 'racer1', 'racer2', 'nobody'])
+        self.assertEqual((added, unknown), (2, ['nobody']))
+        self.assertEqual(Competition.objects.get(id=cid).participant_count, 3)
+        self.assertEqual(len(roster.changes_since(cid, 0)['joined']), 3)
+
+    def test_reset_clears_roster(self):
+        cid = self.competition.id
+        for racer in self.racers:
+            roster.join(cid, racer)
+        roster.reset(cid)
+        roster.join(cid, self.racers[0])
+        diff = roster.changes_since(cid, 0)
+        self.assertTrue(diff['reset'])
+        self.assertEqual(diff['joined'], [[self.racers[0].id, 'racer0']])
+        self.assertEqual(diff['count'], 1)
+
+    def test_join_cost_does_not_grow_with_roster(self):
+        many = Participant.objects.bulk_create([Participant(name=f'extra{i}') for i in range(roster.PREVIEW_SIZE * 2)])
+        with CaptureQueriesContext(connection) as first:
+            roster.join(self.competition.id, self.racers[0])
+        for participant in many:
+            roster.join(self.competition.id, participant)
+        with CaptureQueriesContext(connection) as last:
+            roster.join(self.competition.id, self.racers[1])
+        self.assertEqual(len(first), len(last))
+
+    def test_lobby_renders_only_preview(self):
+        many = Participant.objects.bulk_create([Participant(name=f'extra{i}') for i in range(roster.PREVIEW_SIZE + 5)])
+        for participant in many:
+            roster.join(self.competition.id, participant)
+        session = self.client.session
+        session['user_id'] = self.organizer.id
+        session['user_role'] = 'organizer'
+        session.save()
+        response = self.client.get(reverse('typing_game:live_competition', args=[self.competition.id]))
+        self.assertEqual(len(response.context['roster']['joined']), roster.PREVIEW_SIZE)
+        self.assertContains(response, 'and 5 more')
+
+
+@override_settings(COMPETITION_EXPIRY='worker')
+class CorpusTests(TestCase):
+    def setUp(self):
+        self.organizer = Organizer.objects.create(name='host', email='host@example.com', mobile_num='9999999999')
+        session = self.client.session
+        session['user_id'] = self.organizer.id
+        session['user_role'] = 'organizer'
+        session.save()
+
+    def create(self, title, paragraphs):
+        self.client.post(reverse('typing_game:create_competition'), {
+            'title': title, 'type': 'Normal', 'description': 'Race', 'duration': 3,
+            'start_time': '2030-01-01T10:00:00+00:00', 'paragraphs': paragraphs,
+        })
+        return Competition.objects.get(title=title)
+
+    def test_texts_are_stored_once_and_tokenized(self):
+        first = self.create('First', 'The quick  brown fox.\n\nJumps over the dog.')
+        second = self.create('Second', 'Jumps over the dog.')
+        self.assertEqual(Paragraph.objects.count(), 2)
+        self.assertEqual(first.paragraphs, [])
+        self.assertEqual(corpus.competition_tokens(first), ['The', 'quick', 'brown', 'fox.', 'Jumps', 'over', 'the', 'dog.'])
+        self.assertEqual(corpus.competition_texts(second), ['Jumps over the dog.'])
+        paragraph = Paragraph.objects.get(text='The quick brown fox.')
+        self.assertEqual(paragraph.offsets, [0, 4, 10, 16])
+        self.assertEqual((paragraph.word_count, paragraph.char_count), (4, 20))
+
+    def test_import_streams_and_dedupes(self):
+        text = 'one two three four five\nsix seven\n\nCHAPTER 1\n\n' * 3 + 'alpha beta gamma delta epsilon\n'
+        lines = iter(io.StringIO(text))
+        stats = corpus.import_paragraphs(lines, batch_size=1)
+        self.assertEqual(stats, {'read': 7, 'added': 2, 'duplicates': 2, 'skipped': 3})
+        self.assertTrue(Paragraph.objects.filter(text='one two three four five six seven').exists())
+
+    def test_long_runs_are_split(self):
+        paragraphs = list(corpus.iter_paragraphs(['word ' * 100] * 10, max_chars=1000))
+        self.assertEqual(len(paragraphs), 5)
+        paragraphs = list(corpus.iter_paragraphs(['word ' * 1000, 'x' * 2500], max_chars=1000))
+        self.assertEqual([len(paragraph) for paragraph in paragraphs], [999] * 5 + [1000, 1000, 500])
+        self.assertEqual(''.join(paragraphs[:5]).replace(' ', ''), 'word' * 1000)
+
+    def test_upload_endpoint(self):
+        upload = SimpleUploadedFile('book.txt', b'one two three four five\r\n\r\nsix seven eight nine ten\r\n')
+        response = self.client.post(reverse('typing_game:import_paragraphs'), {'file': upload})
+        self.assertEqual(response.json()['added'], 2)
+
+    def test_live_page_gets_tokens(self):
+        competition = self.create('Race', 'Hello <b>world</b>')
+        participant = Participant.objects.create(name='racer')
+        session = self.client.session
+        session['user_id'] = participant.id
+        session['user_role'] = 'participant'
+        session.save()
+        response = self.client.get(reverse('typing_game:live_competition', args=[competition.id]))
+        self.assertEqual(response.context['words'], ['Hello', '<b>world</b>'])
+        self.assertContains(response, 'id="competition-words"')
+
+        # Race scripts come from cacheable bundles, configured by one JSON blob
+        config = response.context['live_config']
+        self.assertEqual(config['user_role'], 'participant')
+        self.assertEqual(config['urls']['status'], reverse('typing_game:competition_status_api', args=[competition.id]))
+        self.assertContains(response, 'id="live-config"')
+        self.assertContains(response, 'js/live_typing.js')
+        self.assertNotContains(response, 'function checkInput')
+
+
+class ScoringTests(TestCase):
+    def setUp(self):
+        organizer = Organizer.objects.create(name='host', email='host@example.com', mobile_num='9999999999')
+        self.race = Competition.objects.create(title='Race', type='Reverse', description='Race', duration=1,
+                                               organizer=organizer, start_time=timezone.now())
+        corpus.set_competition_texts(self.race, ['one two three'])
+
+    def log(self, keys, delta=100):
+        return json.dumps({'t': [delta] * len(keys), 'k': keys})
+
+    def test_reverse_races_are_typed_back_to_front(self):
+        self.assertEqual(scoring.competition_words(self.race), ['three', 'two', 'one'])
+        result = scoring.score_submission(self.race, self.log('thx\bree two one '))
+        self.assertEqual((result['accuracy'], result['correct_keystrokes'], result['total_keystrokes']), (100, 14, 16))
+        self.race.type = 'Normal'
+        result = scoring.score_submission(self.race, self.log('three two one '))
+        self.assertEqual((result['accuracy'], result['correct_keystrokes']), (33.33, 4))
+
+    def test_malformed_logs_are_rejected(self):
+        logs = [
+            '', 'not json', '[]', '{"k": "a"}', '{"t": [1], "k": "ab"}', '{"t": [-1], "k": "a"}',
+            '{"t": [1.5], "k": "a"}', '{"t": [true], "k": "a"}', '{"t": "1", "k": "a"}',
+            self.log('a' * scoring.MAX_LOG_BYTES),
+        ]
+        for raw in logs:
+            with self.subTest(raw=raw[:40]), self.assertRaises(scoring.ScoringError):
+                scoring.parse_log(raw)
+
+    def test_time_taken_is_bounded_by_the_log_and_the_duration(self):
+        deltas, keys = scoring.parse_log(self.log('three two ', delta=200))  # 2 seconds of typing
+        for reported, elapsed in [(None, 2), (1, 2), (30, 30), (600, 60)]:
+            with self.subTest(reported=reported):
+                result = scoring.score_keystrokes(['three', 'two'], deltas, keys, 60, reported)
+                self.assertEqual(result['time_taken'], elapsed)
+                self.assertEqual(result['wpm'], round(10 / 5 / (elapsed / 60), 2))
+        deltas[-1] = (60 + scoring.GRACE_SECONDS) * 1000
+        with self.assertRaises(scoring.ScoringError):
+            scoring.score_keystrokes(['three', 'two'], deltas, keys, 60)
+
+
+class PracticeTests(TestCase):
+    def setUp(self):
+        practice._index = None
+        self.addCleanup(setattr, practice, '_index', None)
+        common = 'the cat sat on the mat and the dog ran to the park'
+        corpus.add_paragraphs(
+            [f'{common} {n}' for n in range(6)]
+            + [f'Quixotic, zealous; xylophones {n}: jubilant! perplexing? syzygy.' for n in range(3)]
+        )
+        participant = Participant.objects.create(name='racer')
+        session = self.client.session
+        session['user_id'] = participant.id
+        session['user_role'] = 'participant'
+        session.save()
+
+    def test_texts_match_parameters(self):
+        easy = practice.practice_text('easy', 25, seed=3)
+        self.assertEqual(len(easy['text'].split(' ')), 25)
+        self.assertEqual(easy, practice.practice_text('easy', '25', seed='3'))
+        self.assertNotIn('syzygy.', easy['text'])
+        self.assertIn('syzygy.', practice.practice_text('hard', 50, seed=3)['text'])
+        self.assertEqual(practice.practice_text('insane', 7)['length'], practice.DEFAULT_LENGTH)
+
+    def test_warm_page_load_skips_corpus(self):
+        self.client.get(reverse('typing_game:practice'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('typing_game:practice'), {'level': 'medium', 'length': 100})
+        self.assertEqual(len(response.context['words']), 100)
+        self.assertFalse([q for q in queries if 'paragraphs' in q['sql']])
+        data = self.client.get(reverse('typing_game:practice_text_api'), {'level': 'hard', 'seed': 1}).json()
+        self.assertEqual((data['level'], data['seed']), ('hard', 1))
+
+
+@override_settings(COMPETITION_EXPIRY='worker')
+class JumbleTests(TestCase):
+    def setUp(self):
+        organizer = Organizer.objects.create(name='host', email='host@example.com', mobile_num='9999999999')
+        self.competition = Competition.objects.create(
+            title='Words', type='Jumble-words', description='Unscramble', organizer=organizer, duration=1,
+            start_time=timezone.now(), status='started', started=True,
+            paragraphs=[{'answer': answer} for answer in ['python', 'ice cream', 'django', 'aab']],
+        )
+        self.participant = Participant.objects.create(name='racer')
+        session = self.client.session
+        session['user_id'] = self.participant.id
+        session['user_role'] = 'participant'
+        session.save()
+
+    def test_jumbles_are_seeded_and_never_the_answer(self):
+        answers = ['ab', 'aab', 'stop', 'ice cream']
+        for seed in range(200):
+            puzzles = jumble.puzzle_set(answers, seed)
+            self.assertEqual(puzzles, jumble.puzzle_set(answers, seed))
+            self.assertCountEqual([answer for _, answer in puzzles], answers)
+            for text, answer in puzzles:
+                self.assertNotEqual(text, answer)
+                self.assertEqual(sorted(text), sorted(answer))
+        self.assertFalse(jumble.can_jumble('zzz'))
+
+    def test_page_gets_jumbles_and_hashes_only(self):
+        response = self.client.get(reverse('typing_game:live_competition', args=[self.competition.id]))
+        puzzles = response.context['puzzles']
+        self.assertEqual(len(puzzles['puzzles']), 4)
+        self.assertNotContains(response, 'django')
+        seed = jumble.participant_seed(self.competition.id, self.participant.id)
+        first = jumble.puzzle_set(jumble.competition_answers(self.competition), seed)[0][1]
+        self.assertEqual(puzzles['puzzles'][0]['hash'], jumble.answer_hash(puzzles['salt'], first))
+        # The shuffle seed would let the page undo every jumble
+        self.assertNotContains(response, f'{seed:016x}')
+        self.assertNotContains(response, str(seed))
+
+    def test_answers_are_scored_on_the_server(self):
+        Competition.objects.filter(id=self.competition.id).update(start_time=timezone.now() - timedelta(seconds=30))
+        seed = jumble.participant_seed(self.competition.id, self.participant.id)
+        answers = [answer for _, answer in jumble.puzzle_set(jumble.competition_answers(self.competition), seed)]
+        typed = [answers[0].upper(), 'wrong', answers[2], 'nope']
+        self.client.post(reverse('typing_game:submit_result', args=[self.competition.id]), {
+            'answers': json.dumps(typed), 'time_taken': 0, 'score': 100, 'num_correct': 4,
+        })
+        result = self.competition.results.get()
+        self.assertEqual((result.num_correct, result.total_questions), (2, 4))
+        # 2/4 of 80, plus half of the 20 point time bonus (30 s of 60 by the server's clock) for 2/4 correct
+        self.assertAlmostEqual(result.score, 45.0, delta=0.5)
+
+    def test_wrong_or_blank_answers_earn_no_time_bonus(self):
+        result = jumble.score_submission(self.competition, self.participant.id, json.dumps(['x'] * 4))
+        self.assertEqual((result['num_correct'], result['score']), (0, 0))
+        with self.assertRaises(ValueError):
+            jumble.score_submission(self.competition, self.participant.id, json.dumps([' '] * 4))
+
+    def test_time_taken_must_be_finite(self):
+        with self.assertRaises(ValueError):
+            jumble.score_submission(self.competition, self.participant.id, '[]', 'nan')
+        with self.assertRaises(ValueError):
+            jumble.score_submission(self.competition, self.participant.id, '[]', 'inf')
+
+
+class TimeSyncTests(TestCase):
+    def test_server_time_is_uncached_and_free(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('typing_game:time_sync'))
+        self.assertAlmostEqual(response.json()['server_time'] / 1000, timezone.now().timestamp(), delta=5)
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertEqual(len(queries), 0)
+
+
+class StatusApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.organizer = Organizer.objects.create(name='host', email='host@example.com', mobile_num='9999999999')
+        self.race = Competition.objects.create(title='Race', type='Normal', description='Race', duration=1,
+                                               organizer=self.organizer, start_time=timezone.now())
+        self.url = reverse('typing_game:competition_status_api', args=[self.race.id])
+        session = self.client.session
+        session['user_id'] = Participant.objects.create(name='racer').id
+        session['user_role'] = 'participant'
+        session.save()
+
+    def competition_queries(self, etag=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, headers={'If-None-Match': etag} if etag else {})
+        return response, [q for q in queries if 'typing_game_competition' in q['sql']]
+
+    def test_unchanged_status_is_not_modified_and_skips_the_database(self):
+        response, queries = self.competition_queries()
+        self.assertEqual(response.json(), {'status': 'waiting', 'started': False, 'start_time': None})
+        self.assertEqual(len(queries), 1)
+        etag = response['ETag']
+        self.assertEqual(self.competition_queries()[1], [])  # Payload served from the cache
+        response, queries = self.competition_queries(f'"stale", {etag}')
+        self.assertEqual((response.status_code, response['ETag'], queries), (304, etag, []))
+
+    def test_transitions_change_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        lifecycle.activate(self.race.id, self.organizer.id)
+        start_time = lifecycle.start(self.race.id, self.organizer.id)
+        response = self.client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json(), {'status': 'started', 'started': True, 'start_time': start_time.isoformat()})
+
+    def test_unknown_competition(self):
+        self.url = reverse('typing_game:competition_status_api', args=[self.race.id + 1])
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+
+    def report(self, token='secret'):
+        return self.client.get(reverse('typing_game:metrics_api'), headers={'Authorization': f'Bearer {token}'})
+
+    @override_settings(REQUEST_METRICS_ENABLED=True, REQUEST_METRICS_TOKEN='secret')
+    def test_views_are_timed_and_their_queries_counted(self):
+        for _ in range(3):
+            self.client.get(reverse('typing_game:health_check'))
+        organizer = Organizer.objects.create(name='host', email='host@example.com', mobile_num='9999999999')
+        session = self.client.session
+        session['user_id'] = organizer.id
+        session['user_role'] = 'organizer'
+        session.save()
+        self.client.get(reverse('typing_game:leaderboard'))
+
+        rows = {row['view']: row for row in self.report().json()['views']}
+        self.assertEqual(rows['typing_game:health_check']['count'], 3)
+        self.assertEqual(rows['typing_game:health_check']['queries'], {'p50': 0, 'p95': 0, 'p99': 0})
+        self.assertGreater(rows['typing_game:leaderboard']['queries']['p50'], 0)  # The session and the page
+        self.assertGreater(rows['typing_game:leaderboard']['db_ms']['p50'], 0)
+        self.assertIn('typing_game:leaderboard', metrics.format_table(rows.values()))
+        self.assertEqual(self.report('wrong').status_code, 404)
+
+    @override_settings(REQUEST_METRICS_ENABLED=False, REQUEST_METRICS_TOKEN='secret')
+    def test_disabled_metrics_record_nothing(self):
+        self.client.get(reverse('typing_game:health_check'))
+        self.assertEqual(metrics.snapshot(), [])
+        self.assertEqual(self.report().status_code, 404)
+
+
+class SystemCheckTests(SimpleTestCase):
+    def test_expiry_worker_needs_a_shared_cache(self):
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/tmp'}}
+        local = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        for expiry_mode, caches, errors in [('worker', local, ['typing_game.E001']), ('worker', shared, []), ('thread', local, [])]:
+            with self.subTest(expiry_mode=expiry_mode, caches=caches), \
+                    override_settings(COMPETITION_EXPIRY=expiry_mode, CACHES=caches):
+                self.assertEqual([error.id for error in checks.check_expiry_cache(None)], errors)
+
+
+class ProgressTests(TestCase):
+    def setUp(self):
+        session = self.client.session
+        session['user_id'] = Participant.objects.create(name='racer').id
+        session['user_role'] = 'participant'
+        session.save()
+
+    def test_malformed_batches_are_rejected(self):
+        url = reverse('typing_game:submit_progress', args=[1])
+        bodies = [{'ticks': {'abc': 1}}, {'ticks': ['abc']}, {'ticks': []}, {'ticks': [[1, 2]]}, ['ticks'], {}]
+        for body in bodies:
+            with self.subTest(body=body):
+                response = self.client.post(url, json.dumps(body), content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+
+
+class ResultIngestTests(TestCase):
+    def setUp(self):
+        organizer = Organizer.objects.create(name='host', email='host@example.com', mobile_num='9999999999')
+        self.competition = Competition.objects.create(title='Race', type='Normal', organizer=organizer,
+                                                      start_time=timezone.now())
+        self.racers = [Participant.objects.create(name=f'racer{n}') for n in range(3)]
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def writer(self):
+        return ingest.ResultWriter(self.directory, flush_interval=60, batch_size=100)
+
+    def entry(self, racer, wpm, submitted=None):
+        fields = {**dict.fromkeys(ingest.RESULT_FIELDS, 0), 'wpm': wpm, 'score': wpm}
+        entry = {'c': self.competition.id, 'p': racer.id, 'f': fields}
+        if submitted is not None:
+            entry['s'] = submitted
+        return json.dumps(entry) + '\n'
+
+    def leave(self, name, *lines):
+        with open(os.path.join(self.directory, name), 'w') as leftover:
+            leftover.writelines(lines)
+
+    def test_rotate_moves_pending_entries_into_a_segment(self):
+        writer = self.writer()
+        writer.enqueue(self.competition.id, self.racers[0].id, dict.fromkeys(ingest.RESULT_FIELDS, 0))
+        writer._rotate()
+        self.assertEqual(writer.pending, 0)
+        self.assertEqual(len(ingest.read_segment(writer._segment_path(1))), 1)
+        self.assertEqual(os.path.getsize(writer.wal_path), 0)
+        self.assertEqual(writer.close(), 1)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_claims_dead_workers_and_leftovers_of_a_reused_pid(self):
+        pid = os.getpid()
+        self.leave('results-999999999.wal', self.entry(self.racers[0], 10))
+        self.leave(f'results-{pid}.wal.4.flushing', self.entry(self.racers[1], 20))
+        self.leave(f'results-{pid}.wal', self.entry(self.racers[1], 25), '{"torn')
+        writer = self.writer()
+        self.assertEqual(writer.segment, 7)  # Past the leftover segment, the two claimed files and their merge
+        writer.enqueue(self.competition.id, self.racers[2].id, dict.fromkeys(ingest.RESULT_FIELDS, 0))
+        writer.close()
+        wpm = dict(self.competition.results.values_list('participant__name', 'wpm'))
+        self.assertEqual(wpm, {'racer0': 10, 'racer1': 25, 'racer2': 0})
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_orphans_replay_in_submission_order(self):
+        # The dead worker with the lower PID holds the newer submission
+        self.leave('results-999999998.wal', self.entry(self.racers[0], 30, submitted=200), self.entry(self.racers[1], 5, submitted=100))
+        self.leave('results-999999999.wal', self.entry(self.racers[0], 20, submitted=150), self.entry(self.racers[1], 15, submitted=250))
+        writer = self.writer()
+        self.assertEqual(len(os.listdir(self.directory)), 2)  # One merged segment and the live file
+        writer.close()
+        wpm = dict(self.competition.results.values_list('participant__name', 'wpm'))
+        self.assertEqual(wpm, {'racer0': 30, 'racer1': 15})
+
+    def test_concurrent_submissions_share_fsyncs(self):
+        writer = self.writer()
+        self.addCleanup(writer.close)
+        submitters = 8
+        start = threading.Barrier(submitters)
+        fsyncs = []
+
+        def slow_fsync(fileno):
+            fsyncs.append(fileno)
+            time.sleep(0.05)
+
+        def submit(racer):
+            start.wait()
+            writer.enqueue(self.competition.id, racer.id, dict.fromkeys(ingest.RESULT_FIELDS, 0))
+
+        with mock.patch.object(ingest.os, 'fsync', slow_fsync):
+            threads = [threading.Thread(target=submit, args=(self.racers[n % 3],)) for n in range(submitters)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual((writer.appended, writer.synced), (submitters, submitters))
+        self.assertLess(len(fsyncs), submitters)
+
+    def test_replaying_a_segment_is_idempotent(self):
+        entries = [json.loads(self.entry(self.racers[0], 40)), json.loads(self.entry(self.racers[1], 50))]
+        ingest.write_results(entries)
+        ingest.write_results(entries)
+        self.assertEqual(self.competition.results.count(), 2)
+        self.assertEqual(self.racers[0].stats.races, 1)
+        self.assertEqual(list(self.competition.results.order_by('rank').values_list('rank', flat=True)), [1, 2])
+
+
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        organizer = Organizer.objects.create(name='host', email='host@example.com', mobile_num='9999999999')
+        self.race = Competition.objects.create(title='Race', type='Normal', description='Race', duration=1,
+                                               organizer=organizer, start_time=timezone.now())
+        self.racers = {}
+
+    def submit(self, name, wpm, time_taken=60):
+        if name not in self.racers:
+            self.racers[name] = Participant.objects.create(name=name)
+        _store_result(self.race, self.racers[name].id, {'wpm': wpm, 'accuracy': 100, 'time_taken': time_taken})
+
+    def standings(self):
+        results = list(self.race.results.order_by('rank').values_list('rank', 'participant__name'))
+        self.assertEqual([rank for rank, _ in results], list(range(1, len(results) + 1)))
+        self.race.refresh_from_db()
+        self.assertEqual(self.race.result_count, len(results))
+        return [name for _, name in results]
+
+    def test_new_results_shift_the_ones_below(self):
+        self.submit('slow', 40)
+        self.submit('fast', 80)
+        self.submit('middle', 60)
+        self.assertEqual(self.standings(), ['fast', 'middle', 'slow'])
+
+    def test_ties_go_to_the_quicker_then_the_earlier_result(self):
+        self.submit('first', 50)
+        self.submit('second', 50)
+        self.submit('quicker', 50, time_taken=30)
+        self.assertEqual(self.standings(), ['quicker', 'first', 'second'])
+
+    def test_resubmission_moves_a_result_up_or_down(self):
+        for name, wpm in [('a', 40), ('b', 50), ('c', 60), ('d', 70)]:
+            self.submit(name, wpm)
+        self.submit('b', 90)
+        self.assertEqual(self.standings(), ['b', 'd', 'c', 'a'])
+        self.submit('d', 10)
+        self.assertEqual(self.standings(), ['b', 'c', 'a', 'd'])
+        self.submit('c', 60)  # Same score again keeps its place
+        self.assertEqual(self.standings(), ['b', 'c', 'a', 'd'])
+
+    def test_removing_a_result_closes_the_gap(self):
+        for name, wpm in [('a', 40), ('b', 50), ('c', 60)]:
+            self.submit(name, wpm)
+        result = self.race.results.get(participant__name='b')
+        self.assertTrue(leaderboard.remove(result))
+        self.assertEqual(self.standings(), ['c', 'a'])
+        self.assertFalse(leaderboard.remove(result))
+        self.assertEqual(self.standings(), ['c', 'a'])
+
+    def test_full_ranking_is_linked_for_organizers_only(self):
+        for n in range(leaderboard.TOP_N + 1):
+            self.submit(f'racer{n}', 30 + n)
+        self.race.refresh_from_db()
+        link = reverse('typing_game:competition_leaderboard', args=[self.race.id])
+        template = 'typing_game/leaderboard.html'
+        page = {'competitions_with_results': leaderboard.attach_top_results([self.race]), 'user_id': self.race.organizer_id}
+        self.assertNotIn(link, render_to_string(template, {**page, 'user_role': 'participant'}))
+        self.assertIn(link, render_to_string(template, {**page, 'user_role': 'organizer'}))
+
+
+class ParticipantStatsTests(TestCase):
+    def setUp(self):
+        self.organizer = Organizer.objects.create(name='host', email='host@example.com', mobile_num='9999999999')
+        self.participant = Participant.objects.create(name='racer')
+        self.races = [
+            Competition.objects.create(title=f'Race {n}', type='Normal', description='Race', duration=1,
+                                       organizer=self.organizer, start_time=timezone.now())
+            for n in range(3)
+        ]
+
+    def submit(self, competition, wpm, accuracy=100.0):
+        _store_result(competition, self.participant.id, {'wpm': wpm, 'accuracy': accuracy})
+        self.participant.stats.refresh_from_db()
+        return self.participant.stats
+
+    def test_results_roll_up_incrementally(self):
+        self.submit(self.races[0], 40)
+        self.submit(self.races[1], 80, accuracy=50.0)
+        stats = self.submit(self.races[1], 60)  # Re-submission replaces the personal best
+        self.assertEqual((stats.races, stats.avg_wpm, stats.best_wpm, stats.avg_accuracy), (2, 50, 60, 100))
+        self.assertEqual([entry['title'] for entry in stats.recent], ['Race 1', 'Race 0'])
+
+        session = self.client.session
+        session['user_id'] = self.organizer.id
+        session['user_role'] = 'organizer'
+        session.save()
+        result = CompetitionResult.objects.get(competition=self.races[1])
+        self.client.get(reverse('typing_game:delete_result', args=[result.id]))
+        stats.refresh_from_db()
+        self.assertEqual((stats.races, stats.best_wpm, len(stats.recent)), (1, 40, 1))
+
+    def test_batched_writes_roll_up(self):
+        self.submit(self.races[0], 40)
+        fields = dict.fromkeys(ingest.RESULT_FIELDS, 0)
+        ingest.write_results([
+            {'c': self.races[0].id, 'p': self.participant.id, 'f': {**fields, 'wpm': 70, 'score': 70}},
+            {'c': self.races[2].id, 'p': self.participant.id, 'f': {**fields, 'wpm': 30, 'score': 30}},
+        ])
+        stats = self.participant.stats
+        stats.refresh_from_db()
+        self.assertEqual((stats.races, stats.wpm_total, stats.best_score), (2, 100, 70))
+
+    def test_profile_is_one_row(self):
+        for n, competition in enumerate(self.races):
+            self.submit(competition, 30 + n)
+        session = self.client.session
+        session['user_id'] = self.participant.id
+        session['user_role'] = 'participant'
+        session.save()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('typing_game:home'))
+        self.assertEqual(response.context['stats'].best_wpm, 32)
+        self.assertFalse([q for q in queries if 'competition_results' in q['sql']])
+        self.assertContains(response, 'Race 2')
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.organizer = Organizer.objects.create(name='host', email='host@example.com', mobile_num='9999999999')
+        other = Organizer.objects.create(name='other', email='other@example.com', mobile_num='9999999999')
+        racers = [Participant.objects.create(name=f'racer{n}') for n in range(3)]
+        self.race = Competition.objects.create(title='Mine', type='Normal', description='Race', duration=1,
+                                               organizer=self.organizer, start_time=timezone.now())
+        theirs = Competition.objects.create(title='Theirs', type='Normal', description='Race', duration=1,
+                                            organizer=other, start_time=timezone.now())
+        for n, racer in enumerate(racers):
+            _store_result(self.race, racer.id, {'wpm': 50 + n, 'accuracy': 100})
+        _store_result(theirs, racers[0].id, {'wpm': 90, 'accuracy': 100})
+        session = self.client.session
+        session['user_id'] = self.organizer.id
+        session['user_role'] = 'organizer'
+        session.save()
+        self.async_client.cookies = self.client.cookies
+
+    async def content(self, response):
+        # Streamed from an async generator, as under ASGI
+        return b''.join([block async for block in response.streaming_content])
+
+    async def test_csv_is_streamed_by_rank(self):
+        response = await self.async_client.get(reverse('typing_game:export_results'), {'competition': self.race.id})
+        self.assertTrue(response.is_async)
+        rows = list(csv.DictReader(io.StringIO((await self.content(response)).decode())))
+        self.assertEqual([row['participant'] for row in rows], ['racer2', 'racer1', 'racer0'])
+        self.assertEqual(rows[0]['rank'], '1')
+
+    async def test_ndjson_gzipped_and_limited_to_own_competitions(self):
+        response = await self.async_client.get(
+            reverse('typing_game:export_results'), {'format': 'ndjson', 'since': '2000-01-01'},
+            headers={'Accept-Encoding': 'gzip'},
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        lines = gzip.decompress(await self.content(response)).decode().splitlines()
+        self.assertEqual({json.loads(line)['competition'] for line in lines}, {'Mine'})
+        self.assertEqual(len(lines), 3)
+        response = await self.async_client.get(reverse('typing_game:export_results'), {'until': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(COMPETITION_EXPIRY='worker')
+class EventStreamTests(TestCase):
+    def setUp(self):
+        self.organizer = Organizer.objects.create(name='host', email='host@example.com', mobile_num='9999999999')
+        self.race = Competition.objects.create(title='Race', type='Normal', description='Race', duration=1,
+                                               organizer=self.organizer, start_time=timezone.now(), status='active')
+        session = self.client.session
+        session['user_id'] = Participant.objects.create(name='racer').id
+        session['user_role'] = 'participant'
+        session.save()
+        self.async_client.cookies = self.client.cookies
+
+    async def read_events(self, response, count):
+        # The stream never ends on its own while the race is open
+        chunks = response.streaming_content
+        try:
+            return [(await anext(chunks)).decode() for _ in range(count)]
+        finally:
+            await chunks.aclose()
+            response.close()  # As the ASGI handler does once the client leaves
+
+    async def test_events_published_before_the_stream_starts_are_delivered(self):
+        response = await self.async_client.get(reverse('typing_game:competition_events', args=[self.race.id]))
+        events.publish(self.race.id, 'started', {'start_time': 'soon'})
+        chunks = await self.read_events(response, 2)
+        self.assertTrue(chunks[1].startswith('event: started\n'))
+        self.assertEqual(events.subscriber_count(self.race.id), 0)
+
+    async def test_a_client_leaving_before_the_stream_starts_is_unsubscribed(self):
+        response = await self.async_client.get(reverse('typing_game:competition_events', args=[self.race.id]))
+        self.assertEqual(events.subscriber_count(self.race.id), 1)
+        response.close()
+        self.assertEqual(events.subscriber_count(self.race.id), 0)
+
+    async def test_an_inactive_competition_is_reported_at_once(self):
+        self.race.status = 'waiting'
+        await self.race.asave()
+        response = await self.async_client.get(reverse('typing_game:competition_events', args=[self.race.id]))
+        chunks = [chunk.decode() async for chunk in response.streaming_content]
+        self.assertEqual(chunks[1:], ['event: deactivated\ndata: {}\n\n'])
+        self.assertEqual(events.subscriber_count(self.race.id), 0)
+
+    async def test_owner_can_pre_register_on_a_waiting_competition(self):
+        self.race.status = 'waiting'
+        await self.race.asave()
+        session = await self.async_client.asession()
+        await session.aupdate({'user_id': self.organizer.id, 'user_role': 'organizer'})
+        await session.asave()
+        live = reverse('typing_game:live_competition', args=[self.race.id])
+        response = await self.async_client.post(
+            reverse('typing_game:register_participants', args=[self.race.id]), {'names': 'racer'},
+        )
+        self.assertRedirects(response, live, fetch_redirect_response=False)
+        self.assertEqual((await self.async_client.get(live)).status_code, 200)
+        # The lobby stays open for its owner instead of being sent away as deactivated
+        response = await self.async_client.get(reverse('typing_game:competition_events', args=[self.race.id]))
+        events.publish(self.race.id, 'roster', {'version': 1})
+        chunks = await self.read_events(response, 2)
+        self.assertTrue(chunks[1].startswith('event: roster\n'))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], COMPETITION_EXPIRY='worker')
+class RaceSimulationTests(TransactionTestCase):
+    def test_every_phase_succeeds_and_counts_queries(self):
+        race = simulation.RaceSimulation(participants=3, concurrency=1, polls=2, typing_seconds=5)
+        race.setup()
+        lines = []
+        phases = {phase.name: phase for phase in race.run(lines.append)}
+
+        self.assertEqual(len(phases['lobby polling'].latencies), 6)
+        self.assertFalse([name for name, phase in phases.items() if phase.errors])
+        self.assertTrue(phases['submit'].queries)
+        self.assertEqual(CompetitionResult.objects.filter(competition=race.competition).count(), 3)
+        self.assertEqual(len(lines), 2 + 7)  # Title, header and one line per reported phase
+
+    def test_asyncio_mode_runs_every_phase_in_one_loop(self):
+        race = simulation.RaceSimulation(participants=2, concurrency=2, mode='asyncio', polls=1, typing_seconds=5)
+        race.setup()
+        phases = race.run(lambda line: None)
+        self.assertEqual([phase.name for phase in phases if phase.errors], [])
+        self.assertEqual(CompetitionResult.objects.filter(competition=race.competition).count(), 2)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], COMPETITION_EXPIRY='worker')
+class RemoteRaceSimulationTests(LiveServerTestCase):
+    def test_asyncio_mode_against_a_server(self):
+        race = simulation.RaceSimulation(participants=2, concurrency=1, mode='asyncio', base_url=self.live_server_url,
+                                         polls=1, typing_seconds=5)
+        race.setup()
+        phases = race.run(lambda line: None)
+        self.assertEqual([phase.name for phase in phases if phase.errors], [])
+        self.assertEqual(CompetitionResult.objects.filter(competition=race.competition).count(), 2)
+        race.teardown()
+        self.assertFalse(Participant.objects.filter(name__startswith=race.prefix).exists())
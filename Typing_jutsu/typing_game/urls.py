@@ -11,21 +11,32 @@ urlpatterns = [
     # Main navigation URLs
     path('home/', views.home, name='home'),
     path('practice/', views.practice, name='practice'),
+    path('api/practice_text/', views.practice_text_api, name='practice_text_api'),
     path('competitions/', views.competitions, name='competitions'),
     path('competitions/create/', views.create_competition, name='create_competition'),
     
+    path('corpus/import/', views.import_paragraphs, name='import_paragraphs'),
     path('competitions/edit/<int:competition_id>/', views.edit_competition, name='edit_competition'),
     path('competitions/delete/<int:competition_id>/', views.delete_competition, name='delete_competition'),
     path('competitions/activate/<int:competition_id>/', views.activate_competition, name='activate_competition'),
     path('competitions/<int:competition_id>/deactivate/', views.deactivate_competition, name='deactivate_competition'),
 
     path('competitions/join/<int:competition_id>/', views.join_competition, name='join_competition'),
+    path('competitions/<int:competition_id>/register/', views.register_participants, name='register_participants'),
+    path('competitions/leave/<int:competition_id>/', views.leave_competition, name='leave_competition'),
     path('competitions/live/<int:competition_id>/', views.live_competition, name='live_competition'),
     path('competitions/start/<int:competition_id>/', views.start_competition, name='start_competition'),
     path('competitions/submit_result/<int:competition_id>/', views.submit_result, name='submit_result'),
     path('api/competition_status/<int:competition_id>/', views.competition_status_api, name='competition_status_api'),
+    path('api/competition_events/<int:competition_id>/', views.competition_events, name='competition_events'),
+    path('api/competition_roster/<int:competition_id>/', views.competition_roster_api, name='competition_roster_api'),
+    path('api/race_progress/<int:competition_id>/', views.race_progress, name='race_progress'),
+    path('api/race_progress/<int:competition_id>/ticks/', views.submit_progress, name='submit_progress'),
+    path('api/time/', views.time_sync, name='time_sync'),
     path('leaderboard/',views.leaderboard, name='leaderboard'),
+    path('leaderboard/<int:competition_id>/', views.competition_leaderboard, name='competition_leaderboard'),
      path('results/delete/<int:result_id>/', views.delete_result, name='delete_result'),
+    path('results/export/', views.export_results, name='export_results'),
     # Footer URLs
     path('terms/', views.terms, name='terms'),
     path('privacy/', views.privacy, name='privacy'),
@@ -33,4 +44,5 @@ urlpatterns = [
 
     # Health check for deployment platforms
     path('health_check/', views.health_check, name='health_check'),
+    path('api/metrics/', views.metrics_api, name='metrics_api'),
 ]
@@ -1,13 +1,38 @@
-from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse, HttpResponse
+import asyncio
+import hmac
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
+from django.http import JsonResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse, Http404
+from django.core.handlers.asgi import ASGIRequest
 from django.contrib import messages
+from django.views.decorators.cache import never_cache
+from django.middleware.csrf import get_token
+from django.urls import reverse
 from django.core.exceptions import ValidationError
 from django.core.validators import validate_email
-from .models import Participant, Organizer, Competition, CompetitionResult
-from django.db import models
+from .models import Participant, Organizer, Competition, CompetitionResult, ParticipantStats
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 from .decorators import login_required, participant_required, organizer_required
 from django.utils import timezone
-from datetime import timedelta
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime
+from . import (
+    corpus, events, expiry, export, identity, ingest, jumble, leaderboard as rankings, lifecycle, metrics,
+    practice as practice_texts, progress, roster, scoring, stats, status,
+)
+
+# Seconds between keep-alive comments on idle event streams.
+EVENT_STREAM_KEEPALIVE = 15
+
+COMPETITIONS_PER_PAGE = 20
+LEADERBOARD_COMPETITIONS_PER_PAGE = 10
+LEADERBOARD_RESULTS_PER_PAGE = 50
 
 
 def get_auth_context(request):
@@ -37,14 +62,28 @@ def signup(request):
             if len(password) < 8:
                 messages.error(request, 'Password must be at least 8 characters long')
                 return render(request, 'typing_game/signup.html', get_auth_context(request))
+
+            if '@' in name:
+                messages.error(request, 'Username cannot contain @')
+                return render(request, 'typing_game/signup.html', get_auth_context(request))
+
+            # Names log users in, so each one may only belong to one account
+            if identity.find_account(name)[1] is not None:
+                messages.error(request, 'Username already taken')
+                return render(request, 'typing_game/signup.html', get_auth_context(request))
+
             if role == 'participant':
                 # Simple registration for participants
                 new_user = Participant(
                     name=name,
                 )
                 new_user.set_password(password)
-                
-                new_user.save()
+                try:
+                    with transaction.atomic():
+                        new_user.save()
+                except IntegrityError:  # Taken by a concurrent signup
+                    messages.error(request, 'Username already taken')
+                    return render(request, 'typing_game/signup.html', get_auth_context(request))
                 messages.success(request, 'Welcome to Typing Jutsu! Please login to start practicing.')
                 
             elif role == 'organizer':
@@ -82,7 +121,12 @@ def signup(request):
                     mobile_num=mobile_num,
                 )
                 new_user.set_password(password)
-                new_user.save()
+                try:
+                    with transaction.atomic():
+                        new_user.save()
+                except IntegrityError:  # Email taken by a concurrent signup
+                    messages.error(request, 'Email already registered')
+                    return render(request, 'typing_game/signup.html', get_auth_context(request))
                 messages.success(request, 'Organizer account created successfully! Please login.')
 
             return redirect('typing_game:login')
@@ -93,7 +137,12 @@ def signup(request):
 
     return render(request, 'typing_game/signup.html', get_auth_context(request))
 
-def login_view(request):
+def _render_login(request):
+    return render(request, 'typing_game/login.html', get_auth_context(request))
+
+async def login_view(request):
+    # Async so that password hashing runs in a worker thread: under ASGI all
+    # sync views share one thread, and a login burst would queue behind it.
     if request.method == 'POST':
         try:
             identifier = request.POST.get('username') # This is 'username' or 'email'
@@ -101,48 +150,33 @@ def login_view(request):
 
             if not identifier or not password:
                 messages.error(request, 'Please provide both username/email and password')
-                return render(request, 'typing_game/login.html', get_auth_context(request))
-
-            user_obj = None
-            user_role = None
-            is_email = '@' in identifier
+                return await sync_to_async(_render_login)(request)
 
-            if is_email:
-                # Search only in Organizer table for email
-                try:
-                    user_obj = Organizer.objects.get(email=identifier)
-                    user_role = 'organizer'
-                except Organizer.DoesNotExist:
+            # One indexed query: organizer by email, else participant then organizer by name
+            user_role, user_obj = await sync_to_async(identity.find_account)(identifier)
+            if user_obj is None:
+                if '@' in identifier:
                     messages.error(request, 'No organizer found with this email.')
-                    return render(request, 'typing_game/login.html', get_auth_context(request))
-            else:
-                # Search in Participant table first, then Organizer for username
-                try:
-                    user_obj = Participant.objects.get(name=identifier)
-                    user_role = 'participant'
-                except Participant.DoesNotExist:
-                    try:
-                        user_obj = Organizer.objects.get(name=identifier)
-                        user_role = 'organizer'
-                    except Organizer.DoesNotExist:
-                        messages.error(request, 'No user found with this username.')
-                        return render(request, 'typing_game/login.html', get_auth_context(request))
-
-            if user_obj and user_obj.check_password(password):
-                request.session['user_id'] = user_obj.id
-                request.session['user_role'] = user_role
-                request.session['user_name'] = user_obj.name
-                request.session.set_expiry(0)  # Expire session on browser close
+                else:
+                    messages.error(request, 'No user found with this username.')
+                return await sync_to_async(_render_login)(request)
+
+            if await user_obj.acheck_password(password):
+                await request.session.aset('user_id', user_obj.id)
+                await request.session.aset('user_role', user_role)
+                await request.session.aset('user_name', user_obj.name)
+                await request.session.aset_expiry(0)  # Expire session on browser close
+                await identity.aremember_profile(user_role, user_obj)
                 messages.success(request, f'Welcome back, {user_obj.name}!')
                 return redirect('typing_game:home')
             else:
                 messages.error(request, 'Invalid credentials. Please try again.')
-                return render(request, 'typing_game/login.html', get_auth_context(request))
+                return await sync_to_async(_render_login)(request)
         except Exception as e:
             messages.error(request, f'An unexpected error occurred: {e}')
-            return render(request, 'typing_game/login.html', get_auth_context(request))
+            return await sync_to_async(_render_login)(request)
 
-    return render(request, 'typing_game/login.html', get_auth_context(request))
+    return await sync_to_async(_render_login)(request)
 
 def logout_view(request):
     # Clear all session data
@@ -152,49 +186,91 @@ def logout_view(request):
 
 def home(request):
     context = get_auth_context(request)
-    user_id = request.session.get('user_id')
-    user_role = request.session.get('user_role') # This line was missing
     profile_user = None
 
-    if user_id and user_role:
-        try:
-            if user_role == 'participant':
-                profile_user = Participant.objects.get(id=user_id)
-            elif user_role == 'organizer':
-                profile_user = Organizer.objects.get(id=user_id)
-        except (Participant.DoesNotExist, Organizer.DoesNotExist):
+    if context.get('user_id') and context.get('user_role'):
+        profile_user = request.profile or None
+        if profile_user is None:
             # If user in session doesn't exist in DB, clear session
             request.session.flush()
 
     context['profile_user'] = profile_user
+    if profile_user and context['user_role'] == 'participant':
+        # History and personal bests, rolled up as results come in
+        context['stats'] = ParticipantStats.objects.filter(participant_id=profile_user.id).first()
     return render(request, 'typing_game/home.html', context)
 
 @participant_required
 def practice(request):
     """Practice page - only accessible to participants"""
-    return render(request, 'typing_game/practice.html', get_auth_context(request))
+    context = get_auth_context(request)
+    text = practice_texts.practice_text(request.GET.get('level'), request.GET.get('length'))
+    context.update(
+        text, words=text['text'].split(' '), levels=practice_texts.LEVELS, lengths=practice_texts.LENGTHS,
+    )
+    return render(request, 'typing_game/practice.html', context)
+
+@participant_required
+def practice_text_api(request):
+    """A practice text for ``level`` and ``length``; ``seed`` picks a specific one."""
+    return JsonResponse(practice_texts.practice_text(
+        request.GET.get('level'), request.GET.get('length'), request.GET.get('seed'),
+    ))
 
 @login_required
 def competitions(request):
     context = get_auth_context(request)
-    user_id = context.get('user_id')
-    user_role = context.get('user_role')
-    profile_user = None
-
-    if user_id and user_role:
-        try:
-            if user_role == 'participant':
-                profile_user = Participant.objects.get(id=user_id)
-            elif user_role == 'organizer':
-                profile_user = Organizer.objects.get(id=user_id)
-        except (Participant.DoesNotExist, Organizer.DoesNotExist):
-            request.session.flush() # User in session not in DB, clear it.
-
-    context['competitions'] = Competition.objects.order_by('-start_time')
+    # login_required has already resolved the profile (from the cache)
+    profile_user = request.profile
+
+    # Keyset pagination: each page costs the same no matter how deep it is
+    listing = Competition.objects.with_end_time().select_related('organizer').defer('paragraphs')
+    status_choices = Competition._meta.get_field('status').choices
+    type_choices = Competition._meta.get_field('type').choices
+    filters = {key: request.GET.get(key, '') for key in ('status', 'type', 'when')}
+    if filters['status'] in dict(status_choices):
+        listing = listing.filter(status=filters['status'])
+    if filters['type'] in dict(type_choices):
+        listing = listing.filter(type=filters['type'])
+    if filters['when'] == 'upcoming':
+        listing = listing.filter(start_time__gt=timezone.now())
+    elif filters['when'] == 'past':
+        listing = listing.filter(ends_at__lt=timezone.now())
+
+    cursor = _parse_cursor(request.GET.get('cursor'))
+    if cursor:
+        start_time, competition_id = cursor
+        listing = listing.filter(Q(start_time__lt=start_time) | Q(start_time=start_time, id__lt=competition_id))
+
+    page = list(listing.order_by('-start_time', '-id')[:COMPETITIONS_PER_PAGE + 1])
+    context['competitions'] = page[:COMPETITIONS_PER_PAGE]
+    if isinstance(profile_user, Participant):
+        # Running races this participant joined can still be entered
+        context['joined_ids'] = set(roster.Membership.objects.filter(
+            participant_id=profile_user.id,
+            competition_id__in=[c.id for c in context['competitions'] if c.status == 'started'],
+        ).values_list('competition_id', flat=True))
+    if len(page) > COMPETITIONS_PER_PAGE:
+        last = page[COMPETITIONS_PER_PAGE - 1]
+        query = request.GET.copy()
+        query['cursor'] = f'{last.start_time.isoformat()}|{last.id}'
+        context['next_page_query'] = query.urlencode()
+    context['is_first_page'] = cursor is None
+    context['filters'] = filters
+    context['status_choices'] = status_choices
+    context['type_choices'] = type_choices
     context['profile_user'] = profile_user
 
     return render(request, 'typing_game/competitions.html', context)
 
+def _parse_cursor(cursor):
+    """Decode a ``'<start_time>|<id>'`` listing cursor; ``None`` means the first page."""
+    try:
+        start_time, competition_id = cursor.split('|')
+        return datetime.fromisoformat(start_time), int(competition_id)
+    except (AttributeError, ValueError):
+        return None
+
 @organizer_required
 def create_competition(request):
     """Allows organizers to create a new competition."""
@@ -214,32 +290,26 @@ def create_competition(request):
 
             paragraphs_list = [p.strip() for p in paragraphs_raw.split('\n\n') if p.strip()]
             
-            # Prepare data for JSONField
+            # Jumble-words answers are kept on the competition; typing texts go to the corpus
             paragraphs_data = []
             if competition_type == 'Jumble-words':
-                paragraphs_list = [p.strip() for p in paragraphs_raw.split('\n') if p.strip()]
-                answers_raw = request.POST.get('ans_juble_word', '')
-                answers_list = [a.strip() for a in answers_raw.split('\n') if a.strip()]
-                if len(paragraphs_list) != len(answers_list):
-                    messages.error(request, "The number of jumbled words must match the number of answers.")
+                paragraphs_data, error = _jumble_answers(paragraphs_raw)
+                if error:
+                    messages.error(request, error)
                     return render(request, 'typing_game/create_competition.html', get_auth_context(request))
-                
-                for jumbled, answer in zip(paragraphs_list, answers_list):
-                    paragraphs_data.append({'text': jumbled, 'answer': answer})
-            else:
-                for para in paragraphs_list:
-                    paragraphs_data.append({'text': para})
-
-            organizer = Organizer.objects.get(id=organizer_id)
-            Competition.objects.create(
-                title=title,
-                description=description,
-                type=competition_type,
-                paragraphs=paragraphs_data,
-                start_time=start_time,
-                duration=int(duration),
-                organizer=organizer
-            )
+
+            with transaction.atomic():
+                competition = Competition.objects.create(
+                    title=title,
+                    description=description,
+                    type=competition_type,
+                    paragraphs=paragraphs_data,
+                    start_time=start_time,
+                    duration=int(duration),
+                    organizer_id=organizer_id
+                )
+                if competition_type != 'Jumble-words':
+                    corpus.set_competition_texts(competition, paragraphs_list)
             messages.success(request, f"Competition '{title}' created successfully!")
             return redirect('typing_game:competitions')
         except Exception as e:
@@ -248,6 +318,29 @@ def create_competition(request):
 
     return render(request, 'typing_game/create_competition.html', get_auth_context(request))
 
+def _jumble_answers(answers_raw):
+    """Parse the answers of a Jumble-words competition, one per line; returns ``(paragraphs, error)``."""
+    answers = [a.strip() for a in answers_raw.split('\n') if a.strip()]
+    unusable = [a for a in answers if not jumble.can_jumble(a) or len(a) > jumble.MAX_ANSWER_LENGTH]
+    if unusable:
+        return [], f"These answers can't be jumbled: {', '.join(unusable[:10])}"
+    return [{'answer': answer} for answer in answers], None
+
+@organizer_required
+def import_paragraphs(request):
+    """Add the paragraphs of an uploaded text file (blank-line separated) to the typing corpus.
+
+    Uploads over a few MB are spooled to disk by Django and read line by line,
+    so even book-sized files are imported with bounded memory.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+    upload = request.FILES.get('file')
+    if upload is None:
+        return JsonResponse({'error': 'No file uploaded'}, status=400)
+    lines = (line.decode('utf-8', 'replace') for line in upload)
+    return JsonResponse(corpus.import_paragraphs(lines))
+
 @organizer_required
 def edit_competition(request, competition_id):
     """Allows organizers to edit their own competitions."""
@@ -266,23 +359,22 @@ def edit_competition(request, competition_id):
             paragraphs_data = []
 
             if competition.type == 'Jumble-words':
-                paragraphs_list = [p.strip() for p in paragraphs_raw.split('\n') if p.strip()]
-                answers_raw = request.POST.get('ans_juble_word', '')
-                answers_list = [a.strip() for a in answers_raw.split('\n') if a.strip()]
-                if len(paragraphs_list) != len(answers_list):
-                    messages.error(request, "The number of jumbled words must match the number of answers.")
+                paragraphs_data, error = _jumble_answers(paragraphs_raw)
+                if error:
+                    messages.error(request, error)
                     # Pass existing data back to the template
-                    context = {'competition': competition, 'paragraphs_raw': paragraphs_raw, 'answers_raw': answers_raw}
+                    context = {'competition': competition, 'paragraphs_raw': paragraphs_raw}
                     return render(request, 'typing_game/edit_competition.html', context)
-                
-                for jumbled, answer in zip(paragraphs_list, answers_list):
-                    paragraphs_data.append({'text': jumbled, 'answer': answer})
-            else:
-                paragraphs_list = [p.strip() for p in paragraphs_raw.split('\n\n') if p.strip()]
-                paragraphs_data = [{'text': para} for para in paragraphs_list]
             
             competition.paragraphs = paragraphs_data
-            competition.save()
+            with transaction.atomic():
+                # Leave status/started alone: lifecycle.py may be changing them concurrently
+                competition.save(update_fields=['title', 'description', 'type', 'start_time', 'duration', 'paragraphs'])
+                texts = [] if competition.type == 'Jumble-words' else [
+                    p.strip() for p in paragraphs_raw.split('\n\n') if p.strip()
+                ]
+                corpus.set_competition_texts(competition, texts)
+            status.bump_version(competition.id)
             messages.success(request, f"Competition '{competition.title}' updated successfully!")
             return redirect('typing_game:competitions')
         except Exception as e:
@@ -290,15 +382,12 @@ def edit_competition(request, competition_id):
             return render(request, 'typing_game/edit_competition.html', {'competition': competition})
 
     # Prepare data for rendering the edit form
-    paragraphs_raw = ""
-    answers_raw = ""
     if competition.type == 'Jumble-words':
-        paragraphs_raw = '\n'.join([p.get('text', '') for p in competition.paragraphs])
-        answers_raw = '\n'.join([p.get('answer', '') for p in competition.paragraphs])
+        paragraphs_raw = '\n'.join(jumble.competition_answers(competition))
     else:
-        paragraphs_raw = '\n\n'.join([p.get('text', '') for p in competition.paragraphs])
+        paragraphs_raw = '\n\n'.join(corpus.competition_texts(competition))
 
-    context = {'competition': competition, 'paragraphs_raw': paragraphs_raw, 'answers_raw': answers_raw}
+    context = {'competition': competition, 'paragraphs_raw': paragraphs_raw}
     return render(request, 'typing_game/edit_competition.html', context)
 
 @organizer_required
@@ -306,7 +395,11 @@ def delete_competition(request, competition_id):
     """Allows organizers to delete their own competitions."""
     try:
         competition = Competition.objects.get(id=competition_id, organizer_id=request.session.get('user_id'))
-        competition.delete()
+        with transaction.atomic():
+            racers = list(competition.results.values_list('participant_id', flat=True))
+            competition.delete()
+            stats.rebuild(racers)
+        status.bump_version(competition_id)
         messages.success(request, "Competition deleted successfully!")
     except Competition.DoesNotExist:
         messages.error(request, "Competition not found or you don't have permission to delete it.")
@@ -316,120 +409,216 @@ def delete_competition(request, competition_id):
 
 @organizer_required
 def activate_competition(request,competition_id):
-    context = get_auth_context(request)
-    competition = Competition.objects.get(id=competition_id)
-    
-    competition.status = 'active'
-    competition.save()
-    
-    context['competition'] = competition
-    context['joined_participants'] = competition.participants.all()
-    
-    return render(request, 'typing_game/live_competition.html', context)
+    if not lifecycle.activate(competition_id, request.session.get('user_id')):
+        messages.error(request, "Only your own waiting competitions can be activated.")
+        return redirect('typing_game:competitions')
+    return redirect('typing_game:live_competition', competition_id)
 
 @organizer_required
 def deactivate_competition(request, competition_id):
     """Allows organizers to deactivate their own active competitions."""
     try:
-        competition = Competition.objects.get(id=competition_id, organizer_id=request.session.get('user_id'))
-        competition.status = 'waiting'
-        competition.participants.clear()
-        competition.started = False
-        competition.save()
-        messages.success(request, f"Competition '{competition.title}' has been deactivated.")
-    except Competition.DoesNotExist:
-        messages.error(request, "Competition not found or you don't have permission to modify it.")
+        if lifecycle.deactivate(competition_id, request.session.get('user_id')):
+            roster.reset(competition_id)
+            progress.close_board(competition_id)
+            events.publish_on_commit(competition_id, 'deactivated')
+            messages.success(request, "The competition has been deactivated.")
+        else:
+            messages.error(request, "Competition not found, not active, or you don't have permission to modify it.")
     except Exception as e:
         messages.error(request, f"An error occurred: {e}")
     return redirect('typing_game:competitions')
 
 @login_required
-def live_competition(request,competition_id):
-    context = get_auth_context(request)
-    competition = get_object_or_404(Competition, id=competition_id)
+async def live_competition(request,competition_id):
+    context = get_auth_context(request)  # The session was loaded by login_required
+    competition = await aget_object_or_404(Competition, id=competition_id)
     context['competition'] = competition
-    context['joined_participants'] = competition.participants.all()
+    if competition.type != 'Jumble-words':
+        # Tokenized when the text was added; the page no longer splits it
+        context['words'] = await sync_to_async(corpus.competition_tokens)(competition)
+    elif request.session.get('user_role') == 'participant':
+        # This participant's own puzzles, without the answers
+        context['puzzles'] = jumble.client_puzzles(competition, request.session.get('user_id'))
+    if competition.organizer_id == request.session.get('user_id') and request.session.get('user_role') == 'organizer':
+        # Only the head of the roster is rendered; the page follows it with diffs
+        context['roster'] = await sync_to_async(roster.preview)(competition.id)
+        context['roster_size'] = roster.PREVIEW_SIZE
+        context['roster_hidden'] = competition.participant_count - len(context['roster']['joined'])
+    else:
+        context['has_joined'] = await roster.Membership.objects.filter(
+            competition_id=competition.id, participant_id=request.session.get('user_id')
+        ).aexists()
+    expiry.ensure_scheduler()  # Picks up races left running by a restarted server
     if competition.started:
         context['countdown'] = True #10 second countdown for all participant and user
     else:
         context['countdown'] = False
+    context['live_config'] = _live_config(request, competition, context)
     return render(request, 'typing_game/live_competition.html', context)
 
+def _live_config(request, competition, context):
+    """What the cached live page scripts need to know about this race and viewer."""
+    race_urls = {
+        'events': 'competition_events', 'status': 'competition_status_api', 'roster': 'competition_roster_api',
+        'progress': 'race_progress', 'submit_progress': 'submit_progress',
+    }
+    urls = {key: reverse(f'typing_game:{name}', args=[competition.id]) for key, name in race_urls.items()}
+    urls.update(time_sync=reverse('typing_game:time_sync'), competitions=reverse('typing_game:competitions'))
+    return {
+        'type': competition.type,
+        'user_role': request.session.get('user_role'),
+        'started': competition.started,
+        'start_time': competition.start_time,
+        'duration': competition.duration,
+        'participant_count': competition.participant_count,
+        'roster_size': context.get('roster_size', 0),
+        'roster_version': context['roster']['version'] if 'roster' in context else 0,
+        'csrf_token': get_token(request),
+        'urls': urls,
+    }
+
 # join
 @login_required
-def join_competition(request, competition_id):
-    """Allows participants to join an active competition."""
-    participant_id = request.session.get('user_id')
-    competition = get_object_or_404(Competition, id=competition_id)
-    
+async def join_competition(request, competition_id):
+    """Allows participants to join an active competition, and joined ones back into a running race."""
+    competition = await aget_object_or_404(Competition, id=competition_id)
+    participant = request.profile
+
+    if competition.status == 'started' and isinstance(participant, Participant):
+        # Reloads and late redirects of someone who joined in the lobby
+        if await roster.Membership.objects.filter(competition_id=competition.id, participant_id=participant.id).aexists():
+            return redirect('typing_game:live_competition', competition.id)
+
     if competition.status != 'active':
         messages.error(request, "This competition is not currently active.")
         return redirect('typing_game:competitions')
     
-    participant = get_object_or_404(Participant, id=participant_id)
+    if not isinstance(participant, Participant):
+        messages.error(request, "Only participants can join competitions.")
+        return redirect('typing_game:competitions')
     
-    # Check if the participant is already in the competition
-    if not competition.participants.filter(id=participant.id).exists():
-        competition.participants.add(participant)
-        messages.success(request, f"You have successfully joined the competition '{competition.title}'!")
     # If they are already joined, we don't need to do anything or show a message.
-    
-    context = get_auth_context(request)
-    context['competition'] = competition
-    context['joined_participants'] = competition.participants.all()
-    return render(request, 'typing_game/live_competition.html', context)
+    if await sync_to_async(roster.join)(competition.id, participant):
+        messages.success(request, f"You have successfully joined the competition '{competition.title}'!")
+    return redirect('typing_game:live_competition', competition.id)
+
+@participant_required
+def leave_competition(request, competition_id):
+    """Lets a participant leave a lobby before the race starts."""
+    if request.method != 'POST':
+        return redirect('typing_game:live_competition', competition_id)
+    if Competition.objects.filter(id=competition_id, status='active').exists():
+        if roster.leave(competition_id, request.session.get('user_id')):
+            messages.success(request, "You have left the competition.")
+    else:
+        messages.error(request, "You can only leave a competition before it starts.")
+    return redirect('typing_game:competitions')
 
-@login_required
 @organizer_required
-def start_competition(request, competition_id):
+def register_participants(request, competition_id):
+    """Lets an organizer put a list of participants (one name per line) on the roster at once."""
+    if request.method != 'POST':
+        return redirect('typing_game:live_competition', competition_id)
+    open_for_registration = Competition.objects.filter(
+        id=competition_id, organizer_id=request.session.get('user_id'), status__in=['waiting', 'active'],
+    ).exists()
+    if not open_for_registration:
+        messages.error(request, "Competition not found, already started, or you don't have permission to modify it.")
+        return redirect('typing_game:competitions')
+
+    names = [name.strip() for name in request.POST.get('names', '').splitlines() if name.strip()]
+    added, unknown = roster.register(competition_id, names)
+    messages.success(request, f"Registered {added} participant(s).")
+    if unknown:
+        messages.warning(request, f"No participant named: {', '.join(unknown[:20])}{' ...' if len(unknown) > 20 else ''}")
+    return redirect('typing_game:live_competition', competition_id)
+
+@login_required
+def competition_roster_api(request, competition_id):
+    """Roster changes since the ``since`` version, for lobbies catching up after a reconnect."""
     try:
-        competition = Competition.objects.get(id=competition_id, organizer_id=request.session.get('user_id'))
-        if competition.started:
-            messages.warning(request, f"The competition '{competition.title}' has already started.")
-            return redirect('typing_game:live_competition', competition_id)
+        since = int(request.GET.get('since', 0))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid version'}, status=400)
+    diff = roster.changes_since(competition_id, since)
+    if diff['count'] is None:
+        raise Http404("Competition not found")
+    return JsonResponse(diff)
 
-        competition.started = True
-        competition.start_time = timezone.now() + timedelta(seconds=10) # 10 second delay for countdown
-        competition.save()
-        messages.success(request, f"The competition '{competition.title}' has started!")
-    except Competition.DoesNotExist:
+@login_required
+@organizer_required
+def start_competition(request, competition_id):
+    start_time = lifecycle.start(competition_id, request.session.get('user_id'))
+    if start_time is not None:
+        expiry.ensure_scheduler()
+        events.publish_on_commit(competition_id, 'started', {'start_time': start_time.isoformat()})
+        messages.success(request, "The competition has started!")
+        return redirect('typing_game:live_competition', competition_id)
+
+    competition = Competition.objects.filter(
+        id=competition_id, organizer_id=request.session.get('user_id')
+    ).values('title', 'status').first()
+    if competition is None:
         messages.error(request, "Competition not found or you don't have permission to start it.")
+    elif competition['status'] == 'waiting':
+        messages.warning(request, f"Activate the competition '{competition['title']}' before starting it.")
+    else:
+        messages.warning(request, f"The competition '{competition['title']}' has already started.")
     return redirect('typing_game:live_competition', competition_id)
 
+def _store_result(competition, participant_id, defaults):
+    # Use update_or_create to handle re-submissions
+    with transaction.atomic():
+        previous = CompetitionResult.objects.select_for_update().filter(
+            competition=competition, participant_id=participant_id
+        ).values(*stats.RESULT_FIELDS).first()
+        result, created = CompetitionResult.objects.update_or_create(
+            competition=competition,
+            participant_id=participant_id,
+            defaults=defaults
+        )
+        rankings.place(result, created)
+        stats.record(result, competition, previous)
+
 @login_required
 @participant_required
-def submit_result(request, competition_id):
+async def submit_result(request, competition_id):
     if request.method == 'POST':
-        participant_id = request.session.get('user_id')
-        competition = get_object_or_404(Competition, id=competition_id)
-        participant = get_object_or_404(Participant, id=participant_id)
-
-        defaults = {
-            'competition': competition,
-            'participant': participant,
-        }
-
-        if competition.type == 'Jumble-words':
-            # Handle Jumble-words result
-            defaults['score'] = float(request.POST.get('score') or 0)
-            defaults['time_taken'] = float(request.POST.get('time_taken') or 0)
-            defaults['num_correct'] = int(request.POST.get('num_correct') or 0)
-            defaults['total_questions'] = int(request.POST.get('total_questions') or 0)
-            # Set typing-specific fields to 0 for jumble games
-            defaults['wpm'] = 0
-            defaults['accuracy'] = 0
-        else:
-            # Handle Normal/Reverse typing result
-            defaults['wpm'] = float(request.POST.get('wpm') or 0)
-            defaults['accuracy'] = float(request.POST.get('accuracy') or 0)
-            defaults['time_taken'] = float(request.POST.get('time_taken') or 0)
+        participant_id = request.profile.id
+        competition = await aget_object_or_404(Competition, id=competition_id)
+        if not expiry.accepts_results(competition):
+            messages.error(request, "Submissions for this competition are closed.")
+            return redirect('typing_game:competitions')
+        defaults = {}
 
-        # Use update_or_create to handle re-submissions
-        CompetitionResult.objects.update_or_create(
-            competition=competition,
-            participant=participant,
-            defaults=defaults
-        )
+        try:
+            if competition.type == 'Jumble-words':
+                # Check the answers against this participant's puzzles on the server
+                defaults.update(jumble.score_submission(
+                    competition, participant_id, request.POST.get('answers'), request.POST.get('time_taken') or None
+                ))
+            else:
+                # Handle Normal/Reverse typing result: replay the keystroke log on the server
+                defaults.update(await sync_to_async(scoring.score_submission)(
+                    competition, request.POST.get('keystrokes'), request.POST.get('time_taken') or None
+                ))
+        except ValueError as e:  # ScoringError, or a malformed time_taken
+            messages.error(request, f"Your result could not be scored: {e}")
+            return redirect('typing_game:live_competition', competition_id)
+
+        if settings.RESULT_INGEST_MODE == 'batched':
+            # Acknowledge now; the background writer stores it within a flush interval
+            result = CompetitionResult(competition=competition, participant_id=participant_id, **defaults)
+            result.compute_score()
+            # enqueue() fsyncs, so it runs off the event loop
+            await sync_to_async(ingest.enqueue, thread_sensitive=False)(
+                competition.id, participant_id, {field: getattr(result, field) for field in ingest.RESULT_FIELDS}
+            )
+            messages.success(request, "Your result has been received and will appear on the leaderboard shortly.")
+            return redirect('typing_game:competitions')
+
+        await sync_to_async(_store_result)(competition, participant_id, defaults)
         messages.success(request, "Your result has been submitted successfully!")
         return redirect('typing_game:competitions') # Redirect to competitions list
     return redirect('typing_game:live_competition', competition_id)
@@ -437,15 +626,71 @@ def submit_result(request, competition_id):
 @login_required
 @organizer_required
 def leaderboard(request):
-    """Leaderboard page - accessible to all logged-in users"""
+    """Leaderboard page - accessible to organizers only"""
+    context = get_auth_context(request)
+    # A page of competitions that have results, each with its top ranked results
+    competitions_with_results = Competition.objects.filter(result_count__gt=0).select_related('organizer').order_by('-start_time')
+    page = Paginator(competitions_with_results, LEADERBOARD_COMPETITIONS_PER_PAGE).get_page(request.GET.get('page'))
+    context['competitions_with_results'] = rankings.attach_top_results(list(page))
+    context['page_obj'] = page
+    return render(request, 'typing_game/leaderboard.html', context)
+
+@login_required
+@organizer_required
+def competition_leaderboard(request, competition_id):
+    """Full ranking of one competition, paginated by rank."""
     context = get_auth_context(request)
-    # Fetch competitions that have ended or are active, along with their results ordered by score
-    competitions_with_results = Competition.objects.prefetch_related(
-        models.Prefetch('results', queryset=CompetitionResult.objects.order_by('-score'))
-    ).order_by('-start_time')
-    context['competitions_with_results'] = competitions_with_results
+    competition = get_object_or_404(Competition.objects.select_related('organizer'), id=competition_id)
+    page = Paginator(range(competition.result_count), LEADERBOARD_RESULTS_PER_PAGE).get_page(request.GET.get('page'))
+    competition.top_results = list(
+        competition.results.filter(rank__gte=page.start_index(), rank__lte=page.end_index())
+        .select_related('participant').order_by('rank')
+    )
+    context['competitions_with_results'] = [competition]
+    context['page_obj'] = page
+    context['full_ranking'] = True
     return render(request, 'typing_game/leaderboard.html', context)
 
+def _parse_export_date(value):
+    """A ``since``/``until`` filter: an ISO date or datetime, or ``None`` if absent."""
+    if not value:
+        return None
+    parsed = parse_datetime(value) or parse_date(value)
+    if parsed is None:
+        raise ValueError(f"Invalid date: {value}")
+    if not isinstance(parsed, datetime):
+        parsed = datetime.combine(parsed, datetime.min.time())
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+
+@organizer_required
+async def export_results(request):
+    """Stream the results of the organizer's competitions as CSV or NDJSON.
+
+    Filters: ``competition``, ``since`` and ``until`` (submission time).
+    The response is gzipped on the fly for clients that accept it.
+    """
+    output_format = request.GET.get('format', 'csv')
+    if output_format not in export.FORMATS:
+        return JsonResponse({'error': 'Unknown format'}, status=400)
+    try:
+        competition_id = int(request.GET['competition']) if request.GET.get('competition') else None
+        since = _parse_export_date(request.GET.get('since'))
+        until = _parse_export_date(request.GET.get('until'))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    rows = export.results(competition_id, request.session.get('user_id'), since, until)
+    gzipped = 'gzip' in request.headers.get('Accept-Encoding', '')
+    response = StreamingHttpResponse(
+        export.astream(rows, output_format, gzip=gzipped), content_type=export.FORMATS[output_format],
+    )
+    name = f"results-{competition_id}" if competition_id else 'results'
+    response['Content-Disposition'] = f'attachment; filename="{name}.{output_format}"'
+    response['Vary'] = 'Accept-Encoding'
+    if gzipped:
+        response['Content-Encoding'] = 'gzip'
+    return response
+
 @organizer_required
 def delete_result(request, result_id):
     """Allows an organizer to delete a specific result from their competition."""
@@ -455,7 +700,9 @@ def delete_result(request, result_id):
 
         # Check if the logged-in user is the organizer of the competition
         if result.competition.organizer.id == organizer_id:
-            result.delete()
+            with transaction.atomic():
+                if rankings.remove(result):
+                    stats.forget(result, result.competition)
             messages.success(request, "The result has been deleted successfully.")
         else:
             messages.error(request, "You do not have permission to delete this result.")
@@ -465,13 +712,145 @@ def delete_result(request, result_id):
 
 # Public pages
 @login_required
-def competition_status_api(request, competition_id):
-    """API endpoint to get the status of a competition."""
-    competition = get_object_or_404(Competition, id=competition_id)
-    return JsonResponse({
-        'started': competition.started,
-        'start_time': competition.start_time.isoformat() if competition.started else None,
-    })
+async def competition_status_api(request, competition_id):
+    """API endpoint to get the status of a competition.
+
+    Served from the status cache with an ETag, so a poll that finds nothing new
+    is answered with 304 without touching the database.
+    """
+    etag = status.make_etag(competition_id, await status.aget_version(competition_id))
+    if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+        response = HttpResponseNotModified()
+    else:
+        etag, payload = await status.aget_status(competition_id)
+        if payload is None:
+            raise Http404("Competition not found")
+        response = JsonResponse(payload)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'  # Browsers revalidate with If-None-Match
+    return response
+
+async def competition_events(request, competition_id):
+    """Server-Sent Events stream that pushes start/deactivate signals to a lobby.
+
+    Only served under ASGI; a WSGI worker would be pinned for the life of the
+    connection, so there it answers 204 and clients fall back to polling.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    user_id = await request.session.aget('user_id')
+    if user_id is None:
+        return HttpResponse(status=403)
+    is_owner = await request.session.aget('user_role') == 'organizer'
+
+    # Subscribe before reading the state, so an event published in between is
+    # queued for this client rather than lost.
+    subscription = events.subscribe(competition_id)
+    competition = await Competition.objects.filter(id=competition_id).values(
+        'status', 'started', 'start_time', 'organizer_id',
+    ).afirst()
+    if competition is None:
+        events.unsubscribe(subscription)
+        return HttpResponse(status=404)
+    is_owner = is_owner and competition['organizer_id'] == user_id
+
+    async def stream():
+        try:
+            # Tell the client how long to wait before reconnecting after a drop.
+            yield 'retry: 3000\n\n'
+            if competition['status'] == 'waiting' and not is_owner:
+                # Deactivated before this client connected; nothing more will come.
+                # The owner stays, to pre-register participants before opening it.
+                yield _sse('deactivated', {})
+                return
+            if competition['started']:
+                # Already started before this client connected.
+                yield _sse('started', {'start_time': competition['start_time'].isoformat()})
+                board = progress.find_board(competition_id)
+                if board is not None:
+                    yield _sse('progress', board.full_snapshot())
+            while True:
+                try:
+                    event, data = await subscription.get(timeout=EVENT_STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ': keep-alive\n\n'
+                    continue
+                yield _sse(event, data)
+        finally:
+            events.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(_EventStream(stream(), subscription), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Disable proxy buffering (nginx, Render)
+    return response
+
+class _EventStream:
+    """Streaming content that drops its subscription when the response closes.
+
+    The generator's ``finally`` only runs once it has started; a client that
+    leaves before the first chunk is cleaned up by ``close()``, which the
+    response calls on its content.
+    """
+    def __init__(self, chunks, subscription):
+        self.chunks = chunks
+        self.subscription = subscription
+
+    def __aiter__(self):
+        return self.chunks
+
+    def close(self):
+        events.unsubscribe(self.subscription)
+
+def _sse(event, data):
+    # Broadcast payloads arrive pre-encoded so they are serialized once per tick.
+    if not isinstance(data, str):
+        data = json.dumps(data)
+    return f'event: {event}\ndata: {data}\n\n'
+
+@login_required
+def race_progress(request, competition_id):
+    """Full live standings of a race, for viewers without the event stream."""
+    board = progress.find_board(competition_id)
+    if board is None:
+        return JsonResponse({'seq': 0, 'full': True, 'racers': [], 'names': {}})
+    return HttpResponse(board.full_snapshot(), content_type='application/json')
+
+@participant_required
+def submit_progress(request, competition_id):
+    """Ingest a batch of progress ticks from a racer.
+
+    Expects a JSON body ``{"ticks": [[word_index, correct_words, chars_typed], ...]}``.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+    try:
+        ticks = json.loads(request.body)['ticks']
+        if not isinstance(ticks, list) or not ticks:
+            raise ValueError
+        if any(not isinstance(tick, list) or len(tick) < 3 for tick in ticks):
+            raise ValueError
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Invalid progress batch'}, status=400)
+
+    board = progress.get_board(competition_id)
+    if board is None:
+        return JsonResponse({'error': 'Competition is not running'}, status=409)
+
+    participant_id = request.session['user_id']
+    if not board.has_racer(participant_id):
+        # Checked once per racer; afterwards ticks are handled purely in memory.
+        joined = roster.Membership.objects.filter(
+            competition_id=competition_id, participant_id=participant_id
+        ).exists()
+        if not joined:
+            return JsonResponse({'error': 'You have not joined this competition'}, status=403)
+        board.add_racer(participant_id, request.session.get('user_name', ''))
+
+    try:
+        board.ingest(participant_id, ticks)
+    except (ValueError, TypeError):
+        return JsonResponse({'error': 'Invalid progress batch'}, status=400)
+    return HttpResponse(status=204)
 
 
 def terms(request):
@@ -486,6 +865,19 @@ def help_view(request):
     """Help page"""
     return render(request, 'typing_game/help.html', get_auth_context(request))
 
+def metrics_api(request):
+    """Per-view request metrics of this worker; requires the metrics bearer token."""
+    token = settings.REQUEST_METRICS_TOKEN
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not (settings.REQUEST_METRICS_ENABLED and token and hmac.compare_digest(supplied, token)):
+        raise Http404
+    return JsonResponse({'views': metrics.snapshot()})
+
+@never_cache
+def time_sync(request):
+    """The server clock in epoch milliseconds, sampled by ``static/js/timesync.js``."""
+    return JsonResponse({'server_time': time.time() * 1000})
+
 def health_check(request):
     """Health check endpoint for deployment platforms."""
     return HttpResponse("OK", status=200)
\ No newline at end of file